@@ -190,3 +190,16 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
+
+# EasyTest keypad SDK: 'dll' loads EasyTestSDK_x64.dll, 'fake' uses core/fake_sdk.py
+# (the EASYTEST_SDK environment variable overrides this)
+EASYTEST_SDK = os.environ.get('EASYTEST_SDK', 'dll')
+EASYTEST_FAKE_SDK = {
+    'bases': 1,
+    'remotes': 30,
+    'rate': 6.0,
+}
+
+# Worker threads per process for skill matrix updates after a pass (app1/jobs.py).
+# 0 leaves the queue to `manage.py run_skill_matrix_jobs`.
+SKILL_MATRIX_JOB_WORKERS = 2
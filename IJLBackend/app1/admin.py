@@ -497,6 +497,16 @@ class ScoreAdmin(admin.ModelAdmin):
     date_hierarchy = 'created_at'
 
 
+from .models import SkillMatrixJob
+
+@admin.register(SkillMatrixJob)
+class SkillMatrixJobAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'skill', 'level', 'status', 'attempts', 'next_run_at', 'last_error')
+    list_filter = ('status',)
+    search_fields = ('employee__full_name', 'employee__employee_code', 'last_error')
+    readonly_fields = ('created_at',)
+
+
 
 from django.contrib import admin
 from .models import Dummy
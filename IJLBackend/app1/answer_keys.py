@@ -0,0 +1,79 @@
+"""
+Compiled answer keys per QuizQuestionPaper, cached in memory.
+
+An AnswerKey holds what scoring and result listings need from a paper's
+questions: their ids in answer order, correct_index as a read-only int8
+array, and the count. Keys are built on first use, several papers per query
+with get_many. The QuizQuestion signal handlers in app1.signals drop a
+paper's key whenever one of its questions is saved or deleted.
+
+Each paper also has a version number in Django's cache. Invalidation bumps
+it, and every lookup compares it with the version the local copy was built
+from. With a shared cache backend, an edit made in one worker process
+therefore reaches the others too.
+"""
+
+import threading
+from collections import namedtuple
+
+import numpy as np
+from django.core.cache import cache
+
+from .models import QuizQuestion
+
+AnswerKey = namedtuple('AnswerKey', 'question_ids correct count version')
+
+_keys = {}  # paper id -> AnswerKey
+_lock = threading.Lock()
+
+
+def _version_key(paper_id):
+    return f"answer_key_version:{paper_id}"
+
+
+def _compile(paper_id, rows, version):
+    correct = np.array([correct_index for _, correct_index in rows], dtype=np.int8)
+    correct.flags.writeable = False  # shared by every caller
+    return AnswerKey(tuple(question_id for question_id, _ in rows), correct, len(rows), version)
+
+
+def get_many(paper_ids):
+    """AnswerKey for each paper id (None = questions without a paper), building missing ones in one query"""
+    paper_ids = set(paper_ids)
+    versions = {paper_id: cache.get(_version_key(paper_id), 0) for paper_id in paper_ids}
+    with _lock:
+        found = {paper_id: _keys[paper_id] for paper_id in paper_ids
+                 if paper_id in _keys and _keys[paper_id].version == versions[paper_id]}
+    missing = paper_ids - set(found)
+    if missing:
+        rows = {paper_id: [] for paper_id in missing}
+        query = QuizQuestion.objects.none()
+        if missing - {None}:
+            query = QuizQuestion.objects.filter(question_paper_id__in=missing - {None})
+        if None in missing:
+            query = query | QuizQuestion.objects.filter(question_paper__isnull=True)
+        for question_id, paper_id, correct_index in query.order_by('id').values_list(
+                'id', 'question_paper_id', 'correct_index'):
+            rows[paper_id].append((question_id, correct_index))
+        built = {paper_id: _compile(paper_id, rows[paper_id], versions[paper_id]) for paper_id in missing}
+        with _lock:
+            _keys.update(built)
+        found.update(built)
+    return found
+
+
+def get(paper_id):
+    return get_many([paper_id])[paper_id]
+
+
+def invalidate(paper_id):
+    with _lock:
+        _keys.pop(paper_id, None)
+    key = _version_key(paper_id)
+    # add() is a no-op when the key exists, so incr() always has something to increment
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
@@ -0,0 +1,107 @@
+"""
+Incrementally maintained counts for the service_status and stats endpoints.
+
+Each counter is a row in ServiceCounter. Signal handlers in app1.signals
+adjust the rows on every save of a Device, KeypadEvent or VoteSession, and
+KeypadEventWriter reports its bulk inserts explicitly. Reading the counts is
+then one small query, however large KeypadEvent grows. reconcile() recomputes
+everything exactly. It repairs drift from writes that bypass signals
+(queryset.update, KeypadEvent deletes, raw SQL) and should run periodically
+(manage.py reconcile_counters).
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Device, KeypadEvent, ServiceCounter, VoteSession
+
+# name -> (model, field filters a row must match to be counted)
+COUNTERS = {
+    'total_devices': (Device, {}),
+    'connected_devices': (Device, {'status': 'connected'}),
+    'total_events': (KeypadEvent, {}),
+    'unprocessed_events': (KeypadEvent, {'processed': False}),
+    'active_vote_sessions': (VoteSession, {'status': 'active'}),
+    'total_vote_sessions': (VoteSession, {}),
+}
+
+# Fields whose value decides which counters a row belongs to
+TRACKED_FIELDS = {
+    Device: ('status',),
+    KeypadEvent: ('processed',),
+    VoteSession: ('status',),
+}
+
+
+def tracked_values(instance):
+    """The tracked field values as loaded, or None if a deferred field leaves them unknown"""
+    values = {}
+    for field in TRACKED_FIELDS[type(instance)]:
+        # __dict__ rather than getattr, so a deferred field is not fetched on every load
+        if field not in instance.__dict__:
+            return None
+        values[field] = instance.__dict__[field]
+    return values
+
+
+def _memberships(model, values):
+    return {name for name, (counter_model, filters) in COUNTERS.items()
+            if counter_model is model and all(values.get(f) == v for f, v in filters.items())}
+
+
+def deltas_for_change(model, old_values, new_values):
+    """Counter changes for a row moving from old_values to new_values (None = no row)"""
+    deltas = {}
+    for name in _memberships(model, new_values) if new_values is not None else ():
+        deltas[name] = deltas.get(name, 0) + 1
+    for name in _memberships(model, old_values) if old_values is not None else ():
+        deltas[name] = deltas.get(name, 0) - 1
+    return {name: delta for name, delta in deltas.items() if delta}
+
+
+def apply(deltas):
+    for name, delta in deltas.items():
+        ServiceCounter.objects.filter(name=name).update(value=F('value') + delta)
+
+
+def record_bulk_insert(model, instances):
+    """Count rows written by bulk_create, which sends no post_save signals"""
+    deltas = {}
+    for instance in instances:
+        for name, delta in deltas_for_change(model, None, tracked_values(instance) or {}).items():
+            deltas[name] = deltas.get(name, 0) + delta
+    apply(deltas)
+
+
+def read():
+    counts = dict(ServiceCounter.objects.values_list('name', 'value'))
+    if set(COUNTERS) - set(counts):
+        # First use (or a counter added since): build the missing rows exactly
+        counts = reconcile()
+    return {name: counts[name] for name in COUNTERS}
+
+
+def reconcile():
+    """Recompute every counter exactly; returns the new values.
+
+    The counter rows are locked first. A concurrent write therefore either
+    committed before the COUNTs (and is in them) or applies its delta after
+    this transaction commits. Either way nothing is counted twice.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {c.name: c for c in ServiceCounter.objects.select_for_update().filter(name__in=COUNTERS)}
+        values = {}
+        for name, (model, filters) in COUNTERS.items():
+            values[name] = model.objects.filter(**filters).count()
+            counter = existing.get(name)
+            if counter is None:
+                ServiceCounter.objects.create(name=name, value=values[name], reconciled_at=now)
+            else:
+                if counter.value != values[name]:
+                    print(f"⚠️ Counter {name} drifted: {counter.value} -> {values[name]}")
+                counter.value = values[name]
+                counter.reconciled_at = now
+                counter.save(update_fields=['value', 'reconciled_at'])
+    return values
@@ -0,0 +1,166 @@
+"""
+Background queue for skill matrix updates.
+
+A passing Score used to run Score.update_skill_matrix() inside the request
+that saved it. On "database is locked" that meant sleeping and retrying in
+the request, once per passing participant. Now the Score post_save signal
+only records a SkillMatrixJob, in the same transaction as the score. Worker
+threads run the update after commit.
+
+Jobs are rows, so nothing is lost when the process restarts. The next worker
+to start picks up pending jobs. A job left 'running' by a dead process is
+taken over once its lease expires. Workers claim a job with a conditional
+UPDATE, so several threads or processes can share the table. A failed job
+is retried with exponential backoff, up to MAX_ATTEMPTS times, and then
+marked failed with its last error.
+
+A process starts its workers when it queues its first job. Set
+SKILL_MATRIX_JOB_WORKERS = 0 to leave the queue to the run_skill_matrix_jobs
+management command instead.
+"""
+
+import random
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import SkillMatrixJob
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 1.0  # seconds before the first retry, doubled after each failure
+BACKOFF_MAX = 300.0
+LEASE = timedelta(minutes=10)  # a job 'running' for longer than this is assumed orphaned
+
+
+def backoff(attempts):
+    """Seconds to wait after the given number of failed attempts"""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1))
+    # Jitter, so jobs that hit the same lock together do not retry together
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _due(now):
+    return (Q(status=SkillMatrixJob.PENDING, next_run_at__lte=now)
+            | Q(status=SkillMatrixJob.RUNNING, started_at__lt=now - LEASE))
+
+
+class SkillMatrixJobQueue:
+    def __init__(self, workers=None, poll_interval=5.0):
+        self.workers = workers  # None: SKILL_MATRIX_JOB_WORKERS, default 2
+        self.poll_interval = poll_interval
+        self.threads = []
+        self.running = False
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+
+    def enqueue(self, score):
+        """Queue the skill matrix update for a passing score; None when there is nothing to update"""
+        if not (score.passed and score.skill_id and score.level_id):
+            return None
+        now = timezone.now()
+        job, created = SkillMatrixJob.objects.get_or_create(
+            employee_id=score.employee_id, skill_id=score.skill_id, level_id=score.level_id,
+            defaults={'score': score, 'next_run_at': now},
+        )
+        if not created:
+            jobs = SkillMatrixJob.objects.filter(pk=job.pk)
+            # A pending job keeps its place and its backoff. Anything else runs again; a worker
+            # still running it sees the row re-armed and leaves it pending.
+            if not jobs.filter(status=SkillMatrixJob.PENDING).update(score=score):
+                jobs.update(status=SkillMatrixJob.PENDING, score=score, attempts=0,
+                            next_run_at=now, started_at=None, last_error='')
+        transaction.on_commit(self.start)
+        return job
+
+    def start(self):
+        """Start any missing worker threads and wake them"""
+        workers = self.workers
+        if workers is None:
+            workers = getattr(settings, 'SKILL_MATRIX_JOB_WORKERS', 2)
+        with self.lock:
+            self.threads = [thread for thread in self.threads if thread.is_alive()]
+            self.running = True
+            for n in range(len(self.threads), workers):
+                thread = threading.Thread(target=self._run, name=f'skill-matrix-jobs-{n}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+        self.wakeup.set()
+
+    def stop(self, timeout=5.0):
+        """Stop the workers once their current job is finished"""
+        with self.lock:
+            self.running = False
+            threads, self.threads = self.threads, []
+        self.wakeup.set()
+        for thread in threads:
+            thread.join(timeout)
+
+    def _run(self):
+        try:
+            while self.running:
+                self.wakeup.clear()
+                close_old_connections()
+                try:
+                    ran = self.run_next()
+                except Exception as e:
+                    print(f"❌ Skill matrix worker error: {e}")
+                    ran = False
+                if not ran:
+                    self.wakeup.wait(self.poll_interval)
+        finally:
+            connection.close()
+
+    def run_next(self):
+        """Claim and run one due job in this thread; False when none is due"""
+        now = timezone.now()
+        candidates = SkillMatrixJob.objects.filter(_due(now)).order_by('next_run_at').values_list('id', flat=True)
+        for job_id in candidates[:10]:
+            # Only one worker, in any process, gets to update the row
+            if SkillMatrixJob.objects.filter(_due(now), pk=job_id).update(
+                    status=SkillMatrixJob.RUNNING, started_at=now, attempts=F('attempts') + 1):
+                self._execute(SkillMatrixJob.objects.select_related('score').get(pk=job_id), now)
+                return True
+        return False
+
+    def run_pending(self):
+        """Run every job that is due now in this thread; returns how many ran"""
+        count = 0
+        while self.run_next():
+            count += 1
+        return count
+
+    def _execute(self, job, claimed_at):
+        # Matches only while this worker still owns the job (see enqueue)
+        claimed = SkillMatrixJob.objects.filter(pk=job.pk, status=SkillMatrixJob.RUNNING, started_at=claimed_at)
+        if job.score is None:
+            claimed.update(status=SkillMatrixJob.FAILED, last_error="Score was deleted before the update ran")
+            return
+        try:
+            job.score.update_skill_matrix(max_retries=1, raise_errors=True)
+        except Exception as e:
+            if job.attempts >= MAX_ATTEMPTS:
+                claimed.update(status=SkillMatrixJob.FAILED, last_error=str(e))
+                print(f"❌ Skill matrix job {job.pk} failed after {job.attempts} attempts: {e}")
+            else:
+                delay = backoff(job.attempts)
+                claimed.update(status=SkillMatrixJob.PENDING, last_error=str(e),
+                               next_run_at=timezone.now() + timedelta(seconds=delay))
+                print(f"⚠️  Skill matrix job {job.pk} attempt {job.attempts} failed, retrying in {delay:.1f}s: {e}")
+            return
+        claimed.update(status=SkillMatrixJob.DONE, last_error='')
+
+    def get_statistics(self):
+        counts = dict(SkillMatrixJob.objects.values_list('status').annotate(count=Count('id')).order_by())
+        with self.lock:
+            workers = sum(thread.is_alive() for thread in self.threads)
+        return {
+            'workers': workers,
+            **{status: counts.get(status, 0) for status, _ in SkillMatrixJob.STATUS_CHOICES},
+        }
+
+
+skill_matrix_jobs = SkillMatrixJobQueue()
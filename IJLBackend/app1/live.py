@@ -0,0 +1,121 @@
+"""
+Live feed of ingested key events, pushed to the quiz UI as Server-Sent Events.
+
+The ingest views publish every stored KeyEvent to the process-wide hub after
+their transaction commits. Each open /api/key-events/stream/ response holds a
+bounded subscription to the hub. The KeyEvent primary key is the resume
+cursor: it is sent as the SSE id, so EventSource's automatic reconnect
+(Last-Event-ID) or an explicit ?after= continues exactly where the client
+stopped. Recent events are replayed from the hub's history. Older cursors,
+and subscribers that fell behind, are served from the database by primary
+key.
+
+The hub is per process. When the backend runs several worker processes, a
+stream only sees events ingested by its own process until it resyncs from
+the database, which it does on every heartbeat.
+"""
+
+import itertools
+import queue
+import threading
+from collections import deque
+
+from .models import KeyEvent
+
+
+def key_event_payload(event):
+    return {
+        'id': event.id,
+        'base_id': event.base_id,
+        'key_id': event.key_id,
+        'key_sn': event.key_sn,
+        'mode': event.mode,
+        'info': event.info,
+        'timestamp': event.timestamp.isoformat() if event.timestamp else None,
+        'client_timestamp': event.client_timestamp.isoformat() if event.client_timestamp else None,
+        'event_type': event.event_type,
+    }
+
+
+class Subscription:
+    def __init__(self, hub, max_queue):
+        self.hub = hub
+        self.queue = queue.Queue(maxsize=max_queue)
+        # Set when the queue overflowed; the stream then resyncs from the database
+        self.lagged = False
+
+    def deliver(self, payloads):
+        for payload in payloads:
+            try:
+                self.queue.put_nowait(payload)
+            except queue.Full:
+                self.lagged = True
+                return
+
+    def get(self, timeout):
+        """Everything queued, waiting up to timeout for the first item"""
+        try:
+            items = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class KeyEventHub:
+    def __init__(self, history=2000, subscriber_queue=1000):
+        self.history = deque(maxlen=history)
+        self.subscriber_queue = subscriber_queue
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.published = 0
+
+    def has_subscribers(self):
+        return bool(self.subscribers)
+
+    def subscribe(self):
+        subscription = Subscription(self, self.subscriber_queue)
+        with self.lock:
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def publish(self, events):
+        payloads = sorted((key_event_payload(event) for event in events), key=lambda p: p['id'])
+        if not payloads:
+            return
+        with self.lock:
+            self.history.extend(payloads)
+            subscribers = list(self.subscribers)
+            self.published += len(payloads)
+        for subscription in subscribers:
+            subscription.deliver(payloads)
+
+    def since(self, cursor, limit=1000):
+        """Events after cursor from history, or None when history no longer reaches back that far"""
+        with self.lock:
+            if not self.history or self.history[0]['id'] > cursor + 1:
+                return None
+            return list(itertools.islice((p for p in self.history if p['id'] > cursor), limit))
+
+
+def events_after(cursor, limit=1000):
+    """Events after cursor from the database, in primary key order"""
+    return [key_event_payload(event)
+            for event in KeyEvent.objects.filter(id__gt=cursor).order_by('id')[:limit]]
+
+
+def latest_id():
+    return KeyEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+key_event_hub = KeyEventHub()
@@ -0,0 +1,61 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from app1 import scoring
+
+
+def score_loop(answer_key, answer_lists):
+    """The per-answer loop EndTestSessionView used before app1.scoring, kept for comparison"""
+    results = []
+    for answers in answer_lists:
+        correct_count = 0
+        for i, ans in enumerate(answers):
+            if i < len(answer_key) and ans == answer_key[i]:
+                correct_count += 1
+        percentage = round((correct_count / len(answer_key)) * 100, 2)
+        results.append((correct_count, percentage, percentage >= scoring.PASS_PERCENTAGE))
+    return results
+
+
+class Command(BaseCommand):
+    help = "Time vectorized scoring against the per-answer loop on a synthetic room (no database access)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operators', type=int, default=500)
+        parser.add_argument('--questions', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        operators, questions, repeat = options['operators'], options['questions'], options['repeat']
+        answer_key = rng.integers(0, 4, questions).astype(np.int8)
+        # Mostly-correct answers, some skipped questions and a few short submissions, like a real room
+        answer_lists = []
+        for _ in range(operators):
+            answers = np.where(rng.random(questions) < 0.8, answer_key, rng.integers(0, 4, questions))
+            answers = answers[:rng.integers(questions * 9 // 10, questions + 1)].tolist()
+            answer_lists.append(answers)
+        key_list = answer_key.tolist()
+
+        def best_of(func):
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                result = func()
+                timings.append(time.perf_counter() - started)
+            return min(timings) * 1000, result
+
+        loop_ms, loop_result = best_of(lambda: score_loop(key_list, answer_lists))
+        vector_ms, vector_result = best_of(lambda: scoring.score_answers(answer_key, answer_lists))
+        matrix = scoring.stack_answers(answer_lists, questions)
+        compare_ms, _ = best_of(lambda: scoring.score_matrix(answer_key, matrix))
+
+        same = all((r['marks'], r['percentage'], r['passed']) == l for r, l in zip(vector_result, loop_result))
+        self.stdout.write(f"{operators} operators x {questions} questions, best of {repeat}")
+        self.stdout.write(f"  per-answer loop      {loop_ms:8.2f} ms")
+        self.stdout.write(f"  vectorized (total)   {vector_ms:8.2f} ms  ({loop_ms / vector_ms:.1f}x)")
+        self.stdout.write(f"    of which scoring   {compare_ms:8.2f} ms  (the rest is stacking the answer lists)")
+        self.stdout.write(f"  results identical    {same}")
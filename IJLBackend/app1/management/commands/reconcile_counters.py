@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app1 import counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the service_status/stats counters exactly (run from cron, or with --interval)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Keep running and reconcile every INTERVAL seconds")
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            values = counters.reconcile()
+            self.stdout.write(f"Reconciled {len(values)} counters: {values}")
+            if not interval:
+                return
+            time.sleep(interval)
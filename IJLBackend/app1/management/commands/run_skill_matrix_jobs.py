@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app1.jobs import skill_matrix_jobs
+
+
+class Command(BaseCommand):
+    help = "Run due skill matrix jobs (from cron, or with --interval when the web process runs no workers)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Keep running and check for due jobs every INTERVAL seconds")
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            count = skill_matrix_jobs.run_pending()
+            if count or not interval:
+                self.stdout.write(f"Ran {count} skill matrix jobs: {skill_matrix_jobs.get_statistics()}")
+            if not interval:
+                return
+            time.sleep(interval)
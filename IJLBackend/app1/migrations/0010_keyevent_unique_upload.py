@@ -0,0 +1,27 @@
+from django.db import migrations
+
+# Keep the first copy of every (base_id, key_id, key_sn, client_timestamp) before the unique index.
+# The derived table lets MySQL delete from the table the subquery reads.
+REMOVE_DUPLICATE_KEY_EVENTS = """
+DELETE FROM app1_keyevent WHERE id NOT IN (
+    SELECT id FROM (
+        SELECT MIN(id) AS id FROM app1_keyevent
+        GROUP BY base_id, key_id, key_sn, client_timestamp
+    ) AS first_copies
+)
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0009_dummy_alter_multiskilling_status'),
+    ]
+
+    operations = [
+        migrations.RunSQL(REMOVE_DUPLICATE_KEY_EVENTS, migrations.RunSQL.noop),
+        migrations.AlterUniqueTogether(
+            name='keyevent',
+            unique_together={('base_id', 'key_id', 'key_sn', 'client_timestamp')},
+        ),
+    ]
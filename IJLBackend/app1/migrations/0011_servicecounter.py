@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+def seed_service_counters(apps, schema_editor):
+    """Start every counter from an exact count of the existing rows"""
+    ServiceCounter = apps.get_model('app1', 'ServiceCounter')
+    Device = apps.get_model('app1', 'Device')
+    KeypadEvent = apps.get_model('app1', 'KeypadEvent')
+    VoteSession = apps.get_model('app1', 'VoteSession')
+    counts = {
+        'total_devices': Device.objects.count(),
+        'connected_devices': Device.objects.filter(status='connected').count(),
+        'total_events': KeypadEvent.objects.count(),
+        'unprocessed_events': KeypadEvent.objects.filter(processed=False).count(),
+        'active_vote_sessions': VoteSession.objects.filter(status='active').count(),
+        'total_vote_sessions': VoteSession.objects.count(),
+    }
+    ServiceCounter.objects.bulk_create([ServiceCounter(name=name, value=value) for name, value in counts.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0010_keyevent_unique_upload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(seed_service_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0011_servicecounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testsession',
+            name='room',
+            field=models.CharField(default='default', max_length=50),
+        ),
+        migrations.AlterUniqueTogether(
+            name='testsession',
+            unique_together={('room', 'test_name', 'key_id')},
+        ),
+    ]
@@ -0,0 +1,33 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0012_testsession_room'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkillMatrixJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_run_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app1.operatormaster')),
+                ('level', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app1.level')),
+                ('score', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app1.score')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app1.station')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_run_at'], name='app1_skillm_status_3b9df5_idx')],
+                'unique_together': {('employee', 'skill', 'level')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0013_skillmatrixjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='connectevent',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='voteevent',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
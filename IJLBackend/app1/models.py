@@ -59,6 +59,16 @@ class VoteSession(models.Model):
         ordering = ['-started_at']
 
 
+class ServiceCounter(models.Model):
+    """Running totals behind service_status and stats, kept current by app1.counters"""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    reconciled_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
 # ==========================
 # User Management Models
 # ==========================
@@ -1386,11 +1396,17 @@ class KeyEvent(models.Model):
     event_type = models.CharField(max_length=50)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Idempotency key: a retried upload of the same keypress is ignored
+        unique_together = ('base_id', 'key_id', 'key_sn', 'client_timestamp')
+
 class ConnectEvent(models.Model):
     base_id = models.IntegerField()
     mode = models.IntegerField()
     info = models.CharField(max_length=255)
     timestamp = models.DateTimeField()
+    # Minted by the client outbox; a replayed upload with the same key is not stored twice
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
 
 
 
@@ -1400,6 +1416,8 @@ class VoteEvent(models.Model):
     mode = models.IntegerField()
     info = models.CharField(max_length=255)
     timestamp = models.DateTimeField()
+    # Minted by the client outbox; a replayed upload with the same key is not stored twice
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
 
 # dynamic quesitions 
 
@@ -1428,6 +1446,8 @@ class QuizQuestion(models.Model):
 
 
 class TestSession(models.Model):
+    # Training hall running the quiz; each room has its own remotes and ends its own sessions
+    room = models.CharField(max_length=50, default='default')
     test_name = models.CharField(max_length=100)
     key_id = models.CharField(max_length=10)
     employee = models.ForeignKey(OperatorMaster, on_delete=models.CASCADE)
@@ -1437,10 +1457,10 @@ class TestSession(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ('test_name', 'key_id')
+        unique_together = ('room', 'test_name', 'key_id')
 
     def __str__(self):
-        return f"{self.test_name} - {self.key_id} ({self.employee.full_name})"
+        return f"{self.room}: {self.test_name} - {self.key_id} ({self.employee.full_name})"
 
     @property
     def skill_name(self):
@@ -1479,8 +1499,12 @@ class Score(models.Model):
         """Get level number from Level model"""
         return self.level.name if self.level else None
 
-    def update_skill_matrix(self):
-        """Update OperatorLevel in skill matrix when employee passes exam and cleanup monthly skills"""
+    def update_skill_matrix(self, max_retries=3, raise_errors=False):
+        """Update OperatorLevel in skill matrix when employee passes exam and cleanup monthly skills
+
+        The skill matrix job queue (app1.jobs) calls this with max_retries=1 and
+        raise_errors=True, and does its own retrying with backoff.
+        """
         from django.db import transaction
         import time
         import random
@@ -1498,7 +1522,6 @@ class Score(models.Model):
             return None
 
         # Retry logic for database lock issues
-        max_retries = 3
         for attempt in range(max_retries):
             try:
                 # Add small random delay to prevent simultaneous operations
@@ -1622,6 +1645,8 @@ class Score(models.Model):
                 if "database is locked" in error_msg.lower() and attempt < max_retries - 1:
                     print(f"Database locked, will retry in a moment...")
                     continue
+                elif raise_errors:
+                    raise
                 else:
                     # If it's the last attempt or a different error, log and return
                     import traceback
@@ -1694,6 +1719,42 @@ class Score(models.Model):
         return 1
 
 
+class SkillMatrixJob(models.Model):
+    """Pending skill matrix update for a pass, worked off by app1.jobs
+
+    There is one row per (employee, skill, level). Passing the same test again
+    re-arms the existing row instead of queueing a second update.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    employee = models.ForeignKey(OperatorMaster, on_delete=models.CASCADE)
+    skill = models.ForeignKey(Station, on_delete=models.CASCADE)
+    level = models.ForeignKey(Level, on_delete=models.CASCADE)
+    score = models.ForeignKey(Score, on_delete=models.SET_NULL, null=True, blank=True)  # latest pass
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_run_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('employee', 'skill', 'level')
+        indexes = [models.Index(fields=['status', 'next_run_at'])]
+
+    def __str__(self):
+        return f"{self.employee_id}/{self.skill_id}/{self.level_id} - {self.status}"
+
+
 # Signal handler to automatically update skill matrix when score is created
 @receiver(post_save, sender=Score)
 def update_skill_matrix_on_score_save(sender, instance, created, **kwargs):
@@ -1701,8 +1762,6 @@ def update_skill_matrix_on_score_save(sender, instance, created, **kwargs):
     Automatically update skill matrix when a score is created or updated and employee passes
     Also handles cleanup of monthly skill scheduling after test completion
     """
-    from django.db import transaction
-
     print(f"🔔 Signal triggered for Score {instance.id}: created={created}, passed={instance.passed}")
     print(f"   Employee: {instance.employee.full_name}")
     print(f"   Skill: {instance.skill.skill if instance.skill else 'None'}")
@@ -1711,24 +1770,9 @@ def update_skill_matrix_on_score_save(sender, instance, created, **kwargs):
     # Update skill matrix for both new and updated scores if they pass
     if instance.passed:
         try:
-            # Use transaction.on_commit to ensure the signal runs after the current transaction
-            def update_skill_matrix():
-                try:
-                    result = instance.update_skill_matrix()
-                    if result:
-                        print(f"🎉 Signal: Successfully updated skill matrix for {instance.employee.full_name}")
-                        print(f"   Operation: {result.operation.name}")
-                        print(f"   New Level: {result.level}")
-                        print(f"   Department: {result.skill_matrix.department}")
-                    else:
-                        print(f"⚠️  Signal: Failed to update skill matrix for {instance.employee.full_name}")
-                except Exception as e:
-                    print(f"❌ Signal error: Failed to update skill matrix for score {instance.id}: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
-
-            # Schedule the skill matrix update to run after the current transaction commits
-            transaction.on_commit(update_skill_matrix)
+            # Queued in the score's transaction; a worker thread picks it up after commit
+            from .jobs import skill_matrix_jobs
+            skill_matrix_jobs.enqueue(instance)
         except Exception as e:
             print(f"❌ Signal setup error: {str(e)}")
     else:
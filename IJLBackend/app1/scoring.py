@@ -0,0 +1,69 @@
+"""
+Vectorized quiz scoring.
+
+A paper's answer key is an int8 array of QuizQuestion.correct_index in
+question id order, served from the app1.answer_keys cache. Every participant's answer list is a row of an int8
+matrix, padded with NO_ANSWER. Marks, percentages and pass flags for the
+whole room come out of one comparison. Nothing here depends on a request, so
+management commands (see benchmark_scoring) use the same code as
+EndTestSessionView.
+"""
+
+import itertools
+
+import numpy as np
+
+from . import answer_keys
+
+NO_ANSWER = -1
+PASS_PERCENTAGE = 80
+
+
+def load_answer_key(question_paper):
+    """correct_index of every question on the paper, in the order answers are given (read-only, cached)"""
+    return answer_keys.get(question_paper.id if question_paper is not None else None).correct
+
+
+def _as_index(answer):
+    # Only ints can equal a correct_index, as in the old per-answer comparison; anything else
+    # (None, "B", out of int8 range) is simply wrong
+    if isinstance(answer, int) and 0 <= answer <= 127:
+        return int(answer)
+    return NO_ANSWER
+
+
+def stack_answers(answer_lists, question_count):
+    """One row per participant, NO_ANSWER where an answer is missing; answers past the last question are ignored"""
+    rows = [list(answers or ())[:question_count] for answers in answer_lists]
+    matrix = np.full((len(rows), question_count), NO_ANSWER, dtype=np.int8)
+    flat = list(itertools.chain.from_iterable(rows))
+    if not flat:
+        return matrix
+    # One conversion for the whole room; per-row conversions cost more than the scoring itself
+    values = np.asarray(flat)
+    if values.dtype.kind not in 'iub':
+        # Mixed or non-numeric submissions: check element by element
+        values = np.array([_as_index(answer) for answer in flat])
+    lengths = np.array([len(row) for row in rows])
+    # Row-major boolean indexing fills each row's leading cells in the same order as flat
+    present = np.arange(question_count) < lengths[:, None]
+    matrix[present] = np.where((values >= 0) & (values <= 127), values, NO_ANSWER)
+    return matrix
+
+
+def score_matrix(answer_key, answers, pass_percentage=PASS_PERCENTAGE):
+    """(marks, percentages, passed) arrays for an answers matrix against answer_key"""
+    total = len(answer_key)
+    marks = (answers == answer_key).sum(axis=1) if total else np.zeros(len(answers), dtype=np.int64)
+    percentages = np.round(marks * 100.0 / total, 2) if total else np.zeros(len(answers))
+    return marks, percentages, percentages >= pass_percentage
+
+
+def score_answers(answer_key, answer_lists, pass_percentage=PASS_PERCENTAGE):
+    """Score many answer lists at once; one dict per list, in the same order"""
+    marks, percentages, passed = score_matrix(
+        answer_key, stack_answers(answer_lists, len(answer_key)), pass_percentage)
+    return [
+        {'marks': int(m), 'percentage': float(p), 'passed': bool(ok), 'total_questions': len(answer_key)}
+        for m, p, ok in zip(marks, percentages, passed)
+    ]
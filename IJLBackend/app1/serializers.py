@@ -505,7 +505,7 @@ class TestSessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = TestSession
         fields = [
-            'id', 'test_name', 'key_id', 'employee', 'employee_name',
+            'id', 'room', 'test_name', 'key_id', 'employee', 'employee_name',
             'level', 'skill', 'skill_name', 'level_number',
             'question_paper', 'created_at'
         ]
@@ -1623,6 +1623,15 @@ class KeyEventSerializer(serializers.ModelSerializer):
         model = KeyEvent
         fields = '__all__'
 
+
+class KeyEventBulkItemSerializer(serializers.ModelSerializer):
+    """Field validation only; duplicates are resolved by the bulk view in one query"""
+    class Meta:
+        model = KeyEvent
+        fields = '__all__'
+        # Skip the per-item unique_together query; bulk_create ignores conflicts instead
+        validators = []
+
 class ConnectEventSerializer(serializers.ModelSerializer):
     class Meta:
         model = ConnectEvent
@@ -1661,10 +1670,13 @@ class TestSessionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = TestSession
-        fields = ['id', 'key_id', 'employee', 'employee_name', 'level', 'level_name', 'skill', 'skill_name']
+        fields = ['id', 'room', 'key_id', 'employee', 'employee_name', 'level', 'level_name', 'skill', 'skill_name']
+
+
 
 
 
+from . import answer_keys
 
 
 class ScoreSerializer(serializers.ModelSerializer):
@@ -1685,8 +1697,9 @@ class ScoreSerializer(serializers.ModelSerializer):
         return (obj.marks / total) * 100 if total > 0 else 0
 
     def get_total_questions(self, obj):
-        if obj.test:
-            return obj.test.questions.count()
+        # From the answer key cache: no query per score row
+        if obj.test_id:
+            return answer_keys.get(obj.test_id).count
         return 0
 
 
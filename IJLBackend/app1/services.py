@@ -1,42 +1,150 @@
 import ctypes
+import random
 import threading
 import time
 from ctypes import c_int, c_char_p, c_void_p, POINTER, CFUNCTYPE
 from django.utils import timezone
-from django.db import transaction
+from django.db import close_old_connections, connection, transaction
 from .models import Device, KeypadEvent, VoteSession
-from core.easy_test import EasyTest
+from . import counters
+from core.easy_test import EasyTest, NO_ANSWER
 import logging
 
 logger = logging.getLogger(__name__)
 
+class KeypadEventWriter:
+    """Micro-batching writer for KeypadEvent rows.
+
+    add() only appends to an in-memory batch. A writer thread flushes the batch
+    every flush_interval seconds (or as soon as batch_size rows are waiting)
+    with one bulk_create in one transaction. A keypress then costs the database
+    a share of a batch instead of its own transaction.
+    """
+
+    def __init__(self, flush_interval=0.005, batch_size=500, on_row_error=None):
+        self.flush_interval = flush_interval
+        self.on_row_error = on_row_error
+        self.batch_size = batch_size
+        self.pending = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = True
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_ms = 0.0
+        self.thread = threading.Thread(target=self._run, name='keypad-event-writer', daemon=True)
+        self.thread.start()
+
+    def add(self, event):
+        with self.lock:
+            self.pending.append(event)
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.wakeup.set()
+
+    def _run(self):
+        try:
+            while self.running:
+                self.wakeup.wait(self.flush_interval)
+                self.wakeup.clear()
+                self.flush()
+            self.flush()
+        finally:
+            connection.close()
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if not batch:
+            return
+        close_old_connections()
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                KeypadEvent.objects.bulk_create(batch, batch_size=self.batch_size)
+                # bulk_create skips post_save, so count the batch here, in the same transaction
+                counters.record_bulk_insert(KeypadEvent, batch)
+            self.written += len(batch)
+        except Exception as e:
+            # One bad row (e.g. a device deleted since it was cached) must not cost the whole batch
+            logger.error(f"Bulk insert of {len(batch)} keypad events failed, retrying one by one: {e}")
+            for event in batch:
+                try:
+                    event.save()
+                    self.written += 1
+                except Exception as row_error:
+                    self.failed += 1
+                    logger.error(f"Error saving keypad event {event.key_sn}: {row_error}")
+                    if self.on_row_error:
+                        self.on_row_error(event)
+        self.batches += 1
+        self.last_batch_ms = (time.perf_counter() - started) * 1000
+
+    def stop(self, timeout=5.0):
+        """Write out whatever is buffered and stop the thread"""
+        self.running = False
+        self.wakeup.set()
+        self.thread.join(timeout)
+
+    def get_statistics(self):
+        with self.lock:
+            pending = len(self.pending)
+        return {
+            'pending': pending,
+            'written': self.written,
+            'failed': self.failed,
+            'batches': self.batches,
+            'last_batch_ms': round(self.last_batch_ms, 2),
+        }
+
+
 class DjangoEasyTestHandler(EasyTest):
     def __init__(self):
+        # Both exist before super() connects, since key events may arrive right away
+        self.devices = {}  # base_id -> Device, refreshed whenever _on_connect saves one
+        self.base_listener = None  # RemoteDataService's hook for connect/liveness signals
+        self.persist_key_events = True  # off in batch result mode, where answers are pulled per question
+        self.event_writer = KeypadEventWriter(
+            on_row_error=lambda event: self.devices.pop(event.device.base_id, None))
         super().__init__()
         self.running = False
         self.connection_attempts = 0
         self.max_connection_attempts = 5
 
+    def _notify_base(self, kind, base_id, info=''):
+        listener = self.base_listener
+        if listener is not None:
+            try:
+                listener(kind, base_id, info)
+            except Exception as e:
+                logger.error(f"Error in base listener for base {base_id}: {e}")
+
     def _on_connect(self, base_id, mode, info):
+        self._notify_base('connect', base_id, info.decode() if info else '')
         super()._on_connect(base_id, mode, info)
-        logger.info(f"📡 Device Connected: ID={base_id}, Mode={mode.decode()}, Info={info.decode()}")
+        # mode arrives as a c_int, only info is a c_char_p
+        mode_str = str(mode)
+        logger.info(f"📡 Device Connected: ID={base_id}, Mode={mode_str}, Info={info.decode()}")
         
         try:
             with transaction.atomic():
                 device, created = Device.objects.get_or_create(
                     base_id=base_id,
                     defaults={
-                        'mode': mode.decode() if mode else '',
+                        'mode': mode_str,
                         'info': info.decode() if info else '',
                         'status': 'connected'
                     }
                 )
                 
                 if not created:
-                    device.mode = mode.decode() if mode else ''
+                    device.mode = mode_str
                     device.info = info.decode() if info else ''
                     device.status = 'connected'
                     device.save()
+
+                self.devices[base_id] = device
                 
                 # Auto-start vote if info is "1"
                 if info.decode() == "1":
@@ -54,43 +162,66 @@ class DjangoEasyTestHandler(EasyTest):
                 logger.info(f"Device {base_id} {'created' if created else 'updated'} in database")
                 
         except Exception as e:
+            self.devices.pop(base_id, None)
             logger.error(f"Error handling device connection: {e}")
 
-    def _on_key(self, base_id, key_id, key_sn, mode, timestamp, info):
+    def _on_vote(self, base_id, mode, info):
+        self._notify_base('seen', base_id)
+        super()._on_vote(base_id, mode, info)
+
+    def _on_hd_param(self, base_id, mode, info):
+        # Also the reply to RemoteDataService's heartbeat probe
+        self._notify_base('seen', base_id)
+        super()._on_hd_param(base_id, mode, info)
+
+    def _device(self, base_id):
+        device = self.devices.get(base_id)
+        if device is None:
+            device = self.devices[base_id] = Device.objects.get(base_id=base_id)
+        return device
+
+    def _handle_key(self, base_id, key_id, key_sn, mode, timestamp, info):
+        # Called on the key consumer thread, not the SDK callback thread
+        self._notify_base('seen', base_id)
+        if not self.persist_key_events:
+            return
         key_sn_str = key_sn.decode() if key_sn else ''
         info_str = info.decode().strip() if info else ''
-        mode_str = info.decode() if mode else ''
+        mode_str = str(mode)
 
         logger.info(f"🧭 Keypad Event: BaseID={base_id}, KeyID={key_id}, SN={key_sn_str}, Info={repr(info_str)}, Time={timestamp}")
 
         try:
-            with transaction.atomic():
-                device = Device.objects.get(base_id=base_id)
-                
-                KeypadEvent.objects.create(
-                    device=device,
-                    key_id=key_id,
-                    key_sn=key_sn_str,
-                    mode=mode_str,
-                    timestamp=timestamp,
-                    info=info_str,
-                    processed=False
-                )
-                
-                logger.info(f"Keypad event saved for device {base_id}")
-                
+            self.event_writer.add(KeypadEvent(
+                device=self._device(base_id),
+                key_id=key_id,
+                key_sn=key_sn_str,
+                mode=mode_str,
+                timestamp=timestamp,
+                info=info_str,
+                processed=False
+            ))
         except Device.DoesNotExist:
             logger.error(f"Device with base_id {base_id} not found in database")
         except Exception as e:
             logger.error(f"Error saving keypad event: {e}")
 
+    def stop_key_consumer(self, timeout=5.0):
+        super().stop_key_consumer(timeout)
+        self.event_writer.stop(timeout)
+
+    def get_key_statistics(self):
+        stats = super().get_key_statistics()
+        stats['writer'] = self.event_writer.get_statistics()
+        return stats
+
     def connect_with_retry(self, base_id, mode):
         """Try to connect with retry logic"""
         for attempt in range(self.max_connection_attempts):
             try:
                 logger.info(f"Connection attempt {attempt + 1}/{self.max_connection_attempts}")
                 result = self.connect(base_id, mode)
-                if result:  # Assuming connect returns True on success
+                if result == 0:  # The SDK returns 0 on success, an error code otherwise
                     logger.info("Connection successful!")
                     return True
                 else:
@@ -103,42 +234,159 @@ class DjangoEasyTestHandler(EasyTest):
         logger.error("All connection attempts failed")
         return False
 
-class RemoteDataService:
+class ResultCollector:
+    """Answer vectors pulled with GetMultiResultByID, one per question of the running test.
+
+    Each vector holds an answer index per key_id (NO_ANSWER for silence).
+    answers_by_key() turns the columns back into the {key_id: [answers]} shape
+    EndTestSessionView scores, so a whole test is scored in one go.
+    """
+
     def __init__(self):
+        self.questions = []
+        self.lock = threading.Lock()
+
+    def store(self, answers, question_index=None):
+        """Keep answers for question_index (0-based), or as the next question; returns the index used"""
+        with self.lock:
+            if question_index is None:
+                question_index = len(self.questions)
+            while len(self.questions) <= question_index:
+                self.questions.append(None)
+            self.questions[question_index] = answers
+            return question_index
+
+    def answers_by_key(self):
+        with self.lock:
+            questions = list(self.questions)
+        key_count = max((len(answers) for answers in questions if answers is not None), default=0)
+        return {
+            str(key_id): [answers[key_id - 1] if answers is not None and key_id <= len(answers) else NO_ANSWER
+                          for answers in questions]
+            for key_id in range(1, key_count + 1)
+        }
+
+    def has_answers(self):
+        """True once any stored question has at least one answer"""
+        with self.lock:
+            return any(answer != NO_ANSWER for answers in self.questions if answers is not None for answer in answers)
+
+    def reset(self):
+        with self.lock:
+            self.questions = []
+
+    def __len__(self):
+        return len(self.questions)
+
+
+class BaseConnection:
+    """Connection state of one receiver base, as tracked by RemoteDataService"""
+
+    def __init__(self, base_id, mode):
+        self.base_id = base_id
+        self.mode = mode
+        self.state = 'pending'  # pending, connecting, connected, backoff, stale
+        self.attempts = 0
+        self.next_attempt_at = time.monotonic()
+        self.connect_started_at = None
+        self.last_seen = None
+        self.probe_sent_at = None
+        self.connected_since = None
+        self.last_error = None
+
+    def as_dict(self):
+        now = time.monotonic()
+        return {
+            'base_id': self.base_id,
+            'mode': self.mode,
+            'state': self.state,
+            'attempts': self.attempts,
+            'retry_in_s': round(max(0.0, self.next_attempt_at - now), 1) if self.state == 'backoff' else None,
+            'last_seen_s_ago': round(now - self.last_seen, 1) if self.last_seen is not None else None,
+            'connected_for_s': round(now - self.connected_since, 1) if self.connected_since is not None else None,
+            'last_error': self.last_error,
+        }
+
+
+class RemoteDataService:
+    """Keeps any number of receiver bases connected through one SDK handle.
+
+    start_service and reconnect only record what should be connected and
+    return at once. A manager thread does the connecting:
+    - It issues Connect calls for bases that are due.
+    - The SDK's connect callback decides when a base counts as connected.
+    - A base that does not come up within connect_timeout is retried with
+      exponential backoff.
+    - Any callback from a base (key, vote, parameter) counts as a sign of
+      life. A base that is silent for heartbeat_interval is probed with
+      ReadHDParam. One that stays silent for heartbeat_timeout is marked
+      stale and reconnected.
+    Progress per base is reported by get_status.
+    """
+
+    HEARTBEAT_PARAM_MODE = 1
+
+    def __init__(self, tick=0.5, connect_timeout=15.0, heartbeat_interval=10.0, heartbeat_timeout=30.0,
+                 base_backoff=1.0, max_backoff=60.0):
+        self.tick = tick
+        self.connect_timeout = connect_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
         self.sdk = None
         self.thread = None
         self.running = False
-        self.connection_status = "disconnected"
+        self.bases = {}  # base_id -> BaseConnection
+        self.lock = threading.RLock()
+        self.wakeup = threading.Event()
         self.last_error = None
+        self.result_mode = 'callback'
+        self.results = {}  # room -> ResultCollector
 
-    def start_service(self, base_id=1, mode="auto"):
-        if self.running:
-            logger.warning("Service is already running")
-            return False
+    @property
+    def connection_status(self):
+        """One word for all bases together, for callers written against a single base"""
+        with self.lock:
+            states = {conn.state for conn in self.bases.values()}
+        if not self.running:
+            return "disconnected"
+        if states == {'connected'}:
+            return "connected"
+        if 'connected' in states:
+            return "degraded"
+        return "connecting"
 
+    def start_service(self, base_id=1, mode="auto", base_ids=None, result_mode=None):
+        """Schedule connections to the given bases; returns False if there was nothing new to start.
+
+        result_mode 'batch' stops persisting every keypress; answers are then
+        collected per question with pull_question_results.
+        """
+        base_ids = list(base_ids) if base_ids else [base_id]
         try:
-            self.sdk = DjangoEasyTestHandler()
-            self.connection_status = "connecting"
-            
-            # Try to connect with retry logic
-            if self.sdk.connect_with_retry(base_id, mode):
-                self.running = True
-                self.connection_status = "connected"
-                self.last_error = None
-                
-                # Start monitoring in a separate thread
-                self.thread = threading.Thread(target=self._monitor_loop, daemon=True)
-                self.thread.start()
-                
-                logger.info("🔄 Remote data service started successfully")
-                return True
-            else:
-                self.connection_status = "failed"
-                self.last_error = "Failed to connect after multiple attempts"
-                return False
-                
+            with self.lock:
+                if result_mode:
+                    self.result_mode = result_mode
+                new = [b for b in base_ids if b not in self.bases]
+                if self.running and not new:
+                    logger.warning("Service is already running")
+                    return False
+                if self.sdk is None:
+                    self.sdk = DjangoEasyTestHandler()
+                    self.sdk.base_listener = self._on_base_event
+                self.sdk.persist_key_events = self.result_mode != 'batch'
+                for b in new:
+                    self.bases[b] = BaseConnection(b, mode)
+                if not self.running:
+                    self.running = True
+                    self.thread = threading.Thread(target=self._manage_loop, name='base-manager', daemon=True)
+                    self.thread.start()
+            self.last_error = None
+            self.wakeup.set()
+            logger.info(f"🔄 Remote data service connecting to base(s) {new}")
+            return True
         except Exception as e:
-            self.connection_status = "error"
             self.last_error = str(e)
             logger.error(f"Failed to start remote data service: {e}")
             return False
@@ -148,50 +396,196 @@ class RemoteDataService:
             return True
 
         self.running = False
-        self.connection_status = "disconnected"
-        
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.thread = None
+
         if self.sdk:
-            # Add cleanup code here if your EasyTest class supports it
-            try:
-                # If your EasyTest has a disconnect method, call it here
-                # self.sdk.disconnect()
-                pass
-            except Exception as e:
-                logger.error(f"Error during disconnect: {e}")
-            
+            # Persist key events already buffered before dropping the handler
+            self.sdk.stop_key_consumer()
+            with self.lock:
+                bases = list(self.bases.values())
+                self.bases.clear()
+            for conn in bases:
+                try:
+                    self.sdk.disconnect(conn.base_id)
+                except Exception as e:
+                    logger.error(f"Error disconnecting base {conn.base_id}: {e}")
+            self.sdk.base_listener = None
+            self.sdk = None
+
         logger.info("🛑 Remote data service stopped")
         return True
 
-    def _monitor_loop(self):
-        """Keep the service running and monitor connection"""
+    def reconnect(self, base_id=None, mode=None):
+        """Force a fresh connection to one base (or all) on the manager's next tick"""
+        if not self.running:
+            return self.start_service(base_id or 1, mode or "auto")
+        with self.lock:
+            if base_id is not None and base_id not in self.bases:
+                self.bases[base_id] = BaseConnection(base_id, mode or "auto")
+            targets = [self.bases[base_id]] if base_id is not None else list(self.bases.values())
+            for conn in targets:
+                if mode:
+                    conn.mode = mode
+                conn.state = 'pending'
+                conn.attempts = 0
+                conn.next_attempt_at = time.monotonic()
+        self.wakeup.set()
+        return True
+
+    def _on_base_event(self, kind, base_id, info):
+        """Connect and liveness signals from the SDK callbacks; runs on SDK or consumer threads"""
+        now = time.monotonic()
+        with self.lock:
+            conn = self.bases.get(base_id)
+            if conn is None:
+                if not self.running:
+                    return
+                # A base that came up without being asked for is managed from now on
+                conn = self.bases[base_id] = BaseConnection(base_id, "auto")
+            conn.last_seen = now
+            conn.probe_sent_at = None
+            if kind != 'connect':
+                return
+            if info == "1":
+                if conn.state != 'connected':
+                    logger.info(f"✅ Base {base_id} connected after {conn.attempts} attempt(s)")
+                conn.state = 'connected'
+                conn.attempts = 0
+                conn.connected_since = now
+                conn.last_error = None
+            elif info == "0":
+                self._schedule_retry(conn, "base reported disconnect")
+            elif conn.state != 'connected':
+                if conn.state != 'connecting':
+                    conn.connect_started_at = now
+                conn.state = 'connecting'
+
+    def _schedule_retry(self, conn, reason):
+        delay = min(self.max_backoff, self.base_backoff * 2 ** max(0, conn.attempts - 1))
+        conn.state = 'backoff'
+        conn.connected_since = None
+        conn.last_error = reason
+        # Jitter so bases that dropped together do not reconnect in lockstep
+        conn.next_attempt_at = time.monotonic() + delay * random.uniform(0.5, 1.0)
+        logger.warning(f"Base {conn.base_id}: {reason}, retrying in {delay:.0f}s")
+
+    def _manage_loop(self):
         try:
             while self.running:
-                # Add health check here if your EasyTest supports it
-                # You might want to ping the device periodically
-                time.sleep(1)
-        except Exception as e:
-            logger.error(f"Error in monitor loop: {e}")
-            self.running = False
-            self.connection_status = "error"
-            self.last_error = str(e)
+                # Dropping a stale base touches the database
+                close_old_connections()
+                try:
+                    self._tick()
+                except Exception as e:
+                    self.last_error = str(e)
+                    logger.error(f"Error in base manager: {e}")
+                self.wakeup.wait(self.tick)
+                self.wakeup.clear()
+        finally:
+            connection.close()
+
+    def _tick(self):
+        """Decide what every base needs under the lock, then make the SDK calls outside it"""
+        now = time.monotonic()
+        to_connect, to_probe, to_drop = [], [], []
+        with self.lock:
+            for conn in self.bases.values():
+                if conn.state in ('pending', 'backoff', 'stale') and now >= conn.next_attempt_at:
+                    conn.state = 'connecting'
+                    conn.attempts += 1
+                    conn.connect_started_at = now
+                    to_connect.append((conn.base_id, conn.mode))
+                elif conn.state == 'connecting' and now - conn.connect_started_at > self.connect_timeout:
+                    self._schedule_retry(conn, f"no connect callback within {self.connect_timeout:.0f}s")
+                elif conn.state == 'connected':
+                    silent = now - (conn.last_seen or conn.connected_since)
+                    if silent > self.heartbeat_timeout:
+                        self._schedule_retry(conn, f"silent for {silent:.0f}s")
+                        conn.state = 'stale'
+                        to_drop.append(conn.base_id)
+                    elif silent > self.heartbeat_interval and conn.probe_sent_at is None:
+                        conn.probe_sent_at = now
+                        to_probe.append(conn.base_id)
+
+        for base_id in to_drop:
+            try:
+                self.sdk.disconnect(base_id)
+                device = Device.objects.filter(base_id=base_id).first()
+                if device is not None:
+                    # save() rather than update() so the connected_devices counter follows
+                    device.status = 'disconnected'
+                    device.save(update_fields=['status', 'updated_at'])
+                    self.sdk.devices.pop(base_id, None)
+            except Exception as e:
+                logger.error(f"Error dropping stale base {base_id}: {e}")
+        for base_id in to_probe:
+            try:
+                self.sdk.lib.ReadHDParam(base_id, self.HEARTBEAT_PARAM_MODE)
+            except Exception as e:
+                logger.error(f"Heartbeat probe to base {base_id} failed: {e}")
+        for base_id, mode in to_connect:
+            logger.info(f"Connecting base {base_id} (mode={mode})")
+            try:
+                result = self.sdk.connect(base_id, mode)
+            except Exception as e:
+                result = str(e)
+            if result != 0:  # The SDK returns 0 on success, an error code otherwise
+                with self.lock:
+                    conn = self.bases.get(base_id)
+                    if conn is not None:
+                        self._schedule_retry(conn, f"Connect returned {result}")
+
+    def results_for(self, room):
+        with self.lock:
+            collector = self.results.get(room)
+            if collector is None:
+                collector = self.results[room] = ResultCollector()
+            return collector
+
+    def pull_question_results(self, key_count, question_index=None, room='default', allow_empty=False):
+        """Pull every connected base's answers for the current question and store them as one vector.
+
+        Key ids are matched across bases the way TestSession matches them, by
+        key_id alone; the first base with an answer for a key wins. A vector
+        without a single answer usually means the pull happened at the wrong
+        time, so it is refused (RuntimeError) unless allow_empty is set.
+        """
+        if not self.sdk:
+            raise RuntimeError("Remote data service is not running")
+        with self.lock:
+            base_ids = sorted(b for b, conn in self.bases.items() if conn.state == 'connected')
+        merged = None
+        for base_id in base_ids:
+            answers = self.sdk.pull_results(base_id, key_count)
+            if merged is None:
+                merged = answers
+            else:
+                for i, answer in enumerate(answers):
+                    if merged[i] == NO_ANSWER:
+                        merged[i] = answer
+        if merged is None:
+            raise RuntimeError("No connected base to pull results from")
+        if not allow_empty and all(answer == NO_ANSWER for answer in merged):
+            raise RuntimeError("No remote has answered this question; pass allow_empty to store it anyway")
+        return self.results_for(room).store(merged, question_index), merged
 
     def get_status(self):
+        with self.lock:
+            bases = [conn.as_dict() for conn in sorted(self.bases.values(), key=lambda c: c.base_id)]
+        counts = counters.read()
         return {
             'running': self.running,
             'connection_status': self.connection_status,
             'last_error': self.last_error,
-            'connected_devices': Device.objects.filter(status='connected').count(),
-            'total_events': KeypadEvent.objects.count(),
-            'active_vote_sessions': VoteSession.objects.filter(status='active').count()
+            'bases': bases,
+            **{name: counts[name] for name in ('connected_devices', 'total_events', 'active_vote_sessions')},
+            'key_buffer': self.sdk.get_key_statistics() if self.sdk else None,
+            'result_mode': self.result_mode,
+            'questions_collected': {room: len(collector) for room, collector in self.results.items()},
         }
 
-    def reconnect(self, base_id=1, mode="auto"):
-        """Force reconnection"""
-        if self.running:
-            self.stop_service()
-            time.sleep(1)
-        
-        return self.start_service(base_id, mode)
-
 # Global service instance
-remote_service = RemoteDataService()
\ No newline at end of file
+remote_service = RemoteDataService()
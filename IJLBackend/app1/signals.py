@@ -3,7 +3,7 @@ Django signals for automatic notification generation
 Handles real-time notification triggers for various system events
 """
 
-from django.db.models.signals import post_save, post_delete, pre_save
+from django.db.models.signals import post_save, post_delete, pre_save, post_init
 from django.dispatch import receiver
 from django.utils import timezone
 from django.contrib.auth import get_user_model
@@ -11,8 +11,9 @@ from .models import (
     Notification, OperatorMaster, Test, OperatorTestAssignment,
     OperatorSkillLevel, MachineAllocation, TrainingContent,
     LevelTwoTrainingContent, Schedule, OperatorPerformanceEvaluation,
-    MultiSkilling, User
+    MultiSkilling, User, Device, KeypadEvent, VoteSession, QuizQuestion
 )
+from . import answer_keys, counters
 from .consumers import broadcast_notification_to_user, broadcast_notification_count_to_user
 
 User = get_user_model()
@@ -345,3 +346,52 @@ def cleanup_old_notifications(sender, instance, created, **kwargs):
                 Notification.objects.filter(
                     id__in=[n.id for n in old_notifications]
                 ).delete()
+
+
+# Service counters (see app1.counters)
+@receiver(post_init, sender=Device)
+@receiver(post_init, sender=KeypadEvent)
+@receiver(post_init, sender=VoteSession)
+def remember_counted_values(sender, instance, **kwargs):
+    """Note the tracked fields as loaded, so a later save can tell which counters it moves"""
+    instance._counted_values = counters.tracked_values(instance)
+
+
+@receiver(post_save, sender=Device)
+@receiver(post_save, sender=KeypadEvent)
+@receiver(post_save, sender=VoteSession)
+def update_service_counters(sender, instance, created, **kwargs):
+    """Adjust the counters for an inserted row or a tracked field change"""
+    new_values = counters.tracked_values(instance)
+    if created:
+        counters.apply(counters.deltas_for_change(sender, None, new_values))
+    elif instance._counted_values is not None and new_values is not None:
+        counters.apply(counters.deltas_for_change(sender, instance._counted_values, new_values))
+    instance._counted_values = new_values
+
+
+# No post_delete for KeypadEvent: a receiver would stop Django from fast-deleting
+# events in bulk. reconcile_counters picks those deletes up instead.
+@receiver(post_delete, sender=Device)
+@receiver(post_delete, sender=VoteSession)
+def release_service_counters(sender, instance, **kwargs):
+    old_values = instance._counted_values or counters.tracked_values(instance)
+    if old_values is not None:
+        counters.apply(counters.deltas_for_change(sender, old_values, None))
+
+
+# Answer key cache (see app1.answer_keys)
+@receiver(post_init, sender=QuizQuestion)
+def remember_question_paper(sender, instance, **kwargs):
+    instance._loaded_paper_id = instance.__dict__.get('question_paper_id')
+
+
+@receiver(post_save, sender=QuizQuestion)
+@receiver(post_delete, sender=QuizQuestion)
+def invalidate_answer_key(sender, instance, **kwargs):
+    """Drop the compiled key of the question's paper, and of its old paper if it was moved"""
+    answer_keys.invalidate(instance.question_paper_id)
+    if instance._loaded_paper_id != instance.question_paper_id:
+        answer_keys.invalidate(instance._loaded_paper_id)
+    instance._loaded_paper_id = instance.question_paper_id
+
@@ -1,11 +1,26 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.db import transaction
 from .models import (
     OperatorMaster, SkillMatrix, Section, OperationList, OperatorLevel,
     MultiSkilling, MonthlySkill, Station, Level, Score, QuizQuestionPaper,
-    HQ, Factory, Department, Line
+    HQ, Factory, Department, Line, KeyEvent, Device, KeypadEvent, VoteSession,
+    QuizQuestion, TestSession, SkillMatrixJob, ConnectEvent
 )
+from . import answer_keys, counters
+from .services import KeypadEventWriter, RemoteDataService, ResultCollector, remote_service
+from core.easy_test import ANSWER_LETTERS, NO_ANSWER, EasyTest, parse_multi_result
+from core.fake_sdk import FakeEasyTestLib
+from core.key_ring import KeyEventConsumer, KeyEventRing
+from .jobs import skill_matrix_jobs
+from .live import key_event_hub
+from django.utils import timezone
+from datetime import timedelta
 from datetime import date, datetime
+import ctypes
+import json
+import threading
+import time
+from unittest import mock
 
 
 class SkillMatrixUpdateTestCase(TestCase):
@@ -236,3 +251,635 @@ class SkillMatrixUpdateTestCase(TestCase):
         """Clean up test data"""
         # Clean up is handled automatically by Django test framework
         pass
+
+
+class KeyEventBulkCreateTestCase(TestCase):
+    """Bulk key event ingestion is idempotent on (base_id, key_id, key_sn, client_timestamp)"""
+
+    def event(self, key_id, info="A"):
+        return {
+            'base_id': 1,
+            'key_id': key_id,
+            'key_sn': f"SN{key_id:03d}",
+            'mode': 1,
+            'timestamp': "2026-10-18T09:00:00Z",
+            'info': info,
+            'client_timestamp': f"2026-10-18T09:00:{key_id:02d}Z",
+            'event_type': 'real_hardware',
+        }
+
+    def test_retry_does_not_duplicate(self):
+        events = [self.event(key_id) for key_id in range(1, 6)]
+        response = self.client.post('/api/key-events/bulk/', data=json.dumps(events),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 5)
+
+        # Same batch again plus one new event, as a client retry after a lost response would send
+        response = self.client.post('/api/key-events/bulk/', data=json.dumps(events + [self.event(6)]),
+                                    content_type='application/json')
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual(response.json()['duplicates'], 5)
+        self.assertEqual(KeyEvent.objects.count(), 6)
+
+    def test_ndjson_with_invalid_item(self):
+        bad = self.event(2)
+        del bad['base_id']
+        body = "\n".join(json.dumps(item) for item in [self.event(1), bad, self.event(3)])
+        response = self.client.post('/api/key-events/bulk/', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertIn('1', response.json()['errors'])
+        self.assertEqual(KeyEvent.objects.count(), 2)
+
+
+class EventReplayTestCase(TestCase):
+    """An outbox replay with the same Idempotency-Key is acknowledged without storing the event again"""
+
+    def test_connect_event_replay(self):
+        event = {'base_id': 1, 'mode': 1, 'info': "1", 'timestamp': "2026-10-18T09:00:00Z",
+                 'idempotency_key': "a" * 32}
+        for expected in (201, 200):
+            response = self.client.post('/api/connect-events/create/', data=json.dumps(event),
+                                        content_type='application/json', HTTP_IDEMPOTENCY_KEY="a" * 32)
+            self.assertEqual(response.status_code, expected)
+        self.assertEqual(ConnectEvent.objects.count(), 1)
+
+
+class ServiceCounterTestCase(TestCase):
+    """Counters behind /api/stats/ follow saves and are repaired by reconcile()"""
+
+    def test_counters_follow_saves(self):
+        device = Device.objects.create(base_id=1, mode='1', status='connected')
+        KeypadEvent.objects.create(device=device, key_id=1, key_sn='SN1', mode='1', timestamp=0)
+        counters.record_bulk_insert(KeypadEvent, KeypadEvent.objects.bulk_create([
+            KeypadEvent(device=device, key_id=k, key_sn=f'SN{k}', mode='1', timestamp=0) for k in (2, 3)
+        ]))
+        session = VoteSession.objects.create(device=device, session_id=0, duration=10, config='')
+
+        device = Device.objects.get(pk=device.pk)
+        device.status = 'disconnected'
+        device.save()
+        session.status = 'stopped'
+        session.save()
+
+        stats = self.client.get('/api/stats/').json()
+        self.assertEqual(stats['total_devices'], 1)
+        self.assertEqual(stats['connected_devices'], 0)
+        self.assertEqual(stats['total_events'], 3)
+        self.assertEqual(stats['unprocessed_events'], 3)
+        self.assertEqual(stats['active_vote_sessions'], 0)
+        self.assertEqual(stats['total_vote_sessions'], 1)
+
+    def test_reconcile_repairs_drift(self):
+        device = Device.objects.create(base_id=2, mode='1', status='connected')
+        KeypadEvent.objects.create(device=device, key_id=1, key_sn='SN1', mode='1', timestamp=0)
+        # Writes that bypass signals leave the counters behind
+        KeypadEvent.objects.update(processed=True)
+        Device.objects.update(status='disconnected')
+        self.assertEqual(counters.read()['unprocessed_events'], 1)
+
+        counters.reconcile()
+        self.assertEqual(counters.read()['unprocessed_events'], 0)
+        self.assertEqual(counters.read()['connected_devices'], 0)
+        self.assertEqual(counters.read()['total_events'], 1)
+
+
+class KeyEventStreamTestCase(TestCase):
+    """The SSE feed replays from a cursor and then carries newly published events"""
+
+    def make_event(self, key_id, base_id=1):
+        now = timezone.now()
+        return KeyEvent.objects.create(base_id=base_id, key_id=key_id, key_sn=f"SN{key_id}", mode=1,
+                                       timestamp=now, info="A", event_type='real_hardware',
+                                       client_timestamp=now + timedelta(seconds=key_id))
+
+    def read_events(self, chunks, count):
+        events = []
+        for chunk in chunks:
+            text = chunk.decode()
+            if text.startswith(': heartbeat'):
+                break  # nothing more arrived within a heartbeat interval
+            if 'event: key_event' in text:
+                events.append(json.loads(text.split('data: ', 1)[1]))
+                if len(events) == count:
+                    return events
+        return events
+
+    def test_resume_after_cursor(self):
+        first = self.make_event(1)
+        self.make_event(2)
+        self.make_event(3, base_id=2)
+        response = self.client.get(f'/api/key-events/stream/?after={first.id}&base_id=1')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = iter(response.streaming_content)
+        events = self.read_events(chunks, 1)
+        self.assertEqual([e['key_id'] for e in events], [2])
+
+        # A live event goes out without another request
+        key_event_hub.publish([self.make_event(4)])
+        self.assertEqual([e['key_id'] for e in self.read_events(chunks, 1)], [4])
+        response.close()
+
+    def test_resume_more_than_a_page_back(self):
+        key_event_hub.history.clear()  # ids from earlier tests' rolled-back events
+        now = timezone.now()
+        events = KeyEvent.objects.bulk_create([
+            KeyEvent(base_id=1, key_id=i, key_sn=f"SN{i}", mode=1, timestamp=now, info="A",
+                     event_type='real_hardware', client_timestamp=now + timedelta(seconds=i))
+            for i in range(1501)
+        ])
+        key_event_hub.publish(events)
+        response = self.client.get(f'/api/key-events/stream/?after={events[0].id}')
+        chunks = iter(response.streaming_content)
+        next(chunks)  # subscribed; a live event now must not cut the replay short
+        key_event_hub.publish([self.make_event(5000)])
+        received = self.read_events(chunks, 1501)
+        self.assertEqual([e['key_id'] for e in received], list(range(1, 1501)) + [5000])
+        response.close()
+
+
+class EndTestSessionScoringTestCase(TestCase):
+    """The whole room is scored against the paper's answer key in one pass"""
+
+    def test_room_scores(self):
+        paper = QuizQuestionPaper.objects.create(name="Scoring Paper")
+        for i, correct in enumerate([0, 1, 2, 3, 0]):
+            QuizQuestion.objects.create(question_paper=paper, question_text=f"Q{i}", option_a="a",
+                                        option_b="b", option_c="c", option_d="d", correct_index=correct)
+        answers = {
+            '1': [0, 1, 2, 3, 0],     # all correct
+            '2': [0, 1, 2, 3],        # one unanswered
+            '3': [3, 3, 3, 3, 3, 3],  # one right, extra answer ignored
+        }
+        for key_id in answers:
+            employee = OperatorMaster.objects.create(employee_code=f"SC{key_id}", full_name=f"Op {key_id}",
+                                                     date_of_join=date.today(), designation="Operator",
+                                                     department="Assembly")
+            TestSession.objects.create(test_name="Scoring", key_id=key_id, employee=employee,
+                                       question_paper=paper)
+
+        response = self.client.post('/api/end-test/', data=json.dumps(answers), content_type='application/json')
+        results = {r['name']: r for r in response.json()['results']}
+        self.assertEqual((results['Op 1']['marks'], results['Op 1']['percentage'], results['Op 1']['passed']),
+                         (5, 100.0, True))
+        self.assertEqual((results['Op 2']['marks'], results['Op 2']['percentage'], results['Op 2']['passed']),
+                         (4, 80.0, True))
+        self.assertEqual((results['Op 3']['marks'], results['Op 3']['percentage'], results['Op 3']['passed']),
+                         (1, 20.0, False))
+        self.assertEqual(results['Op 3']['total_questions'], 5)
+
+    def test_rooms_are_isolated(self):
+        paper = QuizQuestionPaper.objects.create(name="Room Paper")
+        QuizQuestion.objects.create(question_paper=paper, question_text="Q", option_a="a", option_b="b",
+                                    option_c="c", option_d="d", correct_index=2)
+        for room, code in (('hall-a', 'RA'), ('hall-b', 'RB')):
+            employee = OperatorMaster.objects.create(employee_code=code, full_name=f"Op {code}",
+                                                     date_of_join=date.today(), designation="Operator",
+                                                     department="Assembly")
+            # Same test and remote number in both halls
+            response = self.client.post('/api/start-test/', data=json.dumps({
+                'room': room, 'test_name': "Parallel", 'question_paper_id': paper.id,
+                'assignments': [{'key_id': '1', 'employee_id': employee.id}],
+            }), content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+
+        response = self.client.post('/api/end-test/?room=hall-a', data=json.dumps({'1': [2]}),
+                                    content_type='application/json')
+        self.assertEqual([r['name'] for r in response.json()['results']], ["Op RA"])
+        self.assertEqual(list(TestSession.objects.values_list('room', flat=True)), ['hall-b'])
+        self.assertEqual(self.client.get('/api/test-session/map/?room=hall-b').json(), {'1': "Op RB"})
+
+
+class AnswerKeyCacheTestCase(TestCase):
+    """Compiled answer keys are reused until a question of the paper changes"""
+
+    def add_question(self, paper, correct_index):
+        return QuizQuestion.objects.create(question_paper=paper, question_text="Q", option_a="a", option_b="b",
+                                           option_c="c", option_d="d", correct_index=correct_index)
+
+    def test_invalidated_by_question_changes(self):
+        paper = QuizQuestionPaper.objects.create(name="Cached Paper")
+        other = QuizQuestionPaper.objects.create(name="Other Paper")
+        first = self.add_question(paper, 1)
+        self.add_question(paper, 2)
+        self.assertEqual(list(answer_keys.get(paper.id).correct), [1, 2])
+        with self.assertNumQueries(0):
+            answer_keys.get(paper.id)
+
+        first.correct_index = 3
+        first.save()
+        self.assertEqual(list(answer_keys.get(paper.id).correct), [3, 2])
+
+        # Moving a question changes both papers
+        answer_keys.get(other.id)
+        first.question_paper = other
+        first.save()
+        self.assertEqual(answer_keys.get(paper.id).count, 1)
+        self.assertEqual(answer_keys.get(other.id).count, 1)
+
+        first.delete()
+        self.assertEqual(answer_keys.get(other.id).count, 0)
+
+
+class StartTestSessionTestCase(TestCase):
+    """A room is validated as a whole and created in one transaction"""
+
+    def setUp(self):
+        self.paper = QuizQuestionPaper.objects.create(name="Start Paper")
+        self.employees = [
+            OperatorMaster.objects.create(employee_code=f"ST{i}", full_name=f"Starter {i}", date_of_join=date.today(),
+                                          designation="Operator", department="Assembly")
+            for i in range(3)
+        ]
+
+    def start(self, assignments):
+        return self.client.post('/api/start-test/', data=json.dumps({
+            'test_name': "Start", 'question_paper_id': self.paper.id, 'assignments': assignments,
+        }), content_type='application/json')
+
+    def test_all_errors_reported_and_nothing_created(self):
+        Score.objects.create(employee=self.employees[1], test_name="Earlier", test=self.paper, marks=1)
+        response = self.start([
+            {'key_id': '1', 'employee_id': self.employees[0].id},
+            {'key_id': '2', 'employee_id': self.employees[1].id},  # already took this paper
+            {'key_id': '3', 'employee_id': 999999},                # no such employee
+            {'key_id': '1', 'employee_id': self.employees[2].id},  # remote used twice
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e['index'] for e in response.json()['errors']], [1, 2, 3])
+        self.assertFalse(TestSession.objects.exists())
+
+    def test_replaces_earlier_sessions_for_the_same_remotes(self):
+        self.assertEqual(self.start([{'key_id': '1', 'employee_id': self.employees[0].id}]).status_code, 200)
+        response = self.start([{'key_id': '1', 'employee_id': self.employees[1].id},
+                               {'key_id': '2', 'employee_id': self.employees[2].id}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(dict(TestSession.objects.values_list('key_id', 'employee_id')),
+                         {'1': self.employees[1].id, '2': self.employees[2].id})
+
+
+
+class SkillMatrixJobTestCase(TestCase):
+    """Passing scores queue one skill matrix job per (employee, skill, level), run off the request"""
+
+    setUp = SkillMatrixUpdateTestCase.setUp  # same employee, operation, station and level
+
+    def passing_score(self):
+        return Score.objects.create(employee=self.employee, marks=85, test_name="Level 2 Push On Fix Test",
+                                    test=self.question_paper, level=self.level, skill=self.station,
+                                    percentage=85.0, passed=True)
+
+    def test_passes_are_deduplicated_and_run_later(self):
+        self.passing_score()
+        self.passing_score()
+        self.assertEqual(SkillMatrixJob.objects.count(), 1)
+        self.assertFalse(OperatorLevel.objects.filter(employee=self.employee, level=2).exists())
+
+        self.assertEqual(skill_matrix_jobs.run_pending(), 1)
+        self.assertEqual(SkillMatrixJob.objects.get().status, SkillMatrixJob.DONE)
+        self.assertEqual(OperatorLevel.objects.get(employee=self.employee, operation=self.operation).level, 2)
+
+    def test_failing_score_queues_nothing(self):
+        Score.objects.create(employee=self.employee, marks=40, test_name="Level 2 Push On Fix Test",
+                             test=self.question_paper, level=self.level, skill=self.station,
+                             percentage=40.0, passed=False)
+        self.assertFalse(SkillMatrixJob.objects.exists())
+
+    def test_failure_is_retried_with_backoff(self):
+        self.passing_score()
+        with mock.patch.object(Score, 'update_skill_matrix', side_effect=Exception("database is locked")):
+            self.assertEqual(skill_matrix_jobs.run_pending(), 1)
+        job = SkillMatrixJob.objects.get()
+        self.assertEqual((job.status, job.attempts, job.last_error), (SkillMatrixJob.PENDING, 1, "database is locked"))
+        self.assertGreater(job.next_run_at, timezone.now())
+        self.assertEqual(skill_matrix_jobs.run_pending(), 0)  # not due yet
+
+        SkillMatrixJob.objects.update(next_run_at=timezone.now())
+        self.assertEqual(skill_matrix_jobs.run_pending(), 1)
+        self.assertEqual(SkillMatrixJob.objects.get().status, SkillMatrixJob.DONE)
+
+
+def fake_easy_test(test_case, **fake):
+    """EasyTest on the simulated SDK, torn down with the test; no keypresses unless rate is given"""
+    config = {'bases': 1, 'remotes': 5, 'rate': 0, 'connect_delay': 0.01, **fake}
+    with override_settings(EASYTEST_SDK='fake', EASYTEST_FAKE_SDK=config):
+        sdk = EasyTest()
+    test_case.addCleanup(sdk.stop_key_consumer)
+    test_case.addCleanup(sdk.lib.Disconnect, 0)
+    return sdk
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+class SdkResultPullTestCase(SimpleTestCase):
+    """GetMultiResultByID replies are parsed per key, and a failed pull never looks like silence"""
+
+    def test_parse_multi_result(self):
+        answers = parse_multi_result(b"1:A,3:d, 4 : C ,9:B,x:A,2:AB,5:E", 5)
+        self.assertEqual(list(answers), [0, NO_ANSWER, 3, 2, NO_ANSWER])
+
+    def test_parse_empty_reply(self):
+        self.assertEqual(list(parse_multi_result(b"", 3)), [NO_ANSWER] * 3)
+
+    def test_failed_call_raises(self):
+        sdk = fake_easy_test(self)
+        with mock.patch.object(sdk.lib, 'GetMultiResultByID', return_value=-2):
+            with self.assertRaisesRegex(RuntimeError, "code -2"):
+                sdk.pull_results(1, 5)
+
+    def test_unrecognised_reply_raises(self):
+        sdk = fake_easy_test(self)
+
+        def reply(buffer, base_id, key_count):
+            FakeEasyTestLib._write(buffer, b"A;B;C")
+            return 0
+
+        with mock.patch.object(sdk.lib, 'GetMultiResultByID', side_effect=reply):
+            with self.assertRaisesRegex(RuntimeError, "Unrecognised"):
+                sdk.pull_results(1, 5)
+
+    def test_empty_vector_is_refused(self):
+        sdk = mock.Mock()
+        sdk.pull_results.return_value = parse_multi_result(b"", 5)
+        with mock.patch.object(remote_service, 'sdk', sdk), \
+                mock.patch.dict(remote_service.bases, {1: mock.Mock(state='connected')}, clear=True):
+            with self.assertRaises(RuntimeError):
+                remote_service.pull_question_results(5, room='empty-vector')
+            self.assertFalse(remote_service.results_for('empty-vector').has_answers())
+            index, answers = remote_service.pull_question_results(5, room='empty-vector', allow_empty=True)
+        self.assertEqual((index, list(answers)), (0, [NO_ANSWER] * 5))
+
+
+class EndTestSessionFromSdkTestCase(TestCase):
+    """Ending with ?source=sdk before any answers were pulled must not store failing scores"""
+
+    def test_nothing_pulled(self):
+        employee = OperatorMaster.objects.create(employee_code="SDK1", full_name="Sdk Op", date_of_join=date.today(),
+                                                 designation="Operator", department="Assembly")
+        TestSession.objects.create(test_name="Sdk", key_id="1", employee=employee, room="sdk-room")
+        response = self.client.post('/api/end-test/?source=sdk&room=sdk-room', data='{}',
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Score.objects.exists())
+        self.assertTrue(TestSession.objects.filter(room="sdk-room").exists())
+
+
+class KeyEventRingTestCase(SimpleTestCase):
+    """The SDK key ring keeps arrival order, drops instead of blocking, and counts every drop"""
+
+    def test_wraparound(self):
+        ring = KeyEventRing(capacity=4)
+        for round_start in range(0, 12, 3):
+            for i in range(round_start, round_start + 3):
+                self.assertTrue(ring.put(i))
+            self.assertEqual(ring.get_batch(), list(range(round_start, round_start + 3)))
+        self.assertEqual((ring.consumed, ring.dropped, ring.depth()), (12, 0, 0))
+
+    def test_drops_when_full(self):
+        ring = KeyEventRing(capacity=4)
+        self.assertEqual([ring.put(i) for i in range(6)], [True] * 4 + [False] * 2)
+        self.assertEqual((ring.dropped, ring.depth()), (2, 4))
+        self.assertEqual(ring.get_batch(), [0, 1, 2, 3])
+        self.assertTrue(ring.put(6))
+        self.assertEqual(ring.get_batch(), [6])  # the dropped 4 and 5 are stepped over
+        self.assertEqual((ring.dropped, ring.depth(), ring.get_statistics()['max_depth']), (2, 0, 4))
+
+    def test_skipped_slot_between_stored_items(self):
+        ring = KeyEventRing(capacity=2)
+        ring.put('a')
+        ring.put('b')
+        self.assertFalse(ring.put('c'))
+        self.assertEqual(ring.get_batch(limit=2), ['a', 'b'])  # stops before the skipped slot
+        self.assertTrue(ring.put('d'))
+        self.assertEqual(ring.get_batch(), ['d'])
+        self.assertEqual((ring.dropped, ring.skipped), (1, set()))
+
+    def test_concurrent_producers_account_for_every_event(self):
+        ring = KeyEventRing(capacity=256)
+        handled = []
+        consumer = KeyEventConsumer(ring, lambda i: handled.append(i), idle_wait=0.001)
+        consumer.start()
+
+        def produce(offset):
+            for i in range(5000):
+                ring.put((offset + i,))
+
+        producers = [threading.Thread(target=produce, args=(n * 5000,)) for n in range(4)]
+        for thread in producers:
+            thread.start()
+        for thread in producers:
+            thread.join()
+        consumer.stop()
+        self.assertEqual(ring.claimed, 20000)
+        self.assertEqual(len(handled) + ring.dropped, 20000)
+        self.assertEqual(len(set(handled)), len(handled))
+        self.assertEqual(ring.depth(), 0)
+
+    def test_stop_drains_the_ring(self):
+        ring = KeyEventRing(capacity=128)
+        handled = []
+        consumer = KeyEventConsumer(ring, lambda i: (time.sleep(0.001), handled.append(i)))
+        consumer.start()
+        for i in range(100):
+            ring.put((i,))
+        consumer.stop(timeout=5.0)
+        self.assertEqual(handled, list(range(100)))
+        self.assertIsNone(consumer.thread)
+
+    def test_fake_sdk_keypresses(self):
+        with mock.patch.object(EasyTest, 'KEY_RING_CAPACITY', 16), \
+                mock.patch.object(EasyTest, '_handle_key'):
+            sdk = fake_easy_test(self, remotes=20, rate=6000, connect_delay=0.2)  # ~2000 presses/s
+            handled = []
+            sdk.add_key_listener(lambda *event: handled.append(event))
+            wait_for(lambda: sdk.lib.keys_fired >= 500)
+            sdk.vote_stop(0)
+            stats = sdk.get_key_statistics
+            wait_for(lambda: stats()['consumed'] + stats()['dropped'] == sdk.lib.keys_fired)
+        self.assertEqual(stats()['consumed'], len(handled))
+        self.assertEqual(stats()['handler_errors'], 0)
+
+
+class FakeSdkTestCase(SimpleTestCase):
+    """The simulated SDK runs the whole connect, vote, keypress and pull cycle"""
+
+    def test_connect_vote_keys_pull(self):
+        with mock.patch.object(EasyTest, '_handle_key'):
+            sdk = fake_easy_test(self, remotes=8, rate=3000, connect_delay=0.2)
+            last_answer = {}
+            sdk.add_key_listener(lambda base_id, key_id, key_sn, mode, timestamp, info:
+                                 last_answer.__setitem__(key_id, info.decode()))
+            # EasyTest starts voting as soon as the base reports it is connected
+            wait_for(lambda: len(last_answer) == 8)
+            sdk.vote_stop(0)
+            # A press already past its wait still fires; let the generator thread finish
+            wait_for(lambda: not any(t.name.startswith('fake-sdk-base-') for t in threading.enumerate()))
+            stats = sdk.get_key_statistics
+            wait_for(lambda: stats()['consumed'] == sdk.lib.keys_fired)
+            answers = sdk.pull_results(1, 8)
+        self.assertEqual(list(answers), [ANSWER_LETTERS.index(last_answer[key_id]) for key_id in range(1, 9)])
+
+    def test_new_vote_clears_previous_answers(self):
+        lib = FakeEasyTestLib(remotes=3, rate=0, connect_delay=0)
+        lib.Connect(2, b"")
+        wait_for(lambda: lib.connected)
+        lib.results[(1, 2)] = b"C"
+        lib.VoteStart2(1, 10, b"")
+        buffer = ctypes.create_string_buffer(64)
+        self.assertEqual(lib.GetMultiResultByID(buffer, 1, 3), 0)
+        self.assertEqual(buffer.value, b"")
+        lib.Disconnect(0)
+
+
+class BaseManagerTestCase(TestCase):
+    """RemoteDataService's per-base connect, backoff, heartbeat and stale-drop decisions"""
+
+    def setUp(self):
+        self.service = RemoteDataService(connect_timeout=15.0, heartbeat_interval=10.0, heartbeat_timeout=30.0)
+        self.service.sdk = mock.Mock(devices={})
+        self.service.sdk.connect.return_value = 0
+        self.service.running = True  # ticks are driven by the test, not the manager thread
+
+    def add_base(self, base_id=1):
+        self.service.reconnect(base_id)
+        return self.service.bases[base_id]
+
+    def rewind(self, conn, seconds):
+        """Pretend everything recorded for conn happened seconds earlier"""
+        for name in ('next_attempt_at', 'connect_started_at', 'last_seen', 'probe_sent_at', 'connected_since'):
+            if getattr(conn, name) is not None:
+                setattr(conn, name, getattr(conn, name) - seconds)
+
+    def test_backoff_after_missing_connect_callback(self):
+        conn = self.add_base()
+        self.service._tick()
+        self.assertEqual((conn.state, conn.attempts), ('connecting', 1))
+        self.service.sdk.connect.assert_called_once_with(1, "auto")
+
+        self.rewind(conn, 16)
+        self.service._tick()
+        self.assertEqual(conn.state, 'backoff')
+        self.assertIn("no connect callback", conn.last_error)
+        self.service._tick()  # still backing off
+        self.assertEqual(self.service.sdk.connect.call_count, 1)
+
+        self.rewind(conn, self.service.max_backoff)
+        self.service._tick()
+        self.assertEqual((conn.state, conn.attempts, self.service.sdk.connect.call_count), ('connecting', 2, 2))
+
+    def test_failed_connect_call_backs_off(self):
+        conn = self.add_base()
+        self.service.sdk.connect.return_value = 7
+        self.service._tick()
+        self.assertEqual((conn.state, conn.last_error), ('backoff', "Connect returned 7"))
+
+    def test_heartbeat_probe_then_stale_drop(self):
+        Device.objects.create(base_id=1, mode="1", status='connected')
+        conn = self.add_base()
+        self.service._tick()
+        self.service._on_base_event('connect', 1, "1")
+        self.assertEqual(conn.state, 'connected')
+
+        self.rewind(conn, 11)
+        self.service._tick()
+        self.service._tick()  # one probe per silence
+        self.service.sdk.lib.ReadHDParam.assert_called_once_with(1, RemoteDataService.HEARTBEAT_PARAM_MODE)
+
+        self.service._on_base_event('seen', 1, '')  # the probe's reply
+        self.assertIsNone(conn.probe_sent_at)
+        self.rewind(conn, 31)
+        self.service._tick()
+        self.assertEqual(conn.state, 'stale')
+        self.service.sdk.disconnect.assert_called_once_with(1)
+        self.assertEqual(Device.objects.get(base_id=1).status, 'disconnected')
+
+        self.rewind(conn, self.service.max_backoff)
+        self.service._tick()
+        self.assertEqual(conn.state, 'connecting')
+
+    def test_reconnect(self):
+        conn = self.add_base()
+        self.service._tick()
+        self.service._on_base_event('connect', 1, "1")
+        self.assertEqual(self.service.connection_status, "connected")
+
+        self.service.reconnect(1)
+        self.assertEqual((conn.state, conn.attempts), ('pending', 0))
+        self.assertEqual(self.service.connection_status, "connecting")
+        self.service._tick()
+        self.assertEqual(self.service.sdk.connect.call_count, 2)
+        self.assertEqual(conn.state, 'connecting')
+
+
+class KeypadEventWriterTestCase(TestCase):
+    """Keypad events are written in batches, falling back to row by row when a batch fails"""
+
+    def setUp(self):
+        self.device = Device.objects.create(base_id=1, mode="1")
+
+    def writer(self, **kwargs):
+        writer = KeypadEventWriter(**kwargs)
+        self.addCleanup(writer.stop)
+        return writer
+
+    def event(self, key_id, device=None):
+        return KeypadEvent(device=device or self.device, key_id=key_id, key_sn=f"SN{key_id}", mode="1",
+                           timestamp=key_id, info="A")
+
+    def test_flush_at_batch_size(self):
+        with mock.patch.object(KeypadEvent.objects, 'bulk_create') as bulk_create, \
+                mock.patch.object(counters, 'record_bulk_insert'):
+            writer = self.writer(flush_interval=60, batch_size=5)
+            for key_id in range(5):
+                writer.add(self.event(key_id))
+            wait_for(lambda: writer.batches == 1)
+            self.assertEqual([e.key_id for e in bulk_create.call_args.args[0]], [0, 1, 2, 3, 4])
+            for key_id in range(5, 8):
+                writer.add(self.event(key_id))
+            time.sleep(0.05)
+            self.assertEqual(writer.get_statistics()['pending'], 3)  # below the threshold, waits for the interval
+            writer.stop()
+        self.assertEqual((writer.batches, writer.written), (2, 8))
+        self.assertFalse(writer.thread.is_alive())
+
+    def test_flush_on_interval(self):
+        with mock.patch.object(KeypadEvent.objects, 'bulk_create') as bulk_create, \
+                mock.patch.object(counters, 'record_bulk_insert'):
+            writer = self.writer(flush_interval=0.01, batch_size=500)
+            writer.add(self.event(1))
+            writer.add(self.event(2))
+            wait_for(lambda: writer.written == 2)
+            self.assertEqual(bulk_create.call_count, 1)  # both in one batch
+
+    def test_batch_is_written_and_counted(self):
+        before = counters.read()
+        writer = self.writer(flush_interval=60)
+        for key_id in range(3):
+            writer.add(self.event(key_id))
+        writer.flush()
+        self.assertEqual(KeypadEvent.objects.count(), 3)
+        self.assertEqual((writer.written, writer.failed, writer.batches), (3, 0, 1))
+        after = counters.read()
+        self.assertEqual(after['total_events'] - before['total_events'], 3)
+        self.assertEqual(after['unprocessed_events'] - before['unprocessed_events'], 3)
+
+    def test_failed_batch_falls_back_to_single_rows(self):
+        before = counters.read()
+        rejected = []
+        writer = self.writer(flush_interval=60, on_row_error=rejected.append)
+        bad = self.event(2, device=Device(base_id=2, mode="1"))  # never saved, so it cannot be written
+        for event in (self.event(1), bad, self.event(3)):
+            writer.add(event)
+        writer.flush()
+        self.assertEqual(sorted(KeypadEvent.objects.values_list('key_id', flat=True)), [1, 3])
+        self.assertEqual((writer.written, writer.failed, writer.batches), (2, 1, 1))
+        self.assertEqual(rejected, [bad])
+        # Rows saved one by one are counted by the post_save signal instead
+        self.assertEqual(counters.read()['total_events'] - before['total_events'], 2)
@@ -256,6 +256,9 @@ urlpatterns = [
 
     # Service control
     path('api/service/start/', views.start_service, name='start-service'),
+    path('api/service/start-with-params/', views.start_service_with_params, name='start-service-with-params'),
+    path('api/service/reconnect/', views.reconnect_service, name='reconnect-service'),
+    path('api/service/pull-results/', views.pull_question_results, name='pull-question-results'),
     path('api/service/stop/', views.stop_service, name='stop-service'),
     path('api/service/status/', views.service_status, name='service-status'),
     path('api/stats/', views.stats, name='stats'),
@@ -354,7 +357,9 @@ urlpatterns = [
    # key event
 
     path('api/key-events/create/', views.KeyEventCreateView.as_view()),
+    path('api/key-events/bulk/', views.KeyEventBulkCreateView.as_view()),
     path('api/key-events/latest/', views.LatestKeyEventView.as_view()),
+    path('api/key-events/stream/', views.key_event_stream, name='key-event-stream'),
     path('api/connect-events/create/', views.connect_event_create, name='connect_event_create'),
     path('api/vote-events/create/', views.vote_event_create, name='vote_event_create'),
     path('api/question-papers/', views.QuizQuestionPaperListCreateView.as_view()),
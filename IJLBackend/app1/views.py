@@ -9,6 +9,7 @@ from rest_framework.decorators import api_view
 from .models import Device, KeypadEvent, VoteSession
 from .serializers import DeviceSerializer, KeypadEventSerializer, LevelTwoUnitWiseSerializer, VoteSessionSerializer
 from .services import remote_service
+from . import counters
 import logging
 
 logger = logging.getLogger(__name__)
@@ -50,13 +51,14 @@ class VoteSessionListView(generics.ListAPIView):
 
 @api_view(['POST'])
 def start_service(request):
-    """Start the remote data collection service"""
+    """Start the remote data collection service; connection progress is reported by service_status"""
     try:
         if remote_service.start_service():
             return Response({
                 'status': 'success',
-                'message': 'Remote data service started successfully'
-            })
+                'message': 'Remote data service is connecting; poll service status for progress',
+                'service_status': remote_service.get_status()
+            }, status=status.HTTP_202_ACCEPTED)
         else:
             return Response({
                 'status': 'error',
@@ -93,30 +95,26 @@ def service_status(request):
 @api_view(['GET'])
 def stats(request):
     """Get statistics"""
-    stats_data = {
-        'total_devices': Device.objects.count(),
-        'connected_devices': Device.objects.filter(status='connected').count(),
-        'total_events': KeypadEvent.objects.count(),
-        'unprocessed_events': KeypadEvent.objects.filter(processed=False).count(),
-        'active_vote_sessions': VoteSession.objects.filter(status='active').count(),
-        'total_vote_sessions': VoteSession.objects.count(),
-    }
-    return Response(stats_data)
+    # Maintained incrementally by app1.counters; no COUNT(*) per request
+    return Response(counters.read())
 
 # Add to remote_handler/views.py
 
 @api_view(['POST'])
 def start_service_with_params(request):
-    """Start the remote data collection service with custom parameters"""
+    """Start the remote data collection service for one base (base_id) or several (base_ids)"""
     try:
         base_id = request.data.get('base_id', 1)
+        base_ids = request.data.get('base_ids')
         mode = request.data.get('mode', 'auto')
+        result_mode = request.data.get('result_mode')  # 'callback' (default) or 'batch'
         
-        if remote_service.start_service(base_id, mode):
+        if remote_service.start_service(base_id, mode, base_ids=base_ids, result_mode=result_mode):
             return Response({
                 'status': 'success',
-                'message': f'Remote data service started with base_id={base_id}, mode={mode}'
-            })
+                'message': f'Remote data service connecting to base(s) {base_ids or [base_id]}, mode={mode}',
+                'service_status': remote_service.get_status()
+            }, status=status.HTTP_202_ACCEPTED)
         else:
             return Response({
                 'status': 'error',
@@ -131,16 +129,17 @@ def start_service_with_params(request):
 
 @api_view(['POST'])
 def reconnect_service(request):
-    """Reconnect to remote device"""
+    """Reconnect one base (base_id) or every managed base; returns before the connection is up"""
     try:
-        base_id = request.data.get('base_id', 1)
-        mode = request.data.get('mode', 'auto')
+        base_id = request.data.get('base_id')
+        mode = request.data.get('mode')
         
         if remote_service.reconnect(base_id, mode):
             return Response({
                 'status': 'success',
-                'message': 'Reconnected successfully'
-            })
+                'message': 'Reconnection scheduled; poll service status for progress',
+                'service_status': remote_service.get_status()
+            }, status=status.HTTP_202_ACCEPTED)
         else:
             return Response({
                 'status': 'error',
@@ -153,6 +152,45 @@ def reconnect_service(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
 
+DEFAULT_ROOM = 'default'
+
+
+def request_room(request):
+    """Room a quiz request is for: ?room=, or "room" in a JSON body, else the default room"""
+    room = request.query_params.get('room')
+    if not room and isinstance(request.data, dict) and isinstance(request.data.get('room'), str):
+        room = request.data['room']
+    return room or DEFAULT_ROOM
+
+
+def latest_session_cache_key(room):
+    return f"latest_test_session:{room}"
+
+
+@api_view(['POST'])
+def pull_question_results(request):
+    """Batch result mode: pull all remotes' answers for the question that just closed"""
+    try:
+        key_count = int(request.data.get('key_count', 30))
+        question_index = request.data.get('question_index')
+        if question_index is not None:
+            question_index = int(question_index)
+        room = request_room(request)
+        allow_empty = str(request.data.get('allow_empty', '')).lower() in ('1', 'true', 'yes')
+        question_index, answers = remote_service.pull_question_results(key_count, question_index, room, allow_empty)
+        return Response({
+            'status': 'success',
+            'room': room,
+            'question_index': question_index,
+            'answers': list(answers),  # answer index per key_id - 1, -1 = no answer
+            'answered': sum(1 for answer in answers if answer >= 0),
+        })
+    except (TypeError, ValueError) as e:
+        return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except RuntimeError as e:
+        return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_409_CONFLICT)
+    
+
     #-------------------------------------------------------------------------------------------------------------------------------------------------------
     import subprocess
 from django.shortcuts import get_list_or_404, render
@@ -2246,22 +2284,209 @@ from .serializers import *
 from rest_framework import viewsets
 
 
+from django.db import transaction
+from .live import key_event_hub
+
+
 class KeyEventCreateView(APIView):
     def post(self, request):
         serializer = KeyEventSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            event = serializer.save()
+            if key_event_hub.has_subscribers():
+                transaction.on_commit(lambda: key_event_hub.publish([event]))
             return Response({'message': 'Key event saved'}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+import json
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.exceptions import ParseError
+
+
+class NDJSONParser(BaseParser):
+    """One JSON object per line, as streamed by clients that append events as they happen"""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        events = []
+        for number, line in enumerate(stream.read().decode('utf-8').splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                events.append(json.loads(line))
+            except ValueError as e:
+                raise ParseError(f"Line {number}: {e}")
+        return events
+
+
+class KeyEventBulkCreateView(APIView):
+    """Insert many key events in one transaction, ignoring ones already stored.
+
+    Accepts a JSON array or NDJSON. Items are validated in one pass. Invalid
+    items are reported by index and do not block the valid ones, so one bad
+    event cannot make a client retry the whole batch forever. An event whose
+    (base_id, key_id, key_sn, client_timestamp) already exists counts as a
+    duplicate, which makes client retries safe.
+    """
+    parser_classes = [JSONParser, NDJSONParser]
+    MAX_EVENTS = 5000
+
+    def post(self, request):
+        events = request.data
+        if isinstance(events, dict):
+            events = events.get('events', [events])
+        if not isinstance(events, list):
+            return Response({'error': 'Expected a list of key events'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(events) > self.MAX_EVENTS:
+            return Response({'error': f'At most {self.MAX_EVENTS} key events per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        valid = []
+        errors = {}
+        for index, item in enumerate(events):
+            serializer = KeyEventBulkItemSerializer(data=item)
+            if serializer.is_valid():
+                valid.append(serializer.validated_data)
+            else:
+                errors[index] = serializer.errors
+        if not valid:
+            if errors:
+                return Response({'created': 0, 'duplicates': 0, 'errors': errors},
+                                status=status.HTTP_400_BAD_REQUEST)
+            return Response({'created': 0, 'duplicates': 0, 'errors': {}}, status=status.HTTP_200_OK)
+
+        def key(data):
+            return (data['base_id'], data['key_id'], data.get('key_sn', 'unknown'), data['client_timestamp'])
+
+        # One query for every key that could collide, then dedupe in memory
+        existing = set(KeyEvent.objects.filter(
+            client_timestamp__in={data['client_timestamp'] for data in valid}
+        ).values_list('base_id', 'key_id', 'key_sn', 'client_timestamp'))
+
+        new_events = []
+        for data in valid:
+            event_key = key(data)
+            if event_key in existing:
+                continue
+            existing.add(event_key)
+            new_events.append(KeyEvent(**data))
+
+        with transaction.atomic():
+            # ignore_conflicts covers a concurrent upload of the same events
+            KeyEvent.objects.bulk_create(new_events, batch_size=500, ignore_conflicts=True)
+
+        if new_events and key_event_hub.has_subscribers():
+            # ignore_conflicts leaves the primary keys unset; read the rows back for the feed cursor
+            new_keys = {key(vars(event)) for event in new_events}
+            stored = [event for event in KeyEvent.objects.filter(
+                client_timestamp__in={event.client_timestamp for event in new_events})
+                if key(vars(event)) in new_keys]
+            key_event_hub.publish(stored)
+
+        return Response({
+            'created': len(new_events),
+            'duplicates': len(valid) - len(new_events),
+            'errors': errors,
+        }, status=status.HTTP_201_CREATED)
+
 class LatestKeyEventView(APIView):
+    """Most recently stored key event. Kept for older UIs; new ones should use key_event_stream"""
     def get(self, request):
-        try:
-            latest_event = KeyEvent.objects.latest('timestamp')
-            serializer = KeyEventSerializer(latest_event)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except KeyEvent.DoesNotExist:
+        # Newest primary key rather than latest('timestamp'): same event, but served by the pk index
+        latest_event = KeyEvent.objects.order_by('-id').first()
+        if latest_event is None:
             return Response({"message": "No key events yet."}, status=status.HTTP_404_NOT_FOUND)
+        serializer = KeyEventSerializer(latest_event)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+from collections import deque
+from django.http import StreamingHttpResponse
+from .live import events_after, latest_id
+
+RESYNC_OVERLAP = 200  # ids re-read below the cursor on resync, to catch late-committing uploads
+STREAM_PAGE = 1000  # events read from the hub history or the database at a time
+
+
+def key_event_stream(request):
+    """Server-Sent Events feed of every ingested key event.
+
+    Query parameters:
+        after      resume after this key event id (EventSource's Last-Event-ID header works too);
+                   without either, the stream starts with the next event
+        test_name  only events from remotes assigned in that TestSession
+        room       with test_name, the room the session runs in (default "default")
+        base_id    only events from that base
+    """
+    cursor = request.GET.get('after') or request.headers.get('Last-Event-ID')
+    try:
+        cursor = int(cursor) if cursor not in (None, '') else None
+        base_id = int(request.GET['base_id']) if request.GET.get('base_id') else None
+    except ValueError:
+        return JsonResponse({'error': 'after and base_id must be integers'}, status=400)
+    test_name = request.GET.get('test_name')
+    room = request.GET.get('room') or DEFAULT_ROOM
+    heartbeat = 15.0
+
+    def session_key_ids():
+        if not test_name:
+            return None
+        return {str(k) for k in TestSession.objects.filter(room=room, test_name=test_name)
+                .values_list('key_id', flat=True)}
+
+    def wanted(payload, key_ids):
+        return ((base_id is None or payload['base_id'] == base_id)
+                and (key_ids is None or str(payload['key_id']) in key_ids))
+
+    def stream():
+        nonlocal cursor
+        # Subscribe before reading the backlog so nothing published in between is missed
+        subscription = key_event_hub.subscribe()
+        try:
+            if cursor is None:
+                cursor = latest_id()
+            start = cursor
+            # Ids can commit out of order (two uploads in flight), so dedupe on recently sent
+            # ids rather than trusting the highest one, and resync with a little overlap
+            sent_ids = deque(maxlen=RESYNC_OVERLAP * 10)
+            sent = set()
+            key_ids = session_key_ids()
+            yield f"retry: 2000\n: resuming after {cursor}\n\n"
+            backlog = key_event_hub.since(cursor, STREAM_PAGE)
+            resync = backlog is None
+            while True:
+                if resync:
+                    subscription.lagged = False
+                    backlog = events_after(max(start, cursor - RESYNC_OVERLAP) if sent else cursor, STREAM_PAGE)
+                for payload in backlog or ():
+                    if payload['id'] in sent or payload['id'] <= start:
+                        continue
+                    if len(sent_ids) == sent_ids.maxlen:
+                        sent.discard(sent_ids[0])
+                    sent_ids.append(payload['id'])
+                    sent.add(payload['id'])
+                    cursor = max(cursor, payload['id'])
+                    if wanted(payload, key_ids):
+                        yield f"id: {payload['id']}\nevent: key_event\ndata: {json.dumps(payload)}\n\n"
+                if backlog and len(backlog) >= STREAM_PAGE:
+                    # A full page: there is more history to page through before going live
+                    if not resync:
+                        backlog = key_event_hub.since(cursor, STREAM_PAGE)
+                        resync = backlog is None
+                    continue
+                backlog = subscription.get(timeout=heartbeat)
+                # Fell behind, or idle long enough that another process may have ingested events
+                resync = subscription.lagged or not backlog
+                if not backlog:
+                    key_ids = session_key_ids()
+                    yield ": heartbeat\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # let nginx pass events through unbuffered
+    return response
 
         
 # api/views.py
@@ -2270,8 +2495,19 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from .serializers import ConnectEventSerializer
 
+def uploaded_event(request, model):
+    """The row an earlier upload with this request's Idempotency-Key created, if any"""
+    key = request.headers.get('Idempotency-Key') or request.data.get('idempotency_key')
+    if not key:
+        return None
+    return model.objects.filter(idempotency_key=key).first()
+
+
 @api_view(['POST'])
 def connect_event_create(request):
+    existing = uploaded_event(request, ConnectEvent)
+    if existing is not None:
+        return Response(ConnectEventSerializer(existing).data, status=200)
     serializer = ConnectEventSerializer(data=request.data)
     if serializer.is_valid():
         serializer.save()
@@ -2283,6 +2519,9 @@ def connect_event_create(request):
 
 @api_view(['POST'])
 def vote_event_create(request):
+    existing = uploaded_event(request, VoteEvent)
+    if existing is not None:
+        return Response(VoteEventSerializer(existing).data, status=200)
     serializer = VoteEventSerializer(data=request.data)
     if serializer.is_valid():
         serializer.save()
@@ -2358,7 +2597,7 @@ from .serializers import ScoreSerializer
 
 class ScoreListView(APIView):
     def get(self, request):
-        session_key = cache.get("latest_test_session")
+        session_key = cache.get(latest_session_cache_key(request_room(request)))
         if not session_key:
             return Response([])
 
@@ -2370,7 +2609,7 @@ class ScoreListView(APIView):
 
 class KeyIdToEmployeeNameMap(APIView):
     def get(self, request):
-        mapping = TestSession.objects.select_related('employee').all()
+        mapping = TestSession.objects.select_related('employee').filter(room=request_room(request))
         return Response({s.key_id: s.employee.full_name for s in mapping})
 
 
@@ -2384,6 +2623,7 @@ class StartTestSessionView(APIView):
     def post(self, request):
         try:
             test_name = request.data.get("test_name")
+            room = request_room(request)
             assignments = request.data.get("assignments", [])
             question_paper_id = request.data.get("question_paper_id") or request.data.get("paper_id")
             skill_id = request.data.get("skill_id")
@@ -2442,52 +2682,84 @@ class StartTestSessionView(APIView):
                     })
                 assignments = assignment_items
 
-            for item in assignments:
+            # Validate every assignment first and report all problems together; nothing is
+            # written unless the whole room is valid
+            errors = []
+            rows = []
+            seen_key_ids = set()
+            for index, item in enumerate(assignments):
                 key_id = item.get("key_id")
                 employee_id = item.get("employee_id")
 
                 if not key_id or not employee_id:
-                    return Response(
-                        {"error": "key_id, employee_id are required in each assignment."},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                employee = get_object_or_404(OperatorMaster, id=employee_id)
-
-                # Check if employee has already taken this question paper
-                if question_paper:
-                    existing_score = Score.objects.filter(
-                        employee=employee,
-                        test=question_paper
-                    ).first()
-
-                    if existing_score:
-                        return Response(
-                            {"error": f"Employee {employee.full_name} (ID: {employee.id}) has already taken this test. Each employee can only take the same question paper once."},
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-
-                # Handle existing TestSession - delete if exists to avoid UNIQUE constraint error
-                existing_session = TestSession.objects.filter(
-                    test_name=test_name,
-                    key_id=key_id
-                ).first()
-
-                if existing_session:
-                    existing_session.delete()
-                    print(f"Deleted existing TestSession: {test_name} - {key_id}")
+                    errors.append({"index": index, "key_id": key_id,
+                                   "error": "key_id, employee_id are required in each assignment."})
+                    continue
+                try:
+                    employee_id = int(employee_id)
+                except (TypeError, ValueError):
+                    errors.append({"index": index, "key_id": key_id,
+                                   "error": f"Invalid employee_id: {employee_id}."})
+                    continue
+                key_id = str(key_id)
+                if key_id in seen_key_ids:
+                    errors.append({"index": index, "key_id": key_id,
+                                   "error": f"Remote {key_id} is assigned more than once."})
+                    continue
+                seen_key_ids.add(key_id)
+                rows.append((index, key_id, employee_id))
+
+            employees = OperatorMaster.objects.in_bulk({employee_id for _, _, employee_id in rows})
+
+            # Employees who have already taken this question paper, in one query
+            already_taken = set()
+            if question_paper:
+                already_taken = set(Score.objects.filter(
+                    employee__in=list(employees), test=question_paper
+                ).values_list('employee_id', flat=True))
+
+            for index, key_id, employee_id in rows:
+                employee = employees.get(employee_id)
+                if employee is None:
+                    errors.append({"index": index, "key_id": key_id,
+                                   "error": f"Employee with id {employee_id} not found."})
+                elif employee_id in already_taken:
+                    errors.append({"index": index, "key_id": key_id,
+                                   "error": f"Employee {employee.full_name} (ID: {employee.id}) has already taken this test. Each employee can only take the same question paper once."})
+
+            if errors:
+                errors.sort(key=lambda e: e["index"])
+                return Response(
+                    {"error": errors[0]["error"], "errors": errors},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
-                # Create TestSession with dynamic skill and level
-                TestSession.objects.create(
+            with transaction.atomic():
+                # Replace any earlier sessions for these remotes in one statement
+                replaced, _ = TestSession.objects.filter(
+                    room=room,
                     test_name=test_name,
-                    key_id=key_id,
-                    employee=employee,
-                    level=level,
-                    skill=skill,
-                    question_paper=question_paper,
-                )
+                    key_id__in=seen_key_ids
+                ).delete()
+                if replaced:
+                    print(f"Deleted {replaced} existing TestSession(s) for {test_name} in {room}")
+
+                # Create TestSessions with dynamic skill and level
+                TestSession.objects.bulk_create([
+                    TestSession(
+                        room=room,
+                        test_name=test_name,
+                        key_id=key_id,
+                        employee=employees[employee_id],
+                        level=level,
+                        skill=skill,
+                        question_paper=question_paper,
+                    )
+                    for _, key_id, employee_id in rows
+                ])
 
-            return Response({"status": "ok"}, status=status.HTTP_200_OK)
+            cache.set(latest_session_cache_key(room), test_name, timeout=None)
+            return Response({"status": "ok", "room": room}, status=status.HTTP_200_OK)
 
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -2496,21 +2768,33 @@ class StartTestSessionView(APIView):
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from .models import TestSession, QuizQuestion, Score
+from . import scoring
+from .jobs import skill_matrix_jobs
 
 class EndTestSessionView(APIView):
     def post(self, request):
         try:
             key_id_to_answers = request.data  # { key_id: [answers] }
+            room = request_room(request)  # only this room's sessions are scored and closed
+            from_sdk = request.query_params.get('source') == 'sdk'
             results = []
             test_name = ''
             processed_employees = {}  # Track processed employees with their data
 
-            sessions = TestSession.objects.select_related('employee', 'skill', 'level', 'question_paper').all()
+            sessions = TestSession.objects.select_related('employee', 'skill', 'level', 'question_paper').filter(room=room)
 
             # If no sessions exist, this might be a duplicate API call after TestSessions were already deleted
             if sessions.count() == 0:
                 return Response({'test_name': '', 'results': []}, status=200)
 
+            if from_sdk:
+                # Batch result mode: score the vectors pulled per question instead of a posted map
+                collector = remote_service.results_for(room)
+                if not collector.has_answers():
+                    # Scoring nothing would store failing scores that block retakes
+                    return Response({'error': f"No answers have been pulled for room {room}"}, status=409)
+                key_id_to_answers = collector.answers_by_key()
+
             # First pass: collect unique employee-test combinations and their answers
             for session in sessions:
                 key_id = str(session.key_id)
@@ -2535,17 +2819,26 @@ class EndTestSessionView(APIView):
                     'answers': key_id_to_answers.get(key_id, [])
                 }
 
+            # Score the whole room at once: one answer key per paper, one vectorized pass per paper
+            answer_keys = {}
+            scored = {}
+            by_paper = {}
+            for employee_test_key, data in processed_employees.items():
+                by_paper.setdefault(data['question_paper'], []).append(employee_test_key)
+            for question_paper, keys in by_paper.items():
+                answer_keys[question_paper] = scoring.load_answer_key(question_paper)
+                room_scores = scoring.score_answers(answer_keys[question_paper],
+                                                    [processed_employees[k]['answers'] for k in keys])
+                scored.update(zip(keys, room_scores))
+
             # Second pass: process each unique employee-test combination
             for employee_test_key, data in processed_employees.items():
                 session = data['session']
                 employee = data['employee']
                 test_name = data['test_name']
                 question_paper = data['question_paper']
-                answers = data['answers']
 
                 # Use get_or_create to prevent duplicate Score records at database level
-                from django.db import transaction
-
                 try:
                     with transaction.atomic():
                         score, created = Score.objects.get_or_create(
@@ -2562,17 +2855,12 @@ class EndTestSessionView(APIView):
                         )
 
                         if created:
-                            # Calculate score for new record
-                            questions = list(QuizQuestion.objects.filter(question_paper=question_paper).order_by('id'))
-                            correct_count = 0
-                            for i, ans in enumerate(answers):
-                                if i < len(questions) and ans == questions[i].correct_index:
-                                    correct_count += 1
-
-                            # Calculate percentage with proper rounding
-                            total_questions = len(questions)
-                            percentage = round((correct_count / total_questions) * 100, 2) if total_questions > 0 else 0
-                            passed = percentage >= 80
+                            # Score computed for the whole room above
+                            result = scored[employee_test_key]
+                            correct_count = result['marks']
+                            total_questions = result['total_questions']
+                            percentage = result['percentage']
+                            passed = result['passed']
 
                             # Update the score with calculated values
                             score.marks = correct_count
@@ -2586,18 +2874,17 @@ class EndTestSessionView(APIView):
                             correct_count = score.marks
                             percentage = score.percentage
                             passed = score.passed
-                            total_questions = len(QuizQuestion.objects.filter(question_paper=question_paper))
+                            total_questions = len(answer_keys[question_paper])
                             print(f"⚠️ Using existing Score (ID: {score.id}) for {employee.full_name}")
 
                 except Exception as e:
                     print(f"❌ Error creating/getting Score: {str(e)}")
                     continue
 
-                # Automatically update skill matrix if passed
-                if passed:
-                    skill_matrix_update = score.update_skill_matrix()
-                    if skill_matrix_update:
-                        print(f"Updated skill matrix for {employee.full_name}: {session.skill.skill if session.skill else 'Unknown'} Level {score.get_level_number()}")
+                # Skill matrix update runs on the job queue (app1.jobs). score.save() queued it for
+                # new scores; an existing passing score is queued again, as before
+                if passed and not created:
+                    skill_matrix_jobs.enqueue(score)
 
                 result_entry = {
                     'name': employee.full_name,
@@ -2608,7 +2895,9 @@ class EndTestSessionView(APIView):
                 }
                 results.append(result_entry)
 
-            TestSession.objects.all().delete()
+            TestSession.objects.filter(room=room).delete()
+            if from_sdk:
+                remote_service.results_for(room).reset()
 
             return Response({'test_name': test_name, 'results': results}, status=200)
 
@@ -2623,6 +2912,9 @@ class PastTestSessionsView(APIView):
         return Response([s['test_name'] for s in qs])
 
 
+from . import answer_keys
+
+
 class ScoresByTestView(APIView):
     def get(self, request, name):
         scores = (
@@ -2631,10 +2923,19 @@ class ScoresByTestView(APIView):
             .select_related('employee', 'level', 'skill')
         )
 
-        questions_count = QuizQuestion.objects.count() or 1
+        # Question counts per paper from the answer key cache, for all rows at once
+        keys = answer_keys.get_many({s.test_id for s in scores if s.test_id})
+        fallback_count = None
 
         data = []
         for s in scores:
+            if s.test_id:
+                questions_count = keys[s.test_id].count or 1
+            else:
+                # Scores without a paper were always measured against every question
+                if fallback_count is None:
+                    fallback_count = QuizQuestion.objects.count() or 1
+                questions_count = fallback_count
             data.append({
                 'employee_id': s.employee.id,
                 'name': s.employee.full_name,
@@ -1,15 +1,52 @@
 import ctypes
+from array import array
 from ctypes import c_int, c_char_p, c_void_p, CFUNCTYPE
 
+from core.fake_sdk import load_sdk
+from core.key_ring import KeyEventConsumer, KeyEventRing
+
+ANSWER_LETTERS = "ABCD"
+NO_ANSWER = -1
+
+
+def parse_multi_result(raw, key_count):
+    """Turn GetMultiResultByID's "key_id:answer,..." text into answer indexes by key_id - 1.
+
+    Letters map to their QuizQuestion.correct_index (A=0 ... D=3); a key that
+    did not answer, or answered something else, is NO_ANSWER.
+    """
+    answers = array('b', [NO_ANSWER]) * key_count
+    for pair in raw.decode(errors='replace').split(','):
+        key_id, _, answer = pair.partition(':')
+        try:
+            index = int(key_id) - 1
+        except ValueError:
+            continue
+        answer = answer.strip().upper()
+        if 0 <= index < key_count and len(answer) == 1 and answer in ANSWER_LETTERS:
+            answers[index] = ANSWER_LETTERS.index(answer)
+    return answers
+
+
 class EasyTest:
+    KEY_RING_CAPACITY = 4096
+
     def __init__(self):
-        self.lib = ctypes.CDLL("./resources/EasyTestSDK_x64.dll")
+        # The DLL, or the simulated SDK when EASYTEST_SDK=fake
+        self.lib = load_sdk()
         self._connect_cb = CFUNCTYPE(None, c_int, c_int, c_char_p)(self._on_connect)
         self._vote_cb = CFUNCTYPE(None, c_int, c_int, c_char_p)(self._on_vote)
         self._key_cb = CFUNCTYPE(None, c_int, c_int, c_char_p, c_int, ctypes.c_float, c_char_p)(self._on_key)
         self._hd_cb = CFUNCTYPE(None, c_int, c_int, c_char_p)(self._on_hd_param)
         self._keypad_cb = CFUNCTYPE(None, c_int, c_int, c_char_p, c_int, c_char_p)(self._on_keypad_param)
 
+        # Key callbacks only copy their arguments into the ring; the consumer thread
+        # does decoding, persistence and fan-out so the DLL's thread never waits on us
+        self.key_ring = KeyEventRing(self.KEY_RING_CAPACITY)
+        self.key_listeners = []
+        self.key_consumer = KeyEventConsumer(self.key_ring, self._dispatch_key)
+        self.key_consumer.start()
+
         self._define_functions()
         self._register_callbacks()
 
@@ -84,6 +121,38 @@ class EasyTest:
     def vote_stop(self, base_id: int):
         return self.lib.VoteStop2(base_id)
 
+    def pull_results(self, base_id: int, key_count: int):
+        """Every remote's current answer on one base in a single SDK call, as parse_multi_result's array.
+
+        Raises RuntimeError when the SDK call fails, or when it returns text but
+        none of it parses as an answer; silently scoring that as "nobody
+        answered" would fail the whole room.
+        """
+        # Room for "key_id:answer," per remote, with margin for multi-character answers
+        buffer = ctypes.create_string_buffer(key_count * 16 + 1)
+        try:
+            result = self.lib.GetMultiResultByID(buffer, base_id, key_count)
+        finally:
+            self.lib.ExitGetResult()
+        if result != 0:
+            raise RuntimeError(f"GetMultiResultByID failed for base {base_id} (code {result})")
+        answers = parse_multi_result(buffer.value, key_count)
+        if buffer.value.strip() and all(answer == NO_ANSWER for answer in answers):
+            raise RuntimeError(f"Unrecognised GetMultiResultByID reply from base {base_id}: {buffer.value[:80]!r}")
+        return answers
+
+    def add_key_listener(self, listener):
+        """Call listener(base_id, key_id, key_sn, mode, timestamp, info) for every key event, on the consumer thread"""
+        self.key_listeners.append(listener)
+
+    def stop_key_consumer(self, timeout=5.0):
+        self.key_consumer.stop(timeout)
+
+    def get_key_statistics(self):
+        stats = self.key_ring.get_statistics()
+        stats['handler_errors'] = self.key_consumer.errors
+        return stats
+
     # Callbacks (override or extend if subclassing)
     def _on_connect(self, base_id, mode, info):
         print(f"[Connect] BaseID: {base_id}, Mode: {mode}, Info: {info.decode()}")
@@ -95,8 +164,18 @@ class EasyTest:
         print(f"[Vote] BaseID: {base_id}, Mode: {mode}, Info: {info.decode()}")
 
     def _on_key(self, base_id, key_id, key_sn, mode, timestamp, info):
+        # Runs on the SDK's thread: copy and return. ctypes has already turned the
+        # char pointers into bytes objects, so nothing here outlives the callback.
+        self.key_ring.put((base_id, key_id, key_sn, mode, timestamp, info))
+
+    def _dispatch_key(self, base_id, key_id, key_sn, mode, timestamp, info):
+        self._handle_key(base_id, key_id, key_sn, mode, timestamp, info)
+        for listener in self.key_listeners:
+            listener(base_id, key_id, key_sn, mode, timestamp, info)
+
+    def _handle_key(self, base_id, key_id, key_sn, mode, timestamp, info):
         print(f"[Key] BaseID: {base_id}, KeyID: {key_id}, KeySN: {key_sn.decode()}, Mode: {mode}, Time: {timestamp}, Info: {info.decode()}")
-        
+
 
     def _on_hd_param(self, base_id, mode, info):
         print(f"[HD Param] BaseID: {base_id}, Mode: {mode}, Info: {info.decode()}")
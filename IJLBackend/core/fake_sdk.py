@@ -0,0 +1,255 @@
+"""Pure-Python stand-in for EasyTestSDK_x64.dll.
+
+FakeEasyTestLib exposes the same exports the ctypes wrappers call (License,
+Connect, VoteStart2, GetMultiResultByID, the Set*CallBack registrations, ...)
+and accepts the same argtypes/restype assignments. Code written against the
+DLL therefore runs unchanged on Linux CI. Callbacks fire from the fake's own
+threads, as the real SDK fires them from its own worker threads, so
+thread-safety problems show up here too.
+
+Selected with EASYTEST_SDK=fake, or EASYTEST_SDK = 'fake' in Django settings.
+Traffic is tuned with environment variables (or the EASYTEST_FAKE_SDK settings
+dict, using the same names in lower case without the prefix):
+
+    EASYTEST_FAKE_BASES          bases that come online on Connect (default 1)
+    EASYTEST_FAKE_REMOTES        remotes per base (default 30)
+    EASYTEST_FAKE_RATE           answers per remote per minute while voting (default 6)
+    EASYTEST_FAKE_CONNECT_DELAY  seconds from Connect to the "ready" callback (default 0.2)
+    EASYTEST_FAKE_SEED           random seed, for repeatable runs (default 1)
+"""
+import ctypes
+import os
+import random
+import threading
+import time
+
+DLL_PATH = "./resources/EasyTestSDK_x64.dll"
+
+DEFAULTS = {
+    'bases': 1,
+    'remotes': 30,
+    'rate': 6.0,
+    'connect_delay': 0.2,
+    'seed': 1,
+}
+
+ANSWERS = b"ABCD"
+
+
+def _settings_value(name, default=None):
+    """Read an EASYTEST_* Django setting without requiring Django to be configured"""
+    try:
+        from django.conf import settings
+        if settings.configured:
+            return getattr(settings, name, default)
+    except ImportError:
+        pass
+    return default
+
+
+def sdk_mode():
+    return (os.environ.get('EASYTEST_SDK') or _settings_value('EASYTEST_SDK') or 'dll').lower()
+
+
+def fake_config():
+    config = dict(DEFAULTS)
+    config.update(_settings_value('EASYTEST_FAKE_SDK', None) or {})
+    for key, default in DEFAULTS.items():
+        value = os.environ.get(f"EASYTEST_FAKE_{key.upper()}")
+        if value is not None:
+            config[key] = type(default)(value)
+    return config
+
+
+def load_sdk(paths=(DLL_PATH,)):
+    """The real DLL from the first path that loads, or FakeEasyTestLib when the fake is selected"""
+    if sdk_mode() == 'fake':
+        return FakeEasyTestLib(**fake_config())
+    for path in paths:
+        try:
+            return ctypes.CDLL(path)
+        except OSError:
+            continue
+    raise FileNotFoundError("EasyTestSDK_x64.dll not found in any expected location")
+
+
+class _Export:
+    """Callable that takes argtypes/restype like a ctypes function pointer does"""
+
+    def __init__(self, func):
+        self.func = func
+        self.argtypes = None
+        self.restype = ctypes.c_int
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+
+class FakeEasyTestLib:
+    EXPORTS = (
+        'License', 'SetLogOn', 'Connect', 'Disconnect',
+        'WriteHDParam', 'ReadHDParam', 'WriteKeypadParam', 'ReadKeypadParam',
+        'VoteStart2', 'VoteStop2', 'GetMultiResultByID', 'GetResultBySN', 'ExitGetResult',
+        'SetConnectEventCallBack', 'SetVoteEventCallBack', 'SetKeyEventCallBack',
+        'SetHDParamEventCallBack', 'SetKeypadParamEventCallBack',
+    )
+
+    def __init__(self, bases=1, remotes=30, rate=6.0, connect_delay=0.2, seed=1):
+        self.bases = bases
+        self.remotes = remotes
+        self.rate = rate
+        self.connect_delay = connect_delay
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.callbacks = {}
+        self.connected = set()
+        self.voting = {}  # base_id -> threading.Event that stops its key generator
+        self.results = {}  # (base_id, key_id) -> last answer, for GetMultiResultByID
+        self.lock = threading.Lock()
+        self.keys_fired = 0
+        for name in self.EXPORTS:
+            setattr(self, name, _Export(getattr(self, f"_{name}")))
+
+    # Licensing and logging
+    def _License(self, license_type, key):
+        return 0
+
+    def _SetLogOn(self, on):
+        return 0
+
+    # Callback registration
+    def _SetConnectEventCallBack(self, callback):
+        self.callbacks['connect'] = callback
+
+    def _SetVoteEventCallBack(self, callback):
+        self.callbacks['vote'] = callback
+
+    def _SetKeyEventCallBack(self, callback):
+        self.callbacks['key'] = callback
+
+    def _SetHDParamEventCallBack(self, callback):
+        self.callbacks['hd_param'] = callback
+
+    def _SetKeypadParamEventCallBack(self, callback):
+        self.callbacks['keypad_param'] = callback
+
+    def _fire(self, kind, *args):
+        callback = self.callbacks.get(kind)
+        if callback is not None:
+            # ctypes converts the arguments and swallows callback exceptions, like the DLL
+            callback(*args)
+
+    # Connection
+    def _Connect(self, conn_type, conn_str):
+        threading.Thread(target=self._bring_up_bases, name='fake-sdk-connect', daemon=True).start()
+        return 0
+
+    def _bring_up_bases(self):
+        for base_id in range(1, self.bases + 1):
+            self._fire('connect', base_id, 1, b"2")  # connection in progress
+        time.sleep(self.connect_delay)
+        for base_id in range(1, self.bases + 1):
+            with self.lock:
+                self.connected.add(base_id)
+            self._fire('connect', base_id, 1, b"1")  # connected and ready
+
+    def _Disconnect(self, base_id):
+        targets = self._targets(base_id)
+        for target in targets:
+            self._stop_voting(target)
+            with self.lock:
+                self.connected.discard(target)
+            self._fire('connect', target, 1, b"0")
+        return 0
+
+    def _targets(self, base_id):
+        with self.lock:
+            return sorted(self.connected) if base_id == 0 else [base_id] if base_id in self.connected else []
+
+    # Parameters
+    def _WriteHDParam(self, base_id, mode, param):
+        self._fire('hd_param', base_id, mode, param or b"")
+        return 0
+
+    def _ReadHDParam(self, base_id, mode):
+        self._fire('hd_param', base_id, mode, b"")
+        return 0
+
+    def _WriteKeypadParam(self, base_id, key_id, key_sn, mode, param):
+        self._fire('keypad_param', base_id, key_id, key_sn or b"", mode, param or b"")
+        return 0
+
+    def _ReadKeypadParam(self, base_id, key_id, key_sn, mode, param):
+        self._fire('keypad_param', base_id, key_id, key_sn or b"", mode, b"")
+        return 0
+
+    # Voting
+    def _VoteStart2(self, base_id, vote_type, config):
+        for target in self._targets(base_id):
+            with self.lock:
+                if target in self.voting:
+                    continue
+                stop = self.voting[target] = threading.Event()
+                # A new question: GetMultiResultByID must not report the last one's answers
+                for key in [key for key in self.results if key[0] == target]:
+                    del self.results[key]
+            self._fire('vote', target, vote_type, b"start")
+            threading.Thread(target=self._press_keys, args=(target, stop),
+                             name=f"fake-sdk-base-{target}", daemon=True).start()
+        return 0
+
+    def _VoteStop2(self, base_id):
+        for target in self._targets(base_id):
+            if self._stop_voting(target):
+                self._fire('vote', target, 0, b"stop")
+        return 0
+
+    def _stop_voting(self, base_id):
+        with self.lock:
+            stop = self.voting.pop(base_id, None)
+        if stop is not None:
+            stop.set()
+        return stop is not None
+
+    def _press_keys(self, base_id, stop):
+        """Poisson keypresses from all remotes of one base until voting stops"""
+        per_second = self.rate / 60.0 * self.remotes
+        if per_second <= 0:
+            return
+        while True:
+            with self.rng_lock:
+                delay = self.rng.expovariate(per_second)
+                key_id = self.rng.randint(1, self.remotes)
+                answer = ANSWERS[self.rng.randrange(len(ANSWERS)):][:1]
+            if stop.wait(delay):
+                return
+            with self.lock:
+                self.results[(base_id, key_id)] = answer
+                self.keys_fired += 1
+            self._fire('key', base_id, key_id, f"SN{base_id:02d}{key_id:04d}".encode(), 1, time.time(), answer)
+
+    # Result pull
+    def _GetMultiResultByID(self, buffer, base_id, key_count):
+        """Write "key_id:answer" pairs for keys 1..key_count into buffer; returns 0 like the other exports"""
+        with self.lock:
+            pairs = [f"{key_id}:{self.results[(base_id, key_id)].decode()}"
+                     for key_id in range(1, key_count + 1) if (base_id, key_id) in self.results]
+        self._write(buffer, ",".join(pairs).encode())
+        return 0
+
+    def _GetResultBySN(self, buffer, base_id, key_id):
+        with self.lock:
+            answer = self.results.get((base_id, key_id))
+        self._write(buffer, answer or b"")
+        return 1 if answer else 0
+
+    def _ExitGetResult(self):
+        return 0
+
+    @staticmethod
+    def _write(buffer, data):
+        # Callers pass ctypes.create_string_buffer(); plain bytes are immutable and left alone
+        if isinstance(buffer, ctypes.Array):
+            size = min(len(data), len(buffer) - 1)
+            buffer[:size] = data[:size]
+            buffer[size] = b"\0"
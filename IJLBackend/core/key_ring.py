@@ -0,0 +1,139 @@
+import threading
+import time
+
+
+class KeyEventRing:
+    """Fixed-capacity ring buffer between the SDK callback thread and a consumer.
+
+    put() is all the native callback does: it claims a sequence number, stores
+    the raw argument tuple in a preallocated slot and returns. Only claiming
+    the number takes a lock, a few instructions that never wait on the
+    consumer, so several SDK threads can put() at once and the claimed
+    high-water mark never moves backwards. When the consumer is a full ring
+    behind, the event is dropped and counted instead of blocking the DLL. A
+    dropped sequence number is recorded so the consumer steps over it.
+
+    The other counters are written by one thread each (or derived from the
+    skipped set), so the drop count stays exact with several producers.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.items = [None] * capacity
+        self.seqs = [-1] * capacity  # sequence number last published into each slot
+        self.claim_lock = threading.Lock()
+        self.claimed = 0  # next sequence number to hand out
+        self.read_pos = 0
+        self.skipped = set()  # dropped sequence numbers the consumer has not stepped over yet
+        self.skipped_passed = 0
+        self.consumed = 0
+        self.max_depth = 0
+        self.consumer_idle = False
+        self.wakeup = threading.Event()
+
+    def put(self, item):
+        """Store item; False if the ring was full and it was dropped"""
+        with self.claim_lock:
+            seq = self.claimed
+            self.claimed = seq + 1
+        stored = seq - self.read_pos < self.capacity
+        if stored:
+            slot = seq % self.capacity
+            self.items[slot] = item
+            self.seqs[slot] = seq  # publish after the item is in place
+        else:
+            self.skipped.add(seq)
+        if self.consumer_idle:
+            self.wakeup.set()
+        return stored
+
+    def get_batch(self, limit=256):
+        """Pop up to limit items in arrival order without waiting"""
+        batch = []
+        while len(batch) < limit:
+            pos = self.read_pos
+            slot = pos % self.capacity
+            if self.seqs[slot] == pos:
+                batch.append(self.items[slot])
+                self.items[slot] = None
+            elif pos in self.skipped:
+                self.skipped.discard(pos)
+                self.skipped_passed += 1
+            else:
+                # Not produced yet, or a producer is between claiming and publishing
+                break
+            self.read_pos = pos + 1
+        if batch:
+            depth = len(batch) + self.depth()
+            if depth > self.max_depth:
+                self.max_depth = depth
+            self.consumed += len(batch)
+        return batch
+
+    def wait(self, timeout):
+        """Sleep until a producer signals new data, at most timeout seconds"""
+        self.consumer_idle = True
+        self.wakeup.clear()
+        # Re-check after advertising idleness so a put() in between is not missed
+        if self.seqs[self.read_pos % self.capacity] != self.read_pos and self.read_pos not in self.skipped:
+            self.wakeup.wait(timeout)
+        self.consumer_idle = False
+
+    @property
+    def dropped(self):
+        return self.skipped_passed + len(self.skipped)
+
+    def depth(self):
+        return max(0, self.claimed - self.read_pos - len(self.skipped))
+
+    def get_statistics(self):
+        return {
+            'capacity': self.capacity,
+            'depth': self.depth(),
+            'max_depth': self.max_depth,
+            'consumed': self.consumed,
+            'dropped': self.dropped,
+        }
+
+
+class KeyEventConsumer:
+    """Thread that drains a KeyEventRing and hands each raw event to handler"""
+
+    def __init__(self, ring, handler, idle_wait=0.05):
+        self.ring = ring
+        self.handler = handler
+        self.idle_wait = idle_wait
+        self.errors = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='sdk-key-consumer', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while self.running:
+            batch = self.ring.get_batch()
+            if not batch:
+                self.ring.wait(self.idle_wait)
+                continue
+            for item in batch:
+                try:
+                    self.handler(*item)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"[Key] Error handling event {item[:3]}: {e}")
+
+    def stop(self, timeout=5.0):
+        """Drain what is already buffered, then stop the thread"""
+        deadline = time.monotonic() + timeout
+        while self.ring.depth() and time.monotonic() < deadline and self.thread and self.thread.is_alive():
+            time.sleep(0.01)
+        self.running = False
+        self.ring.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+        self.thread = None
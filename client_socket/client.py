@@ -1,15 +1,22 @@
 import json
+import logging
+import os
+import sys
 import time
 import ctypes
 from ctypes import c_int, c_char_p, CFUNCTYPE
 from datetime import datetime
-import requests
+
+from uploader import EventUploader
 
 class EasyTestHttpClient:
     def __init__(self, server_base_url):
         self.server_url = server_base_url.rstrip('/')
         self.device_connected = False
         self.connection_in_progress = False
+        # SDK callbacks only persist to the outbox; the uploader thread does the HTTP work
+        self.uploader = EventUploader(self.server_url, bulk_endpoints={'key-events'})
+        self.uploader.start()
 
         possible_paths = [
             "./resources/EasyTestSDK_x64.dll",
@@ -19,8 +26,10 @@ class EasyTestHttpClient:
             "../EasyTestSDK_x64.dll"
         ]
 
-        self.lib = None
+        self.lib = self._load_fake_sdk() if os.environ.get('EASYTEST_SDK', '').lower() == 'fake' else None
         for path in possible_paths:
+            if self.lib is not None:
+                break
             try:
                 self.lib = ctypes.CDLL(path)
                 print(f"✅ Found EasyTest SDK at: {path}")
@@ -38,6 +47,14 @@ class EasyTestHttpClient:
         self.lib.License(1, b"SUNARS2013")
         self.lib.SetLogOn(0)
 
+    @staticmethod
+    def _load_fake_sdk():
+        # The simulated SDK lives with the backend's core package
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'IJLBackend'))
+        from core.fake_sdk import FakeEasyTestLib, fake_config
+        print("🧪 Using simulated EasyTest SDK (EASYTEST_SDK=fake)")
+        return FakeEasyTestLib(**fake_config())
+
     def _setup_callbacks(self):
         self._connect_cb = CFUNCTYPE(None, c_int, c_int, c_char_p)(self._on_connect)
         self._vote_cb = CFUNCTYPE(None, c_int, c_int, c_char_p)(self._on_vote)
@@ -78,19 +95,11 @@ class EasyTestHttpClient:
         self.lib.SetKeypadParamEventCallBack(self._keypad_cb)
 
     def _post_event(self, endpoint, data):
-        url = f"{self.server_url}/api/{endpoint}/create/"
-        try:
-            for attempt in range(3):
-                response = requests.post(url, json=data, timeout=5)
-                if response.status_code == 201:
-                    print(f"✅ Event posted to {endpoint}")
-                    return True
-                else:
-                    print(f"❌ Failed to post event to {endpoint}: {response.status_code} {response.text}")
-                time.sleep(1)
-            print(f"❌ Giving up posting event to {endpoint} after retries.")
-        except Exception as e:
-            print(f"❌ HTTP post error to {endpoint}: {e}")
+        # Called on the DLL's callback thread: commits to the local outbox, never waits on the network
+        self.uploader.submit(endpoint, data)
+
+    def get_statistics(self):
+        return self.uploader.get_statistics()
 
     def _on_connect(self, base_id, mode, info):
         info_str = info.decode() if info else ""
@@ -193,6 +202,7 @@ class EasyTestHttpClient:
 
 def main():
     SERVER_BASE = "http://127.0.0.1:8000"  # or your LAN IP if different machine
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     print("🚀 Starting EasyTest HTTP Client...")
     client = EasyTestHttpClient(SERVER_BASE)
 
@@ -208,14 +218,19 @@ def main():
         else:
             print("⏳ Device connected. Awaiting SDK events...")
 
+        last_report = time.monotonic()
         while True:
             time.sleep(1)
+            if time.monotonic() - last_report >= 60:
+                last_report = time.monotonic()
+                print(f"📊 Upload stats: {json.dumps(client.get_statistics())}")
 
     except KeyboardInterrupt:
         print("\n🛑 Shutting down client...")
 
     finally:
         client.disconnect_device()
+        client.uploader.stop()
         print("🪜 Cleanup done.")
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class OutboxFull(Exception):
+    pass
+
+
+class EventOutbox:
+    """Crash-safe local queue of events waiting for the Django backend.
+
+    Every event is committed to a SQLite WAL file before the SDK callback
+    returns, so a backend outage, a client crash or a reboot loses nothing.
+    Events are replayed oldest first. Each carries an idempotency_key minted at
+    append time, so a replay after an ambiguous failure (the server saved the
+    event but the response was lost) is not stored twice: the connect and vote
+    event views look the key up, and key events are deduplicated on
+    (base_id, key_id, key_sn, client_timestamp) instead. Disk use is
+    bounded by max_bytes of payload; append raises OutboxFull beyond it.
+    """
+
+    def __init__(self, path='easytest_outbox.db', max_bytes=256 * 1024 * 1024, fsync=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        # FULL fsyncs every commit so an acknowledged event also survives power loss
+        self.conn.execute(f"PRAGMA synchronous={'FULL' if fsync else 'NORMAL'}")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                endpoint TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        self.conn.commit()
+        self.pending, pending_bytes = self.conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM outbox').fetchone()
+        self.pending_bytes = pending_bytes
+
+    def append(self, endpoint, data):
+        """Persist one event and return its idempotency key"""
+        data = dict(data)
+        data.setdefault('idempotency_key', uuid.uuid4().hex)
+        payload = json.dumps(data)
+        with self.lock:
+            if self.pending_bytes + len(payload) > self.max_bytes:
+                raise OutboxFull(f"outbox holds {self.pending_bytes} bytes (limit {self.max_bytes})")
+            self.conn.execute('INSERT INTO outbox (endpoint, payload, created_at) VALUES (?, ?, ?)',
+                              (endpoint, payload, time.time()))
+            self.conn.commit()
+            self.pending += 1
+            self.pending_bytes += len(payload)
+        return data['idempotency_key']
+
+    def peek(self, limit):
+        """Oldest events first as (id, endpoint, data); they stay stored until remove()"""
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT id, endpoint, payload FROM outbox ORDER BY id LIMIT ?', (limit,)).fetchall()
+        return [(row_id, endpoint, json.loads(payload)) for row_id, endpoint, payload in rows]
+
+    def remove(self, ids):
+        if not ids:
+            return
+        with self.lock:
+            placeholders = ','.join('?' * len(ids))
+            removed_bytes = self.conn.execute(
+                f'SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM outbox WHERE id IN ({placeholders})',
+                ids).fetchone()[0]
+            cursor = self.conn.execute(f'DELETE FROM outbox WHERE id IN ({placeholders})', ids)
+            self.conn.commit()
+            self.pending -= cursor.rowcount
+            self.pending_bytes -= removed_bytes
+            if self.pending == 0:
+                # Give the pages of a drained backlog back to the filesystem
+                self.conn.execute('PRAGMA incremental_vacuum')
+
+    def oldest_age(self):
+        with self.lock:
+            row = self.conn.execute('SELECT MIN(created_at) FROM outbox').fetchone()
+        return time.time() - row[0] if row[0] is not None else 0.0
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def get_statistics(self):
+        return {
+            'pending': self.pending,
+            'pending_bytes': self.pending_bytes,
+            'max_bytes': self.max_bytes,
+            'oldest_age_s': round(self.oldest_age(), 1),
+        }
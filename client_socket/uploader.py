@@ -0,0 +1,234 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from outbox import EventOutbox, OutboxFull
+
+# Statuses worth retrying; anything else is the server rejecting the event itself
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+
+class EndpointStats:
+    RATE_WINDOW = 10.0
+
+    def __init__(self):
+        self.sent = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.batches = 0
+        self.retries = 0
+        self.last_latency_ms = 0.0
+        self.recent = deque()  # (monotonic time, events sent) per batch, last RATE_WINDOW seconds
+
+    def record_batch(self, sent, latency_ms):
+        now = time.monotonic()
+        self.sent += sent
+        self.batches += 1
+        self.last_latency_ms = latency_ms
+        self.recent.append((now, sent))
+        while self.recent and self.recent[0][0] < now - self.RATE_WINDOW:
+            self.recent.popleft()
+
+    def as_dict(self):
+        now = time.monotonic()
+        recent = sum(count for at, count in self.recent if at >= now - self.RATE_WINDOW)
+        return {
+            'sent': self.sent,
+            'rejected': self.rejected,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'retries': self.retries,
+            'events_per_sec': round(recent / self.RATE_WINDOW, 2),
+            'last_latency_ms': round(self.last_latency_ms, 2),
+        }
+
+
+class EventUploader:
+    """Background sender for SDK events, backed by a durable outbox.
+
+    SDK callbacks call submit(), which commits the event to the on-disk outbox
+    and returns, so the DLL's callback thread never waits on the network. One
+    sender thread replays the outbox in order, in batches over a keep-alive
+    requests.Session. Events leave the outbox only once the server accepted or
+    permanently rejected them. While the backend is unreachable the sender
+    backs off exponentially with jitter, and the backlog stays on disk across
+    restarts. Replay is capped at replay_rate events per second so a long
+    backlog does not flatten the server when it comes back. Endpoints listed in
+    bulk_endpoints get the whole batch in one request; the rest are posted one
+    event at a time over the same pooled connection.
+    """
+
+    def __init__(self, server_url, outbox_path='easytest_outbox.db', batch_size=50, flush_interval=0.05,
+                 max_outbox_bytes=256 * 1024 * 1024, replay_rate=200.0, base_backoff=0.5,
+                 max_backoff=30.0, timeout=5.0, bulk_endpoints=()):
+        self.server_url = server_url.rstrip('/')
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.replay_rate = replay_rate
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.bulk_endpoints = set(bulk_endpoints)
+
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+        self.outbox = EventOutbox(outbox_path, max_bytes=max_outbox_bytes)
+        if self.outbox.pending:
+            logger.info("Outbox has %d event(s) from a previous run, replaying", self.outbox.pending)
+        self.max_queue_depth = self.outbox.pending
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.backing_off = False
+        self.thread = None
+
+    def _stats(self, endpoint):
+        stats = self.stats.get(endpoint)
+        if stats is None:
+            stats = self.stats[endpoint] = EndpointStats()
+        return stats
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name='event-uploader', daemon=True)
+        self.thread.start()
+
+    def submit(self, endpoint, data):
+        """Persist one event for upload; returns False only if the outbox is full"""
+        try:
+            self.outbox.append(endpoint, data)
+        except OutboxFull as e:
+            with self.stats_lock:
+                self._stats(endpoint).dropped += 1
+            logger.error("Outbox full, dropping %s event: %s", endpoint, e)
+            return False
+        if self.outbox.pending > self.max_queue_depth:
+            self.max_queue_depth = self.outbox.pending
+        self.wakeup.set()
+        return True
+
+    def _run(self):
+        failures = 0
+        while not self.stopping.is_set():
+            batch = self.outbox.peek(self.batch_size)
+            if not batch:
+                self.wakeup.wait(1.0)
+                self.wakeup.clear()
+                continue
+            if len(batch) < self.batch_size:
+                # Give a burst of keypresses a moment to coalesce into one batch
+                self.stopping.wait(self.flush_interval)
+                batch = self.outbox.peek(self.batch_size)
+
+            started = time.monotonic()
+            done, ok = self._send_batch(batch)
+            self.outbox.remove(done)
+            self.backing_off = not ok
+            if ok:
+                failures = 0
+            else:
+                failures += 1
+                delay = min(self.max_backoff, self.base_backoff * 2 ** (failures - 1))
+                # Jitter so a room of clients does not retry in lockstep after an outage
+                self.stopping.wait(delay * random.uniform(0.5, 1.0))
+                continue
+
+            if self.replay_rate:
+                budget = len(done) / self.replay_rate - (time.monotonic() - started)
+                if budget > 0:
+                    self.stopping.wait(budget)
+
+    def _send_batch(self, batch):
+        """Post batch in order; returns (ids to remove, False if it stopped on a retryable failure)"""
+        # Keep arrival order: consecutive events for the same endpoint form one group
+        groups = []
+        for row_id, endpoint, data in batch:
+            if groups and groups[-1][0] == endpoint:
+                groups[-1][1].append((row_id, data))
+            else:
+                groups.append((endpoint, [(row_id, data)]))
+
+        done = []
+        for endpoint, events in groups:
+            started = time.perf_counter()
+            sent = 0
+            if endpoint in self.bulk_endpoints:
+                outcome = self._post(endpoint, f"{endpoint}/bulk", [data for _, data in events])
+                if outcome is None:
+                    return done, False
+                done.extend(row_id for row_id, _ in events)
+                sent = len(events) if outcome else 0
+            else:
+                for row_id, data in events:
+                    outcome = self._post(endpoint, f"{endpoint}/create", data)
+                    if outcome is None:
+                        self._record(endpoint, sent, started)
+                        return done, False
+                    done.append(row_id)
+                    sent += outcome
+            self._record(endpoint, sent, started)
+        return done, True
+
+    def _record(self, endpoint, sent, started):
+        with self.stats_lock:
+            self._stats(endpoint).record_batch(sent, (time.perf_counter() - started) * 1000)
+
+    def _post(self, endpoint, path, payload):
+        """True if accepted, False if permanently rejected, None if worth retrying later"""
+        url = f"{self.server_url}/api/{path}/"
+        count = len(payload) if isinstance(payload, list) else 1
+        headers = {} if isinstance(payload, list) else {'Idempotency-Key': payload['idempotency_key']}
+        try:
+            response = self.session.post(url, json=payload, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.warning("HTTP post error to %s: %s", endpoint, e)
+            with self.stats_lock:
+                self._stats(endpoint).retries += count
+            return None
+        if response.status_code in (200, 201):
+            return True
+        if response.status_code in RETRY_STATUSES:
+            logger.warning("%s returned %s, will retry", endpoint, response.status_code)
+            with self.stats_lock:
+                self._stats(endpoint).retries += count
+            return None
+        logger.error("%s rejected event: %s %s", endpoint, response.status_code, response.text[:200])
+        with self.stats_lock:
+            self._stats(endpoint).rejected += count
+        return False
+
+    def stop(self, timeout=10.0):
+        """Stop the sender; anything not yet delivered stays in the outbox for the next start"""
+        if self.thread and self.thread.is_alive():
+            deadline = time.monotonic() + timeout
+            while (self.outbox.pending and not self.backing_off and time.monotonic() < deadline
+                   and self.thread.is_alive()):
+                self.wakeup.set()
+                time.sleep(0.05)
+            self.stopping.set()
+            self.wakeup.set()
+            self.thread.join(timeout=self.timeout + 1)
+        self.thread = None
+        self.session.close()
+        self.outbox.close()
+
+    def get_statistics(self):
+        with self.stats_lock:
+            return {
+                'queue_depth': self.outbox.pending,
+                'max_queue_depth': self.max_queue_depth,
+                'outbox': self.outbox.get_statistics(),
+                'endpoints': {endpoint: stats.as_dict() for endpoint, stats in self.stats.items()},
+            }
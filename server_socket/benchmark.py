@@ -0,0 +1,341 @@
+"""Benchmarks for the EasyTest socket server.
+
+Run from the server_socket directory:
+
+    python benchmark.py engines --connections 2000 --bases 40 --events 200
+    python benchmark.py framing --size 1048576
+    python benchmark.py wire --events 200000
+
+The load is generated from a separate process so the client side does not
+compete with the server for the GIL. Latency is measured from the
+client_timestamp a simulated base stamps on a key_event to the moment the
+server handler runs it.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from framing import LineFramer
+from server import SERVER_ENGINES
+from wire import FORMAT_BINARY, FORMAT_JSON, SUPPORTED_FORMATS, BinaryFramer, encode_message
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def instrumented(server_class):
+    """Subclass server_class so every key_event records its end-to-end latency"""
+
+    class InstrumentedServer(server_class):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.latencies = []
+
+        def handle_key_event(self, client_id, message):
+            sent = message.get('data', {}).get('client_timestamp')
+            if sent:
+                self.latencies.append(time.time() - datetime.fromisoformat(sent).timestamp())
+            super().handle_key_event(client_id, message)
+
+    return InstrumentedServer
+
+
+def key_event(base_id, key_id, seq):
+    return {
+        'type': 'key_event',
+        'data': {
+            'base_id': base_id,
+            'key_id': key_id,
+            'key_sn': f"SN{key_id:05d}",
+            'mode': 1,
+            'timestamp': seq,
+            'info': "ABCD"[seq % 4],
+            'client_timestamp': datetime.now().isoformat(),
+            'event_type': 'real_hardware',
+        }
+    }
+
+
+def key_event_line(base_id, key_id, seq):
+    return (json.dumps(key_event(base_id, key_id, seq)) + '\n').encode('utf-8')
+
+
+async def _connection_churn(port, total, concurrency):
+    connect_line = (json.dumps({
+        'type': 'connect_event',
+        'data': {'base_id': 1, 'mode': 1, 'info': '1'}
+    }) + '\n').encode('utf-8')
+    remaining = [total]
+    failed = [0]
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(connect_line)
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                failed[0] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, failed[0]
+
+
+async def _event_stream(port, bases, events, interval, wire_format=FORMAT_JSON):
+    failed = [0]
+    hello = (json.dumps({'type': 'hello', 'formats': [wire_format]}) + '\n').encode('utf-8')
+
+    async def base(base_id):
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            if wire_format == FORMAT_BINARY:
+                writer.write(hello)
+                await writer.drain()
+                await reader.readline()
+            for seq in range(events):
+                if wire_format == FORMAT_BINARY:
+                    writer.write(encode_message(key_event(base_id, seq % 60 + 1, seq)))
+                else:
+                    writer.write(key_event_line(base_id, seq % 60 + 1, seq))
+                await writer.drain()
+                if interval:
+                    await asyncio.sleep(interval)
+            # Keep the connection open long enough for the server to drain it
+            await asyncio.sleep(0.5)
+            writer.close()
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            failed[0] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(base(base_id) for base_id in range(1, bases + 1)))
+    return time.perf_counter() - started, failed[0]
+
+
+def _engine_load(port, args, results):
+    churn_elapsed, churn_failed = asyncio.run(
+        _connection_churn(port, args.connections, args.concurrency))
+    stream_elapsed, stream_failed = asyncio.run(
+        _event_stream(port, args.bases, args.events, args.interval, args.wire))
+    results.put({
+        'churn_elapsed': churn_elapsed,
+        'churn_failed': churn_failed,
+        'stream_elapsed': stream_elapsed,
+        'stream_failed': stream_failed,
+    })
+
+
+def run_engine(name, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        with contextlib.redirect_stdout(io.StringIO()):
+            server = instrumented(SERVER_ENGINES[name])(
+                host='127.0.0.1', port=port, data_dir=tmp
+            )
+            server_thread = threading.Thread(target=server.start_server, daemon=True)
+            server_thread.start()
+            while not server.running:
+                time.sleep(0.01)
+
+            results = multiprocessing.Queue()
+            load = multiprocessing.Process(target=_engine_load, args=(port, args, results))
+            load.start()
+            outcome = results.get()
+            load.join()
+
+            expected = args.bases * args.events
+            deadline = time.time() + 10
+            while len(server.latencies) < expected and time.time() < deadline:
+                time.sleep(0.05)
+
+            server.running = False
+            server_thread.join(timeout=10)
+
+    latencies_ms = [latency * 1000 for latency in server.latencies]
+    writer_stats = server.writer.get_statistics()
+    return {
+        'engine': name,
+        'connections_per_sec': args.connections / outcome['churn_elapsed'],
+        'events_received': len(latencies_ms),
+        'events_sent': args.bases * args.events,
+        'failed_connections': outcome['churn_failed'] + outcome['stream_failed'],
+        'p50_ms': percentile(latencies_ms, 50),
+        'p99_ms': percentile(latencies_ms, 99),
+        'rows_written': writer_stats['rows_written'],
+        'avg_flush_ms': writer_stats['flush_latency_ms']['avg'],
+    }
+
+
+def bench_engines(args):
+    print(f"Connection churn: {args.connections} connections, concurrency {args.concurrency}")
+    print(f"Event stream: {args.bases} bases x {args.events} key events ({args.wire})\n")
+    print(f"{'engine':<10} {'conn/s':>10} {'events':>13} {'p50 ms':>9} {'p99 ms':>9} "
+          f"{'db rows':>8} {'flush ms':>9} {'failed':>7}")
+    for name in args.engine:
+        result = run_engine(name, args)
+        print(f"{result['engine']:<10} {result['connections_per_sec']:>10.0f} "
+              f"{result['events_received']:>6}/{result['events_sent']:<6} "
+              f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+              f"{result['rows_written']:>8} {result['avg_flush_ms']:>9.2f} "
+              f"{result['failed_connections']:>7}")
+
+
+def legacy_split(chunks):
+    """The str-concatenation framing handle_client used before LineFramer.
+
+    Complete lines are only counted, not parsed, so the comparison measures
+    framing cost alone; the trailing partial buffer is still parsed as before.
+    """
+    frames = 0
+    buffer = ""
+    for data in chunks:
+        buffer += data.decode('utf-8')
+        while '\n' in buffer:
+            line, buffer = buffer.split('\n', 1)
+            if line.strip():
+                frames += 1
+        if buffer.strip() and '\n' not in buffer:
+            try:
+                json.loads(buffer.strip())
+                frames += 1
+                buffer = ""
+            except json.JSONDecodeError:
+                if len(buffer) > 10000:
+                    buffer = ""
+    return frames
+
+
+def line_framer(chunks):
+    frames = 0
+    framer = LineFramer()
+    for data in chunks:
+        frames += len(framer.feed(data))
+    return frames
+
+
+def bench_framing(args):
+    payload = bytearray()
+    seq = 0
+    while len(payload) < args.size:
+        payload += key_event_line(seq % 8 + 1, seq % 60 + 1, seq)
+        seq += 1
+    payload = bytes(payload)
+    print(f"Pipelined payload: {len(payload)} bytes, {seq} key events\n")
+    print(f"{'parser':<12} {'chunk':>7} {'frames':>8} {'MB/s':>9} {'ms':>9}")
+
+    for chunk_size in args.chunk:
+        chunks = [payload[i:i + chunk_size] for i in range(0, len(payload), chunk_size)]
+        for name, parser in (('legacy', legacy_split), ('LineFramer', line_framer)):
+            best = None
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                frames = parser(chunks)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            print(f"{name:<12} {chunk_size:>7} {frames:>8} "
+                  f"{len(payload) / best / 1e6:>9.1f} {best * 1000:>9.1f}")
+
+
+def _json_lines_round_trip(events):
+    framer = LineFramer()
+    decoded = 0
+    for event in events:
+        for line in framer.feed((json.dumps(event) + '\n').encode('utf-8')):
+            json.loads(line)
+            decoded += 1
+    return decoded
+
+
+def _binary_round_trip(events):
+    framer = BinaryFramer()
+    decoded = 0
+    for event in events:
+        decoded += len(framer.feed(encode_message(event)))
+    return decoded
+
+
+def bench_wire(args):
+    events = [key_event(seq % 8 + 1, seq % 60 + 1, seq) for seq in range(args.events)]
+
+    sizes = {
+        FORMAT_JSON: len(json.dumps(events[0]).encode('utf-8')) + 1,
+        FORMAT_BINARY: len(encode_message(events[0])),
+    }
+    runners = {FORMAT_JSON: _json_lines_round_trip, FORMAT_BINARY: _binary_round_trip}
+
+    print(f"{args.events} key events, encode + frame + decode on one core\n")
+    print(f"{'format':<12} {'bytes/event':>12} {'events/s':>12}")
+    for wire_format in SUPPORTED_FORMATS[::-1]:
+        best = None
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            decoded = runners[wire_format](events)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        assert decoded == len(events)
+        print(f"{wire_format:<12} {sizes[wire_format]:>12} {len(events) / best:>12.0f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="EasyTest socket server benchmarks")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    engines = subparsers.add_parser('engines', help="threaded vs asyncio connection engine")
+    engines.add_argument('--engine', nargs='+', choices=sorted(SERVER_ENGINES),
+                         default=['threaded', 'asyncio'])
+    engines.add_argument('--connections', type=int, default=2000)
+    engines.add_argument('--concurrency', type=int, default=50)
+    engines.add_argument('--bases', type=int, default=40)
+    engines.add_argument('--events', type=int, default=200)
+    engines.add_argument('--interval', type=float, default=0.002,
+                         help="seconds between key events from one base")
+    engines.add_argument('--wire', choices=SUPPORTED_FORMATS, default=FORMAT_JSON,
+                         help="wire format the simulated bases negotiate")
+    engines.set_defaults(func=bench_engines)
+
+    framing = subparsers.add_parser('framing', help="legacy str framing vs LineFramer")
+    framing.add_argument('--size', type=int, default=1024 * 1024,
+                         help="bytes of pipelined key events to parse")
+    framing.add_argument('--chunk', type=int, nargs='+', default=[1460, 4096, 65536, 1024 * 1024],
+                         help="recv sizes the payload is split into")
+    framing.add_argument('--repeat', type=int, default=3)
+    framing.set_defaults(func=bench_framing)
+
+    wire = subparsers.add_parser('wire', help="JSON-lines vs binary-v1 key_event encoding")
+    wire.add_argument('--events', type=int, default=200000)
+    wire.add_argument('--repeat', type=int, default=3)
+    wire.set_defaults(func=bench_wire)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import logging
+import sqlite3
+import threading
+
+from shards import ShardSet, day_for_id
+
+logger = logging.getLogger('easytest.reader')
+
+
+class KeyEventReader:
+    """Read-only queries over the daily key_events shards, separate from the writer.
+
+    Connections are opened with mode=ro, so reads never take the writer's lock.
+    Under WAL they see every committed batch without blocking ingest. Only the
+    newest shard's connection is kept open; older shards are opened per query so
+    maintenance can compact, archive or delete them. Each query is shaped to use
+    one of the indexes ShardSet creates.
+    """
+
+    def __init__(self, data_dir):
+        self.shards = ShardSet(data_dir)
+        self.lock = threading.Lock()
+        self.hot_day = None
+        self.hot_conn = None
+
+    def _query_day(self, day, sql, params=()):
+        """Run sql against one shard; a shard removed by maintenance reads as empty"""
+        if day == self.hot_day:
+            return [dict(row) for row in self.hot_conn.execute(sql, params)]
+        try:
+            conn = self.shards.open_readonly(day)
+        except sqlite3.OperationalError:
+            return []
+        if self.hot_day is None or day > self.hot_day:
+            if self.hot_conn is not None:
+                self.hot_conn.close()
+            self.hot_day, self.hot_conn = day, conn
+            return [dict(row) for row in conn.execute(sql, params)]
+        try:
+            return [dict(row) for row in conn.execute(sql, params)]
+        except sqlite3.OperationalError as e:
+            logger.warning(f"⚠️  Skipping shard {day}: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def latest_answers(self, base_id=None):
+        """Most recent key event for every (base_id, remote_id), uses idx_key_events_base_remote"""
+        where = 'WHERE base_id = ?' if base_id is not None else ''
+        params = (base_id,) if base_id is not None else ()
+        sql = f'''
+            SELECT key_events.* FROM key_events
+            JOIN (
+                SELECT MAX(id) AS id FROM key_events {where}
+                GROUP BY base_id, remote_id
+            ) AS latest ON latest.id = key_events.id
+        '''
+        latest = {}
+        with self.lock:
+            # Newest shard first: the first row seen for a remote is its latest answer
+            for day in reversed(self.shards.days()):
+                for row in self._query_day(day, sql, params):
+                    latest.setdefault((row['base_id'], row['remote_id']), row)
+        return [latest[key] for key in sorted(latest, key=lambda k: (k[0] is None, k))]
+
+    def events_between(self, start, end, client_id=None, limit=10000):
+        """Events received in [start, end) as ISO strings, uses idx_key_events_client_received per client"""
+        if client_id is not None:
+            sql = '''
+                SELECT * FROM key_events
+                WHERE client_id = ? AND received_at >= ? AND received_at < ?
+                ORDER BY received_at, id LIMIT ?
+            '''
+            params = (client_id, start, end)
+        else:
+            sql = '''
+                SELECT * FROM key_events
+                WHERE received_at >= ? AND received_at < ?
+                ORDER BY id LIMIT ?
+            '''
+            params = (start, end)
+
+        first_day, last_day = start[:10].replace('-', ''), end[:10].replace('-', '')
+        rows = []
+        with self.lock:
+            for day in self.shards.days():
+                if day < first_day or day > last_day:
+                    continue
+                rows.extend(self._query_day(day, sql, params + (limit - len(rows),)))
+                if len(rows) >= limit:
+                    break
+        return rows
+
+    def answer_stream(self, base_id, remote_id, since_id=0, limit=1000):
+        """One remote's answers in arrival order after since_id, for incremental polling"""
+        sql = '''
+            SELECT * FROM key_events
+            WHERE base_id = ? AND remote_id = ? AND id > ?
+            ORDER BY id LIMIT ?
+        '''
+        # Shards hold disjoint id ranges, so skip every day before since_id's shard
+        first_day = day_for_id(since_id) or ''
+        rows = []
+        with self.lock:
+            for day in self.shards.days():
+                if day < first_day:
+                    continue
+                rows.extend(self._query_day(day, sql, (base_id, remote_id, since_id, limit - len(rows))))
+                if len(rows) >= limit:
+                    break
+        return rows
+
+    def events_for_key_sn(self, key_sn, limit=1000):
+        """Answers from one physical remote by serial number, newest first, uses idx_key_events_key_sn"""
+        sql = 'SELECT * FROM key_events WHERE key_sn = ? ORDER BY id DESC LIMIT ?'
+        rows = []
+        with self.lock:
+            for day in reversed(self.shards.days()):
+                rows.extend(self._query_day(day, sql, (key_sn, limit - len(rows))))
+                if len(rows) >= limit:
+                    break
+        return rows
+
+    def close(self):
+        with self.lock:
+            if self.hot_conn is not None:
+                self.hot_conn.close()
+            self.hot_day = self.hot_conn = None
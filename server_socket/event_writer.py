@@ -0,0 +1,195 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from shards import ShardSet, day_of
+
+logger = logging.getLogger('easytest.writer')
+
+_STOP = object()
+
+# Upper bounds (ms) of the flush latency histogram buckets; the last one is +Inf
+FLUSH_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 250, 500, 1000, float('inf'))
+
+KEY_EVENT_COLUMNS = (
+    'client_id', 'base_id', 'remote_id', 'key_sn', 'mode', 'response_info',
+    'sdk_timestamp', 'client_timestamp', 'event_type', 'received_at'
+)
+INSERT_KEY_EVENT = f'''
+    INSERT INTO key_events ({', '.join(KEY_EVENT_COLUMNS)})
+    VALUES ({', '.join('?' * len(KEY_EVENT_COLUMNS))})
+'''
+
+
+class KeyEventWriter:
+    """Group-commit writer for the key_events table.
+
+    Handlers submit row tuples (in KEY_EVENT_COLUMNS order) to a bounded queue and
+    return immediately. A single writer thread owns the SQLite connections and
+    flushes with executemany once batch_size rows are waiting or flush_interval
+    seconds have passed since the first row of the batch arrived. Rows go to the
+    daily shard matching their received_at; only the newest shard stays open.
+    """
+
+    def __init__(self, data_dir, batch_size=200, flush_interval=0.02, max_queue=10000,
+                 enqueue_timeout=0.5):
+        self.shards = ShardSet(data_dir)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.thread = None
+        self.stats_lock = threading.Lock()
+
+        self.rows_written = 0
+        self.batches_written = 0
+        self.rows_dropped = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self.flush_buckets = [0] * len(FLUSH_BUCKETS_MS)
+        self.max_queue_depth = 0
+
+        self.conns = {}
+        # Open today's shard up front so a bad data_dir fails at startup, not on the first event
+        self._shard_conn(datetime.now().strftime('%Y%m%d'))
+
+    def _shard_conn(self, day):
+        conn = self.conns.get(day)
+        if conn is None:
+            conn = self.shards.open_writable(day)
+            self.conns[day] = conn
+        return conn
+
+    def _close_cold_shards(self):
+        """Keep only the newest shard's connection open so maintenance can compact the rest"""
+        for day in sorted(self.conns)[:-1]:
+            self.conns.pop(day).close()
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self._run, name='key-event-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, row):
+        """Queue one key_events row; returns False if the queue stayed full"""
+        try:
+            self.queue.put(row, timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self.stats_lock:
+                self.rows_dropped += 1
+            return False
+        depth = self.queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return True
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+            if stopping:
+                return
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        by_day = {}
+        for row in batch:
+            by_day.setdefault(day_of(row[-1]), []).append(row)
+
+        for attempt in range(2):
+            try:
+                for day, rows in by_day.items():
+                    if not rows:
+                        continue
+                    conn = self._shard_conn(day)
+                    conn.executemany(INSERT_KEY_EVENT, rows)
+                    conn.commit()
+                    # A flushed day is removed so a retry never writes it twice
+                    by_day[day] = []
+                break
+            except sqlite3.Error as e:
+                logger.error(f"❌ DB batch insert error ({len(batch)} rows): {e}")
+                with self.stats_lock:
+                    self.flush_errors += 1
+                if attempt == 0:
+                    self._reconnect_database()
+        else:
+            with self.stats_lock:
+                self.rows_dropped += sum(len(rows) for rows in by_day.values())
+            return
+        if len(self.conns) > 1:
+            self._close_cold_shards()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self.stats_lock:
+            self.rows_written += len(batch)
+            self.batches_written += 1
+            self.last_flush_ms = elapsed_ms
+            self.total_flush_ms += elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            for index, bound in enumerate(FLUSH_BUCKETS_MS):
+                if elapsed_ms <= bound:
+                    self.flush_buckets[index] += 1
+                    break
+
+    def _reconnect_database(self):
+        """Drop every shard connection; _shard_conn reopens them on the retry"""
+        logger.info("🔄 Attempting to reconnect to database...")
+        for conn in self.conns.values():
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self.conns = {}
+
+    def stop(self, timeout=5.0):
+        """Flush everything queued so far, then stop the writer thread and close the DB"""
+        if self.thread and self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join(timeout=timeout)
+        self.thread = None
+        for conn in self.conns.values():
+            conn.close()
+        self.conns = {}
+
+    def get_statistics(self):
+        with self.stats_lock:
+            return {
+                'queue_depth': self.queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'rows_written': self.rows_written,
+                'batches_written': self.batches_written,
+                'rows_dropped': self.rows_dropped,
+                'flush_errors': self.flush_errors,
+                'flush_latency_ms': {
+                    'last': round(self.last_flush_ms, 3),
+                    'avg': round(self.total_flush_ms / self.batches_written, 3) if self.batches_written else 0.0,
+                    'max': round(self.max_flush_ms, 3),
+                    'sum': round(self.total_flush_ms, 3),
+                    'buckets': list(zip(FLUSH_BUCKETS_MS, self.flush_buckets)),
+                },
+            }
@@ -0,0 +1,90 @@
+MAX_FRAME_BYTES = 10000
+
+
+class LineFramer:
+    """Incremental splitter for the newline-delimited JSON socket protocol.
+
+    Received bytes are appended to one bytearray and scanned for b'\\n' starting
+    where the previous scan stopped, so a recv that carries many small events is
+    split in a single linear pass. Complete frames are decoded straight from
+    memoryview slices and the consumed prefix is dropped once per feed().
+
+    A frame longer than max_frame bytes is skipped up to its terminating newline;
+    frames before and after it are still delivered.
+    """
+
+    def __init__(self, max_frame=MAX_FRAME_BYTES):
+        self.max_frame = max_frame
+        self.buffer = bytearray()
+        self.scan_from = 0
+        self.discarding = False
+        self.frames = 0
+        self.oversized_frames = 0
+        self.decode_errors = 0
+        self.errors = []
+
+    def feed(self, data):
+        """Add received bytes and return the list of complete, non-blank frames as str"""
+        return list(self.iter_frames(data))
+
+    def iter_frames(self, data):
+        """Add received bytes and yield the complete, non-blank frames as str.
+
+        A caller may stop early with close(): the bytes after the last frame
+        yielded are then left in self.buffer unsplit, e.g. for a hello that
+        switches the connection to another wire format.
+        """
+        buffer = self.buffer
+        buffer += data
+        start = 0
+        finished = False
+
+        try:
+            with memoryview(buffer) as view:
+                while True:
+                    end = buffer.find(b'\n', self.scan_from)
+                    if end == -1:
+                        break
+                    self.scan_from = end + 1
+
+                    if self.discarding:
+                        self.discarding = False
+                        frame = None
+                    elif end - start > self.max_frame:
+                        self._oversized(end - start)
+                        frame = None
+                    else:
+                        try:
+                            frame = str(view[start:end], 'utf-8')
+                        except UnicodeDecodeError as e:
+                            self.decode_errors += 1
+                            self.errors.append(f"invalid UTF-8 in frame: {e}")
+                            frame = None
+                    start = end + 1
+                    if frame is not None and frame.strip():
+                        self.frames += 1
+                        yield frame
+            finished = True
+        finally:
+            if start:
+                del buffer[:start]
+            self.scan_from = len(buffer) if finished else 0
+
+        if len(buffer) > self.max_frame:
+            # No newline yet and already too big: drop it and skip to the next newline
+            if not self.discarding:
+                self._oversized(len(buffer))
+            self.discarding = True
+            buffer.clear()
+            self.scan_from = 0
+
+    def _oversized(self, size):
+        self.oversized_frames += 1
+        self.errors.append(f"frame exceeds {self.max_frame} bytes ({size}+ bytes), skipped")
+
+    def pop_errors(self):
+        errors, self.errors = self.errors, []
+        return errors
+
+    def pending(self):
+        return len(self.buffer)
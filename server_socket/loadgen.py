@@ -0,0 +1,347 @@
+"""Load generator and soak-test harness for EasyTest ingest.
+
+Simulates N keypad bases, each with M remotes, sending the same
+connect_event / key_event / heartbeat traffic a real base produces. It targets
+either the socket server or the Django /api/key-events/create/ endpoint that
+client_socket/client.py posts to.
+
+    python loadgen.py socket --bases 50 --remotes 40 --duration 120 --data-dir easytest_data
+    python loadgen.py socket --pattern burst --question-interval 30 --burst-window 5
+    python loadgen.py http --url http://127.0.0.1:8000 --bases 10 --remotes 20 --duration 60
+
+Traffic patterns:
+    steady  every remote answers independently, --rate answers per minute on average
+    burst   exam style: every --question-interval seconds each remote answers
+            once within --burst-window seconds of the question appearing
+
+Socket ingest latency and dropped events come from the server's own rows. Each
+stored key event carries the client_timestamp the generator stamped and the
+received_at the server stamped, so point --data-dir at the server's shard
+directory (same host, same clock). Without it only send-side numbers are
+reported. For http, latency is the POST round trip to a 201, since Django saves
+the row before answering.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from benchmark import percentile
+from event_reader import KeyEventReader
+from wire import FORMAT_BINARY, FORMAT_JSON, SUPPORTED_FORMATS, encode_message
+
+
+class LoadStats:
+    """Counters shared by every simulated base in one run"""
+
+    def __init__(self):
+        self.sent = 0
+        self.send_errors = 0
+        self.connect_failures = 0
+        self.disconnects = 0
+        self.latencies_ms = []  # http: POST round trips
+        self.schedule_lag_ms = []  # how late each answer left versus its schedule
+        self.sent_in_window = 0
+
+    def take_window(self):
+        sent, self.sent_in_window = self.sent_in_window, 0
+        return sent
+
+
+def answer_offsets(args, rng):
+    """Seconds from the start of the run at which one remote presses a key"""
+    offsets = []
+    if args.pattern == 'steady':
+        per_second = args.rate / 60.0
+        at = rng.expovariate(per_second)
+        while at < args.duration:
+            offsets.append(at)
+            at += rng.expovariate(per_second)
+    else:
+        question = 0.0
+        while question < args.duration:
+            at = question + rng.uniform(0, args.burst_window)
+            if at < args.duration:
+                offsets.append(at)
+            question += args.question_interval
+    return offsets
+
+
+def base_schedule(args, base_id, rng):
+    """Sorted (offset, key_id) answers for every remote on one base"""
+    schedule = []
+    for key_id in range(1, args.remotes + 1):
+        schedule.extend((offset, key_id) for offset in answer_offsets(args, rng))
+    schedule.sort()
+    return schedule
+
+
+def key_event_data(run_id, base_id, key_id, seq, http=False):
+    # Same fields EasyTestHttpClient._on_key builds; the socket protocol keeps the raw SDK timestamp
+    now = datetime.now()
+    return {
+        'base_id': base_id,
+        'key_id': key_id,
+        'key_sn': f"LG{run_id}-{base_id}-{key_id}",
+        'mode': 1,
+        'timestamp': now.isoformat() if http else now.timestamp(),
+        'info': "ABCD"[seq % 4],
+        'client_timestamp': now.isoformat(),
+        'event_type': 'real_hardware',
+    }
+
+
+def _line(message):
+    return (json.dumps(message) + '\n').encode('utf-8')
+
+
+async def _wait_until(started, offset):
+    delay = started + offset - time.perf_counter()
+    if delay > 0:
+        await asyncio.sleep(delay)
+    return (time.perf_counter() - started - offset) * 1000
+
+
+async def socket_base(args, run_id, base_id, stats, started):
+    rng = random.Random(args.seed * 100003 + base_id)
+    schedule = base_schedule(args, base_id, rng)
+    try:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    except OSError:
+        stats.connect_failures += 1
+        return
+
+    # After a binary-v1 hello every message, not just key events, is length-prefixed
+    encode = _line
+
+    async def heartbeats():
+        while True:
+            await asyncio.sleep(args.heartbeat)
+            writer.write(encode({'type': 'heartbeat', 'timestamp': datetime.now().isoformat()}))
+
+    heartbeat_task = None
+    try:
+        if args.wire == FORMAT_BINARY:
+            writer.write(_line({'type': 'hello', 'formats': [FORMAT_BINARY]}))
+            await writer.drain()
+            await asyncio.wait_for(reader.readline(), 10)
+            encode = encode_message
+        writer.write(encode({'type': 'connect_event', 'data': {
+            'base_id': base_id, 'mode': 1, 'info': '1', 'timestamp': datetime.now().isoformat(),
+        }}))
+        if args.heartbeat:
+            heartbeat_task = asyncio.create_task(heartbeats())
+
+        for seq, (offset, key_id) in enumerate(schedule):
+            stats.schedule_lag_ms.append(await _wait_until(started, offset))
+            message = {'type': 'key_event', 'data': key_event_data(run_id, base_id, key_id, seq)}
+            writer.write(encode(message))
+            await writer.drain()
+            stats.sent += 1
+            stats.sent_in_window += 1
+    except (ConnectionError, OSError, asyncio.TimeoutError):
+        stats.disconnects += 1
+    finally:
+        if heartbeat_task:
+            heartbeat_task.cancel()
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+def _post(url, data, timeout):
+    request = urllib.request.Request(url, data=json.dumps(data).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'}, method='POST')
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return None
+
+
+async def http_base(args, run_id, base_id, stats, started, executor):
+    rng = random.Random(args.seed * 100003 + base_id)
+    schedule = base_schedule(args, base_id, rng)
+    loop = asyncio.get_running_loop()
+    base_url = args.url.rstrip('/')
+
+    connect = {'base_id': base_id, 'mode': 1, 'info': '1', 'timestamp': datetime.now().isoformat()}
+    if await loop.run_in_executor(executor, _post, f"{base_url}/api/connect-events/create/",
+                                  connect, args.timeout) != 201:
+        stats.connect_failures += 1
+
+    async def answer(seq, key_id):
+        posted = time.perf_counter()
+        status = await loop.run_in_executor(executor, _post, f"{base_url}/api/key-events/create/",
+                                            key_event_data(run_id, base_id, key_id, seq, http=True), args.timeout)
+        if status == 201:
+            stats.latencies_ms.append((time.perf_counter() - posted) * 1000)
+        else:
+            stats.send_errors += 1
+
+    pending = []
+    for seq, (offset, key_id) in enumerate(schedule):
+        stats.schedule_lag_ms.append(await _wait_until(started, offset))
+        pending.append(asyncio.ensure_future(answer(seq, key_id)))
+        stats.sent += 1
+        stats.sent_in_window += 1
+    await asyncio.gather(*pending)
+
+
+async def _report_progress(args, stats, started):
+    while True:
+        await asyncio.sleep(args.report_every)
+        elapsed = time.perf_counter() - started
+        sent = stats.take_window()
+        print(f"[{elapsed:7.0f}s] sent {stats.sent:>9}  {sent / args.report_every:>8.1f} ev/s  "
+              f"errors {stats.send_errors + stats.disconnects + stats.connect_failures}", flush=True)
+
+
+async def run_load(args, run_id, stats):
+    started = time.perf_counter()
+    progress = asyncio.create_task(_report_progress(args, stats, started)) if args.report_every else None
+    if args.target == 'http':
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            await asyncio.gather(*(http_base(args, run_id, base_id, stats, started, executor)
+                                   for base_id in range(1, args.bases + 1)))
+    else:
+        await asyncio.gather(*(socket_base(args, run_id, base_id, stats, started)
+                               for base_id in range(1, args.bases + 1)))
+    if progress:
+        progress.cancel()
+    return time.perf_counter() - started
+
+
+def stored_latencies(data_dir, run_id, window_start, window_end):
+    """Ingest latency (received_at - client_timestamp, ms) of every row this run stored"""
+    reader = KeyEventReader(data_dir)
+    prefix = f"LG{run_id}-"
+    try:
+        rows = reader.events_between(window_start.isoformat(), window_end.isoformat(), limit=10 ** 9)
+    finally:
+        reader.close()
+    latencies = []
+    for row in rows:
+        if not (row['key_sn'] or '').startswith(prefix) or not row['client_timestamp']:
+            continue
+        sent = datetime.fromisoformat(row['client_timestamp'])
+        latencies.append((datetime.fromisoformat(row['received_at']) - sent).total_seconds() * 1000)
+    return latencies
+
+
+def run(args):
+    run_id = uuid.uuid4().hex[:6]
+    stats = LoadStats()
+    target = args.url if args.target == 'http' else f"{args.host}:{args.port} ({args.wire})"
+    print(f"Run {run_id}: {args.bases} bases x {args.remotes} remotes, {args.pattern} pattern, "
+          f"{args.duration:.0f}s against {target}", flush=True)
+
+    window_start = datetime.now()
+    elapsed = asyncio.run(run_load(args, run_id, stats))
+
+    latencies = stats.latencies_ms
+    stored = None
+    if args.target == 'socket' and args.data_dir:
+        time.sleep(args.drain)
+        latencies = stored_latencies(args.data_dir, run_id, window_start,
+                                     datetime.now() + timedelta(seconds=1))
+        stored = len(latencies)
+
+    delivered = stored if stored is not None else len(stats.latencies_ms) if args.target == 'http' else None
+    result = {
+        'run_id': run_id,
+        'target': args.target,
+        'pattern': args.pattern,
+        'bases': args.bases,
+        'remotes': args.remotes,
+        'duration_s': round(elapsed, 3),
+        'events_sent': stats.sent,
+        'events_delivered': delivered,
+        'events_dropped': stats.sent - delivered if delivered is not None else None,
+        'throughput_per_s': round((delivered if delivered is not None else stats.sent) / elapsed, 1),
+        'connect_failures': stats.connect_failures,
+        'disconnects': stats.disconnects,
+        'send_errors': stats.send_errors,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'max': round(max(latencies), 2) if latencies else 0.0,
+        } if latencies else None,
+        'schedule_lag_ms_p99': round(percentile(stats.schedule_lag_ms, 99), 2),
+    }
+
+    print()
+    print(f"events sent       {result['events_sent']}")
+    if delivered is None:
+        print("events delivered  n/a (pass --data-dir to count stored rows)")
+    else:
+        print(f"events delivered  {delivered}  (dropped {result['events_dropped']})")
+    print(f"throughput        {result['throughput_per_s']} ev/s")
+    if result['latency_ms']:
+        latency = result['latency_ms']
+        print(f"ingest latency    p50 {latency['p50']} ms  p95 {latency['p95']} ms  "
+              f"p99 {latency['p99']} ms  max {latency['max']} ms")
+    print(f"errors            connect {stats.connect_failures}  disconnect {stats.disconnects}  "
+          f"send {stats.send_errors}")
+    print(f"schedule lag p99  {result['schedule_lag_ms_p99']} ms (generator falling behind if large)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="EasyTest keypad base load generator")
+    parser.add_argument('target', choices=['socket', 'http'],
+                        help="socket server protocol or the Django key-events endpoint")
+    parser.add_argument('--bases', type=int, default=10)
+    parser.add_argument('--remotes', type=int, default=40, help="remotes (keypads) per base")
+    parser.add_argument('--duration', type=float, default=60.0, help="seconds of traffic to generate")
+    parser.add_argument('--pattern', choices=['steady', 'burst'], default='steady')
+    parser.add_argument('--rate', type=float, default=6.0,
+                        help="steady: average answers per minute per remote")
+    parser.add_argument('--question-interval', type=float, default=30.0,
+                        help="burst: seconds between questions")
+    parser.add_argument('--burst-window', type=float, default=5.0,
+                        help="burst: every remote answers within this many seconds of a question")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--report-every', type=float, default=10.0,
+                        help="seconds between progress lines (0 disables), for long soak runs")
+    parser.add_argument('--json', help="also write the final report to this file")
+
+    socket_group = parser.add_argument_group('socket target')
+    socket_group.add_argument('--host', default='127.0.0.1')
+    socket_group.add_argument('--port', type=int, default=8888)
+    socket_group.add_argument('--wire', choices=SUPPORTED_FORMATS, default=FORMAT_JSON)
+    socket_group.add_argument('--heartbeat', type=float, default=10.0,
+                              help="seconds between heartbeats per base (0 disables)")
+    socket_group.add_argument('--data-dir',
+                              help="the server's shard directory, to measure ingest latency and drops")
+    socket_group.add_argument('--drain', type=float, default=2.0,
+                              help="seconds to let the server flush before counting stored rows")
+
+    http_group = parser.add_argument_group('http target')
+    http_group.add_argument('--url', default='http://127.0.0.1:8000', help="Django base URL")
+    http_group.add_argument('--workers', type=int, default=32, help="concurrent HTTP posts")
+    http_group.add_argument('--timeout', type=float, default=5.0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    run(parse_args(argv))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import json
+import logging
+import sys
+import threading
+import time
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRS = set(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg plus any extra= fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ClientRateLimitFilter(logging.Filter):
+    """Token bucket per client_id so one chatty base cannot flood the log.
+
+    Records without a client_id, and ERROR and above, always pass. When a client's
+    records were dropped, the next one that passes carries a suppressed=N field.
+    """
+
+    def __init__(self, rate=5.0, burst=20, max_clients=4096):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        client_id = getattr(record, 'client_id', None)
+        if client_id is None or record.levelno >= logging.ERROR:
+            return True
+
+        now = time.monotonic()
+        with self.lock:
+            if client_id not in self.buckets and len(self.buckets) >= self.max_clients:
+                # Reconnects mint new client ids; forget buckets with nothing pending
+                self.buckets = {key: bucket for key, bucket in self.buckets.items() if bucket[2]}
+            tokens, updated, suppressed = self.buckets.get(client_id, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self.buckets[client_id] = (tokens, now, suppressed + 1)
+                return False
+            self.buckets[client_id] = (tokens - 1, now, 0)
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+def configure_logging(level='INFO', log_format='json', rate=5.0, burst=20):
+    """Send the easytest.* loggers to stdout, rate-limited per client"""
+    handler = logging.StreamHandler(sys.stdout)
+    if log_format == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    handler.addFilter(ClientRateLimitFilter(rate=rate, burst=burst))
+
+    logger = logging.getLogger('easytest')
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
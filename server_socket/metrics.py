@@ -0,0 +1,173 @@
+"""Prometheus text-format metrics for the EasyTest socket server.
+
+MetricsServer runs a small stdlib HTTP listener on a side port and answers
+GET /metrics from the counters EasyTestServer already keeps in memory, so a
+scrape never touches the database or the client sockets.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger('easytest.metrics')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+class EventRateSampler:
+    """Samples the server's key_events_total once per interval for an events/sec gauge"""
+
+    def __init__(self, server, window=10, interval=1.0):
+        self.server = server
+        self.interval = interval
+        self.samples = deque(maxlen=window + 1)
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='metrics-rate-sampler', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.samples.append((time.monotonic(), self.server.key_events_total))
+            self.stopped.wait(self.interval)
+
+    def rate(self):
+        samples = list(self.samples)
+        if len(samples) < 2:
+            return 0.0
+        (first_time, first_total), (last_time, last_total) = samples[0], samples[-1]
+        if last_time <= first_time:
+            return 0.0
+        return (last_total - first_total) / (last_time - first_time)
+
+    def stop(self):
+        self.stopped.set()
+
+
+def render_metrics(server, rate_sampler=None):
+    lines = []
+
+    def metric(name, metric_type, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in samples:
+            if labels:
+                label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}")
+            else:
+                lines.append(f"{name} {value}")
+
+    now = datetime.now()
+    clients = list(server.clients.items())
+    writer_stats = server.writer.get_statistics()
+    storage = server.maintainer.get_statistics()
+    flush = writer_stats['flush_latency_ms']
+
+    metric('easytest_uptime_seconds', 'gauge', "Seconds since the server object was created.",
+           [({}, round((now - server.start_time).total_seconds(), 3))])
+    metric('easytest_connected_clients', 'gauge', "Currently connected keypad bases.",
+           [({}, len(clients))])
+    metric('easytest_messages_total', 'counter', "Messages received, by protocol message type.",
+           [({'type': msg_type}, count) for msg_type, count in sorted(server.message_counts.items())])
+    metric('easytest_key_events_total', 'counter', "Accepted real-hardware key events.",
+           [({}, server.key_events_total)])
+    if rate_sampler is not None:
+        metric('easytest_key_events_per_second', 'gauge',
+               "Accepted key events per second over the sampling window.",
+               [({}, round(rate_sampler.rate(), 3))])
+    metric('easytest_decode_errors_total', 'counter', "Frames that could not be decoded, by kind.",
+           [({'kind': kind}, count) for kind, count in sorted(server.decode_errors.items())])
+
+    metric('easytest_outbound_messages_total', 'counter',
+           "Server-to-base messages by outcome: queued, rejected (queue full), evicted clients.",
+           [({'result': result}, count) for result, count in sorted(server.outbound_counts.items())])
+
+    metric('easytest_db_queue_depth', 'gauge', "Rows waiting for the batched DB writer.",
+           [({}, writer_stats['queue_depth'])])
+    metric('easytest_db_rows_written_total', 'counter', "Rows committed to key_events.",
+           [({}, writer_stats['rows_written'])])
+    metric('easytest_db_rows_dropped_total', 'counter', "Rows lost to a full queue or failed flush.",
+           [({}, writer_stats['rows_dropped'])])
+
+    metric('easytest_db_shards', 'gauge', "Daily key_events shard files on disk.",
+           [({}, storage['shards'])])
+    metric('easytest_db_storage_bytes', 'gauge', "Total size of the shard files, WAL included.",
+           [({}, storage['total_bytes'])])
+    metric('easytest_db_shards_removed_total', 'counter', "Shards deleted or archived by retention.",
+           [({}, storage['shards_removed'])])
+
+    lines.append("# HELP easytest_db_flush_seconds Time to executemany and commit one batch.")
+    lines.append("# TYPE easytest_db_flush_seconds histogram")
+    cumulative = 0
+    for bound_ms, count in flush['buckets']:
+        cumulative += count
+        bound = bound_ms if bound_ms == float('inf') else bound_ms / 1000
+        lines.append(f'easytest_db_flush_seconds_bucket{{le="{_format_bound(bound)}"}} {cumulative}')
+    lines.append(f"easytest_db_flush_seconds_sum {round(flush['sum'] / 1000, 6)}")
+    lines.append(f"easytest_db_flush_seconds_count {writer_stats['batches_written']}")
+
+    metric('easytest_client_last_seen_age_seconds', 'gauge', "Seconds since each client last sent a message.",
+           [({'client': client_id}, round((now - info['last_seen']).total_seconds(), 3))
+            for client_id, info in clients])
+
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Serves /metrics for an EasyTestServer from a background thread"""
+
+    def __init__(self, server, host='0.0.0.0', port=9888):
+        self.server = server
+        self.host = host
+        self.port = port
+        self.rate_sampler = EventRateSampler(server)
+        self.httpd = None
+        self.thread = None
+
+    def start(self):
+        metrics_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                try:
+                    body = render_metrics(metrics_server.server, metrics_server.rate_sampler).encode('utf-8')
+                except Exception as e:
+                    logger.error(f"❌ Error rendering metrics: {e}")
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.rate_sampler.start()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='metrics-http', daemon=True)
+        self.thread.start()
+        logger.info(f"📈 Metrics available on http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        self.rate_sampler.stop()
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
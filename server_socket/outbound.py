@@ -0,0 +1,240 @@
+"""Per-client outbound queues for server-to-base messages.
+
+send_to_client and broadcast_to_clients only enqueue; a sender per client does
+the actual write. One slow or half-dead base can then no longer stall a vote
+command for every other base. Each queue is bounded and every message must be
+fully written within send_timeout. A client that overflows its queue or misses
+the deadline is evicted, and the reader side then sees its socket closed.
+"""
+import asyncio
+import queue
+import selectors
+import threading
+import time
+
+_STOP = object()
+
+
+class SendTimeout(Exception):
+    pass
+
+
+class DeliveryReport:
+    """Outcome of one broadcast, filled in by the senders as writes complete.
+
+    queued and rejected are final when broadcast_to_clients returns; delivered and
+    failed grow afterwards. wait() blocks until every queued write has an outcome.
+    """
+
+    def __init__(self, message_type):
+        self.message_type = message_type
+        self.queued = []
+        self.rejected = []
+        self.delivered = []
+        self.failed = []
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.done.set()
+
+    def expect(self, client_id):
+        with self.lock:
+            self.queued.append(client_id)
+            self.done.clear()
+
+    def reject(self, client_id):
+        with self.lock:
+            if client_id in self.queued:
+                self.queued.remove(client_id)
+            self.rejected.append(client_id)
+            if len(self.delivered) + len(self.failed) >= len(self.queued):
+                self.done.set()
+
+    def record(self, client_id, ok):
+        with self.lock:
+            (self.delivered if ok else self.failed).append(client_id)
+            if len(self.delivered) + len(self.failed) >= len(self.queued):
+                self.done.set()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def __bool__(self):
+        # Truthy when at least one client accepted the message, like the old success count > 0
+        return bool(self.queued)
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'type': self.message_type,
+                'queued': len(self.queued),
+                'rejected': list(self.rejected),
+                'delivered': len(self.delivered),
+                'failed': list(self.failed),
+                'pending': len(self.queued) - len(self.delivered) - len(self.failed),
+            }
+
+
+class ClientSender:
+    """Bounded queue plus a writer thread for one socket of the threaded server.
+
+    The thread is started on the first message, so bases that are never sent
+    anything cost no extra thread.
+    """
+
+    def __init__(self, client_id, sock, on_evict, max_queue=64, send_timeout=5.0):
+        self.client_id = client_id
+        self.sock = sock
+        self.on_evict = on_evict
+        self.send_timeout = send_timeout
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.thread = None
+        self.closed = False
+        self.start_lock = threading.Lock()
+
+    def enqueue(self, data, report=None):
+        """Queue data without blocking; False means the client is too far behind"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait((data, report))
+        except queue.Full:
+            return False
+        if self.thread is None:
+            with self.start_lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name=f"sender-{self.client_id}",
+                                                   daemon=True)
+                    self.thread.start()
+        return True
+
+    def pending(self):
+        return self.queue.qsize()
+
+    def _run(self):
+        selector = selectors.DefaultSelector()
+        try:
+            selector.register(self.sock, selectors.EVENT_WRITE)
+        except (ValueError, OSError):
+            # Socket already closed before the first send
+            self.closed = True
+        try:
+            while True:
+                item = self.queue.get()
+                if item is _STOP:
+                    return
+                data, report = item
+                ok = False
+                if not self.closed:
+                    try:
+                        self._send_all(selector, data)
+                        ok = True
+                    except SendTimeout:
+                        self.closed = True
+                        self.on_evict(self.client_id, f"send took longer than {self.send_timeout}s")
+                    except OSError as e:
+                        self.closed = True
+                        self.on_evict(self.client_id, f"send failed: {e}")
+                if report is not None:
+                    report.record(self.client_id, ok)
+        finally:
+            selector.close()
+
+    def _send_all(self, selector, data):
+        """sendall with one deadline for the whole message, never blocking past it"""
+        view = memoryview(data)
+        deadline = time.monotonic() + self.send_timeout
+        while view:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not selector.select(remaining):
+                raise SendTimeout()
+            view = view[self.sock.send(view):]
+
+    def close(self):
+        """Stop the writer; queued messages still count as failed in their reports"""
+        self.closed = True
+        if self.thread is not None:
+            try:
+                self.queue.put_nowait(_STOP)
+            except queue.Full:
+                # The writer is failing out everything queued anyway; make room for the stop
+                self._fail_pending()
+                self.queue.put_nowait(_STOP)
+
+    def _fail_pending(self):
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP and item[1] is not None:
+                item[1].record(self.client_id, False)
+
+
+class AsyncClientSender:
+    """Bounded queue plus a writer task for one StreamWriter of the asyncio server.
+
+    enqueue may be called from any thread; the pending count is kept under a lock
+    so acceptance is decided synchronously, and the write itself is handed to the
+    event loop.
+    """
+
+    def __init__(self, client_id, writer, loop, on_evict, max_queue=64, send_timeout=5.0):
+        self.client_id = client_id
+        self.writer = writer
+        self.loop = loop
+        self.on_evict = on_evict
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.queue = asyncio.Queue()
+        self.queued = 0
+        self.lock = threading.Lock()
+        self.closed = False
+        self.task = loop.create_task(self._run())
+
+    def enqueue(self, data, report=None):
+        with self.lock:
+            if self.closed or self.queued >= self.max_queue:
+                return False
+            self.queued += 1
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (data, report))
+        return True
+
+    def pending(self):
+        return self.queued
+
+    async def _run(self):
+        report = None
+        try:
+            while True:
+                data, report = await self.queue.get()
+                ok = False
+                if not self.closed:
+                    try:
+                        self.writer.write(data)
+                        await asyncio.wait_for(self.writer.drain(), timeout=self.send_timeout)
+                        ok = True
+                    except asyncio.TimeoutError:
+                        self.closed = True
+                        self.on_evict(self.client_id, f"send took longer than {self.send_timeout}s")
+                    except (ConnectionError, OSError) as e:
+                        self.closed = True
+                        self.on_evict(self.client_id, f"send failed: {e}")
+                with self.lock:
+                    self.queued -= 1
+                if report is not None:
+                    report.record(self.client_id, ok)
+                report = None
+        except asyncio.CancelledError:
+            # Cancelled mid-write or with messages still queued: they all failed
+            if report is not None:
+                report.record(self.client_id, False)
+            while not self.queue.empty():
+                data, report = self.queue.get_nowait()
+                if report is not None:
+                    report.record(self.client_id, False)
+            raise
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+        self.loop.call_soon_threadsafe(self.task.cancel)
@@ -1,53 +1,71 @@
+import argparse
+import asyncio
+import logging
 import socket
 import threading
 import json
 import time
+from collections import Counter
 from datetime import datetime
 import sqlite3
 
+from event_reader import KeyEventReader
+from event_writer import KeyEventWriter
+from framing import LineFramer
+from logs import configure_logging
+from metrics import MetricsServer
+from outbound import AsyncClientSender, ClientSender, DeliveryReport
+from shards import ShardMaintainer
+from wire import FORMAT_BINARY, FORMAT_JSON, BinaryFramer, choose_format
+
+logger = logging.getLogger('easytest.server')
+
 
 class EasyTestServer:
-    def __init__(self, host='localhost', port=8888):
+    def __init__(self, host='localhost', port=8888, data_dir='easytest_data', log_events=True,
+                 retention_days=30, max_storage_mb=None, archive_dir=None, send_timeout=5.0,
+                 outbound_queue=64):
         self.host = host
         self.port = port
+        self.data_dir = data_dir  # One key_events_YYYYMMDD.db shard per day
+        self.log_events = log_events  # False in production: no log call per received event
         self.server_socket = None
         self.clients = {}  # Store client connections and info
         self.running = False
         self.key_event_count = {}  # Track key events per client
-        self.db_lock = threading.Lock()  # Thread-safe database access
+        self.message_counts = Counter()  # Received messages per type
+        self.decode_errors = Counter()  # Undecodable input per kind ('json', 'framing')
+        self.key_events_total = 0  # Accepted key events since start, never reset
+        self.send_timeout = send_timeout  # Seconds one outbound message may take before eviction
+        self.outbound_queue = outbound_queue  # Messages a client may have pending before eviction
+        self.outbound_counts = Counter()  # Outbound messages by outcome ('queued', 'rejected', 'evicted')
         self.start_time = datetime.now()
+        self.handler_map = {
+            'connect_event': self.handle_connect_event,
+            'vote_event': self.handle_vote_event,
+            'key_event': self.handle_key_event,
+            'hd_param_event': self.handle_hd_param_event,
+            'keypad_param_event': self.handle_keypad_param_event,
+            'heartbeat': self.handle_heartbeat,
+            'pong': self.handle_pong,
+            'hello': self.handle_hello
+        }
 
-        # Setup SQLite DB
-        try:
-            self.conn = sqlite3.connect('easytest_data.db', check_same_thread=False)
-            self.cursor = self.conn.cursor()
-            self._create_table()
-            print("💾 Database initialized successfully")
-        except sqlite3.Error as e:
-            print(f"❌ Database initialization error: {e}")
-            raise
-
-    def _create_table(self):
+        # Setup SQLite shards; all writes go through the batched writer thread
         try:
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS key_events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    client_id TEXT NOT NULL,
-                    base_id INTEGER,
-                    remote_id INTEGER,
-                    key_sn TEXT,
-                    mode INTEGER,
-                    response_info TEXT,
-                    sdk_timestamp REAL,
-                    client_timestamp TEXT,
-                    event_type TEXT,
-                    received_at TEXT NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            self.conn.commit()
+            self.writer = KeyEventWriter(self.data_dir)
+            self.writer.start()
+            self.reader = KeyEventReader(self.data_dir)
+            self.maintainer = ShardMaintainer(
+                self.writer.shards,
+                retention_days=retention_days,
+                max_total_bytes=max_storage_mb * 1024 * 1024 if max_storage_mb else None,
+                archive_dir=archive_dir,
+            )
+            self.maintainer.start()
+            logger.info("💾 Database initialized successfully", extra={'data_dir': self.data_dir})
         except sqlite3.Error as e:
-            print(f"❌ Database table creation error: {e}")
+            logger.error(f"❌ Database initialization error: {e}")
             raise
 
     def start_server(self):
@@ -58,22 +76,22 @@ class EasyTestServer:
                 self.server_socket.bind((self.host, self.port))
             except OSError as e:
                 if e.errno == 98:
-                    print(f"❌ Port {self.port} is already in use. Please choose a different port or kill the existing process.")
+                    logger.error(f"❌ Port {self.port} is already in use. Please choose a different port or kill the existing process.")
                 else:
-                    print(f"❌ Failed to bind to {self.host}:{self.port}: {e}")
+                    logger.error(f"❌ Failed to bind to {self.host}:{self.port}: {e}")
                 raise
 
             self.server_socket.listen(5)
             self.running = True
-            print(f"🚀 EasyTest Server started on {self.host}:{self.port}")
-            print("📡 Waiting for client connections...")
-            print("🔑 Only REAL hardware keypad events will be processed")
+            logger.info(f"🚀 EasyTest Server started on {self.host}:{self.port}")
+            logger.info("📡 Waiting for client connections...")
+            logger.info("🔑 Only REAL hardware keypad events will be processed")
 
             while self.running:
                 try:
                     self.server_socket.settimeout(1.0)
                     client_socket, client_address = self.server_socket.accept()
-                    print(f"✅ New client connected: {client_address}")
+                    logger.info(f"✅ New client connected: {client_address}")
 
                     client_thread = threading.Thread(
                         target=self.handle_client,
@@ -86,11 +104,11 @@ class EasyTestServer:
                     continue
                 except socket.error as e:
                     if self.running:
-                        print(f"❌ Socket error: {e}")
+                        logger.error(f"❌ Socket error: {e}")
                     break
 
         except Exception as e:
-            print(f"❌ Server startup error: {e}")
+            logger.error(f"❌ Server startup error: {e}")
         finally:
             self.stop_server()
 
@@ -100,126 +118,129 @@ class EasyTestServer:
             'socket': client_socket,
             'address': client_address,
             'connected_at': datetime.now(),
-            'last_seen': datetime.now()
+            'last_seen': datetime.now(),
+            'framer': LineFramer(),
+            'wire_format': FORMAT_JSON,
+            'sender': ClientSender(client_id, client_socket, self.evict_client,
+                                   max_queue=self.outbound_queue, send_timeout=self.send_timeout)
         }
         self.key_event_count[client_id] = 0
-        print(f"🔗 Client {client_id} handler started")
+        logger.info(f"🔗 Client {client_id} handler started", extra={'client_id': client_id})
 
         try:
-            buffer = ""
             client_socket.settimeout(30.0)
 
             while self.running:
                 try:
                     data = client_socket.recv(4096)
                     if not data:
-                        print(f"🔌 Client {client_id} disconnected (no data)")
+                        logger.info(f"🔌 Client {client_id} disconnected (no data)", extra={'client_id': client_id})
                         break
                     client_socket.settimeout(30.0)
-                    try:
-                        buffer += data.decode('utf-8')
-                        while '\n' in buffer:
-                            line, buffer = buffer.split('\n', 1)
-                            if line.strip():
-                                try:
-                                    message = json.loads(line.strip())
-                                    self.process_client_message(client_id, message)
-                                except json.JSONDecodeError as e:
-                                    print(f"⚠️  JSON decode error from {client_id}: {e} - Line: {line[:100]}...")
-                        if buffer.strip() and '\n' not in buffer:
-                            try:
-                                message = json.loads(buffer.strip())
-                                self.process_client_message(client_id, message)
-                                buffer = ""
-                            except json.JSONDecodeError:
-                                if len(buffer) > 10000:
-                                    print(f"⚠️  Buffer too large for {client_id}, clearing")
-                                    buffer = ""
-                    except UnicodeDecodeError as e:
-                        print(f"❌ Unicode decode error from {client_id}: {e}")
-                        buffer = ""
+                    self._consume_frames(client_id, data)
                 except socket.timeout:
                     if not self.running:
                         break
-                    print(f"⏰ Timeout waiting for data from {client_id}")
-                    try:
-                        ping_msg = json.dumps({'type': 'ping', 'timestamp': time.time()}) + '\n'
-                        client_socket.send(ping_msg.encode('utf-8'))
-                    except:
-                        print(f"💔 Client {client_id} appears disconnected")
+                    logger.warning(f"⏰ Timeout waiting for data from {client_id}", extra={'client_id': client_id})
+                    if not self._enqueue(client_id, self._encode({'type': 'ping', 'timestamp': time.time()})):
+                        logger.warning(f"💔 Client {client_id} appears disconnected", extra={'client_id': client_id})
                         break
                 except socket.error as e:
-                    print(f"❌ Socket error with client {client_id}: {e}")
+                    logger.error(f"❌ Socket error with client {client_id}: {e}", extra={'client_id': client_id})
                     break
                 except Exception as e:
-                    print(f"❌ Unexpected error processing message from {client_id}: {e}")
+                    logger.error(f"❌ Unexpected error processing message from {client_id}: {e}", extra={'client_id': client_id})
         except Exception as e:
-            print(f"❌ Client {client_id} handler error: {e}")
+            logger.error(f"❌ Client {client_id} handler error: {e}", extra={'client_id': client_id})
         finally:
             self.disconnect_client(client_id)
 
+    def _consume_frames(self, client_id, data):
+        """Dispatch every complete message that data completes, in the client's wire format"""
+        info = self.clients.get(client_id)
+        if info is None:
+            return
+        framer = info['framer']
+        if info['wire_format'] == FORMAT_BINARY:
+            for message in framer.feed(data):
+                self.process_client_message(client_id, message)
+        else:
+            lines = framer.iter_frames(data)
+            for line in lines:
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError as e:
+                    self.decode_errors['json'] += 1
+                    logger.warning(f"⚠️  JSON decode error from {client_id}: {e}",
+                                   extra={'client_id': client_id, 'line': line[:100]})
+                    continue
+                self.process_client_message(client_id, message)
+                # A hello may have switched this connection to binary frames: everything
+                # received after it, split or not, goes to the new framer
+                if info['framer'] is not framer:
+                    lines.close()
+                    self._consume_frames(client_id, bytes(framer.buffer))
+                    framer.buffer.clear()
+                    break
+        for error in framer.pop_errors():
+            self.decode_errors['framing'] += 1
+            logger.warning(f"⚠️  Framing error from {client_id}: {error}", extra={'client_id': client_id})
+
+    def _log_event(self, message, client_id, data, **fields):
+        """Per-event log line: INFO summary, full payload only when DEBUG is on"""
+        if not self.log_events or not logger.isEnabledFor(logging.INFO):
+            return
+        extra = {'client_id': client_id, 'base_id': data.get('base_id'), **fields}
+        if logger.isEnabledFor(logging.DEBUG):
+            extra['data'] = data
+        logger.info(message, extra=extra)
+
     def process_client_message(self, client_id, message):
         try:
             if not isinstance(message, dict):
-                print(f"⚠️  Invalid message format from {client_id}: not a dictionary")
+                self.message_counts['invalid'] += 1
+                logger.warning(f"⚠️  Invalid message format from {client_id}: not a dictionary",
+                               extra={'client_id': client_id})
                 return
 
             msg_type = message.get('type', 'unknown')
-            if client_id in self.clients:
-                self.clients[client_id]['last_seen'] = datetime.now()
-
-            if msg_type != 'heartbeat':
-                print(f"📨 [{client_id}] Message Type: {msg_type}")
-
-            handler_map = {
-                'connect_event': self.handle_connect_event,
-                'vote_event': self.handle_vote_event,
-                'key_event': self.handle_key_event,
-                'hd_param_event': self.handle_hd_param_event,
-                'keypad_param_event': self.handle_keypad_param_event,
-                'heartbeat': self.handle_heartbeat,
-                'pong': self.handle_pong
-            }
+            self.message_counts[msg_type] += 1
+            info = self.clients.get(client_id)
+            if info is not None:
+                info['last_seen'] = datetime.now()
 
-            handler = handler_map.get(msg_type)
+            handler = self.handler_map.get(msg_type)
             if handler:
                 handler(client_id, message)
             else:
-                print(f"⚠️  Unknown message type from {client_id}: {msg_type}")
+                logger.warning(f"⚠️  Unknown message type from {client_id}: {msg_type}",
+                               extra={'client_id': client_id, 'msg_type': msg_type})
 
         except Exception as e:
-            print(f"❌ Error processing message from {client_id}: {e}")
+            logger.error(f"❌ Error processing message from {client_id}: {e}", extra={'client_id': client_id})
 
     def handle_connect_event(self, client_id, message):
         try:
             data = message.get('data', {})
-            print(f"🔌 [{client_id}] Device Connection Event:")
-            print(f"   - Base ID: {data.get('base_id')}")
-            print(f"   - Mode: {data.get('mode')}")
-            print(f"   - Info: {data.get('info')}")
-            print(f"   - Remote Client: {client_id}")
-
             info = data.get('info', '')
             if info == "1":
-                print(f"✅ [{client_id}] Device successfully connected and ready!")
+                status = "connected and ready"
             elif info == "2":
-                print(f"⚠️  [{client_id}] Device connection in progress")
+                status = "connection in progress"
             else:
-                print(f"ℹ️  [{client_id}] Device connection status: {info}")
-
+                status = f"status {info}"
+            self._log_event(f"🔌 [{client_id}] Device {status}", client_id, data,
+                            msg_type='connect_event', mode=data.get('mode'), info=info)
         except Exception as e:
-            print(f"❌ Error handling connect event from {client_id}: {e}")
+            logger.error(f"❌ Error handling connect event from {client_id}: {e}", extra={'client_id': client_id})
 
     def handle_vote_event(self, client_id, message):
         try:
             data = message.get('data', {})
-            print(f"🗳️  [{client_id}] Vote Event:")
-            print(f"   - Base ID: {data.get('base_id')}")
-            print(f"   - Mode: {data.get('mode')}")
-            print(f"   - Info: {data.get('info')}")
-            print(f"   - Remote Client: {client_id}")
+            self._log_event(f"🗳️  [{client_id}] Vote event", client_id, data,
+                            msg_type='vote_event', mode=data.get('mode'), info=data.get('info'))
         except Exception as e:
-            print(f"❌ Error handling vote event from {client_id}: {e}")
+            logger.error(f"❌ Error handling vote event from {client_id}: {e}", extra={'client_id': client_id})
 
     def handle_key_event(self, client_id, message):
         try:
@@ -227,7 +248,9 @@ class EasyTestServer:
 
             event_type = data.get('event_type', '')
             if event_type != 'real_hardware':
-                print(f"⚠️  [{client_id}] Ignoring non-hardware key event (type: {event_type})")
+                self.message_counts['key_event_ignored'] += 1
+                logger.warning(f"⚠️  [{client_id}] Ignoring non-hardware key event (type: {event_type})",
+                               extra={'client_id': client_id})
                 return
 
             key_id = data.get('key_id')
@@ -235,66 +258,67 @@ class EasyTestServer:
             info = data.get('info', '').strip()
 
             if key_id is None:
-                print(f"⚠️  [{client_id}] Ignoring invalid key event - missing key_id")
+                self.message_counts['key_event_ignored'] += 1
+                logger.warning(f"⚠️  [{client_id}] Ignoring invalid key event - missing key_id",
+                               extra={'client_id': client_id})
                 return
 
-            if not key_sn:
-                print(f"⚠️  [{client_id}] Warning: key_sn is empty for key_id {key_id}")
+            if not key_sn and self.log_events:
+                logger.warning(f"⚠️  [{client_id}] key_sn is empty for key_id {key_id}",
+                               extra={'client_id': client_id})
 
             self.key_event_count[client_id] = self.key_event_count.get(client_id, 0) + 1
-
-            print(f"🔑 [{client_id}] REAL HARDWARE Key Event #{self.key_event_count[client_id]}:")
-            print(f"   - Base ID: {data.get('base_id')}")
-            print(f"   - Key ID (Remote ID): {key_id}")
-            print(f"   - Key SN (Remote Serial): {key_sn}")
-            print(f"   - Mode: {data.get('mode')}")
-            print(f"   - SDK Timestamp: {data.get('timestamp')}")
-            print(f"   - Response Info: '{info}'")
-            print(f"   - Client Timestamp: {data.get('client_timestamp')}")
-            print(f"   - Remote Client: {client_id}")
-            print(f"   - Event Type: {event_type}")
+            self.key_events_total += 1
+            self._log_event(f"🔑 [{client_id}] Key event #{self.key_event_count[client_id]}", client_id, data,
+                            msg_type='key_event', key_id=key_id, key_sn=key_sn, info=info,
+                            event_number=self.key_event_count[client_id])
 
             self.store_key_response(client_id, data)
 
         except Exception as e:
-            print(f"❌ Error handling key event from {client_id}: {e}")
+            logger.error(f"❌ Error handling key event from {client_id}: {e}", extra={'client_id': client_id})
 
     def handle_hd_param_event(self, client_id, message):
         try:
             data = message.get('data', {})
-            print(f"📺 [{client_id}] HD Param Event:")
-            print(f"   - Base ID: {data.get('base_id')}")
-            print(f"   - Mode: {data.get('mode')}")
-            print(f"   - Info: {data.get('info')}")
-            print(f"   - Remote Client: {client_id}")
+            self._log_event(f"📺 [{client_id}] HD param event", client_id, data,
+                            msg_type='hd_param_event', mode=data.get('mode'), info=data.get('info'))
         except Exception as e:
-            print(f"❌ Error handling HD param event from {client_id}: {e}")
+            logger.error(f"❌ Error handling HD param event from {client_id}: {e}", extra={'client_id': client_id})
 
     def handle_keypad_param_event(self, client_id, message):
         try:
             data = message.get('data', {})
-            print(f"⌨️  [{client_id}] Keypad Param Event:")
-            print(f"   - Base ID: {data.get('base_id')}")
-            print(f"   - Key ID: {data.get('key_id')}")
-            print(f"   - Key SN: {data.get('key_sn')}")
-            print(f"   - Mode: {data.get('mode')}")
-            print(f"   - Info: {data.get('info')}")
-            print(f"   - Remote Client: {client_id}")
+            self._log_event(f"⌨️  [{client_id}] Keypad param event", client_id, data,
+                            msg_type='keypad_param_event', key_id=data.get('key_id'),
+                            key_sn=data.get('key_sn'), mode=data.get('mode'), info=data.get('info'))
         except Exception as e:
-            print(f"❌ Error handling keypad param event from {client_id}: {e}")
+            logger.error(f"❌ Error handling keypad param event from {client_id}: {e}", extra={'client_id': client_id})
 
     def handle_heartbeat(self, client_id, message):
+        # last_seen and the per-type counter are already updated by process_client_message
+        if self.log_events and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"💓 [{client_id}] Heartbeat", extra={'client_id': client_id})
+
+    def handle_hello(self, client_id, message):
         try:
-            if int(time.time()) % 60 == 0:
-                print(f"💓 [{client_id}] Heartbeat active")
+            info = self.clients.get(client_id)
+            if info is None:
+                return
+            wire_format = choose_format(message.get('formats'))
+            self.send_to_client(client_id, {'type': 'hello_ack', 'format': wire_format})
+            if wire_format == FORMAT_BINARY and info['wire_format'] != FORMAT_BINARY:
+                # _consume_frames hands over the bytes already received after the hello
+                info['framer'] = BinaryFramer()
+                info['wire_format'] = FORMAT_BINARY
+            logger.info(f"🤝 [{client_id}] Negotiated wire format: {wire_format}",
+                        extra={'client_id': client_id, 'wire_format': wire_format})
         except Exception as e:
-            print(f"❌ Error handling heartbeat from {client_id}: {e}")
+            logger.error(f"❌ Error handling hello from {client_id}: {e}", extra={'client_id': client_id})
 
     def handle_pong(self, client_id, message):
-        try:
-            print(f"🏓 [{client_id}] Pong received - client is alive")
-        except Exception as e:
-            print(f"❌ Error handling pong from {client_id}: {e}")
+        if self.log_events:
+            logger.info(f"🏓 [{client_id}] Pong received - client is alive", extra={'client_id': client_id})
 
     def store_key_response(self, client_id, data):
         try:
@@ -311,84 +335,95 @@ class EasyTestServer:
                 'event_number': self.key_event_count.get(client_id, 0)
             }
 
-            with self.db_lock:
-                try:
-                    self.cursor.execute('''
-                        INSERT INTO key_events (
-                            client_id, base_id, remote_id, key_sn, mode, response_info,
-                            sdk_timestamp, client_timestamp, event_type, received_at
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        response_data['client_id'],
-                        response_data['base_id'],
-                        response_data['remote_id'],
-                        data.get('key_sn', ''),
-                        response_data['mode'],
-                        response_data['response_info'],
-                        response_data['sdk_timestamp'],
-                        response_data['client_timestamp'],
-                        response_data['event_type'],
-                        response_data['received_at']
-                    ))
-                    self.conn.commit()
-                    print(f"💾 Stored REAL hardware response #{response_data['event_number']} into DB")
-                except sqlite3.Error as e:
-                    print(f"❌ DB insert error: {e}")
-                    self._reconnect_database()
+            row = (
+                response_data['client_id'],
+                response_data['base_id'],
+                response_data['remote_id'],
+                data.get('key_sn', ''),
+                response_data['mode'],
+                response_data['response_info'],
+                response_data['sdk_timestamp'],
+                response_data['client_timestamp'],
+                response_data['event_type'],
+                response_data['received_at']
+            )
+            if not self.writer.submit(row):
+                logger.error(f"❌ DB writer queue full, dropped response #{response_data['event_number']}",
+                             extra={'client_id': client_id})
+                return None
 
             return response_data
 
         except Exception as e:
-            print(f"❌ Error storing key response: {e}")
+            logger.error(f"❌ Error storing key response: {e}", extra={'client_id': client_id})
             return None
 
-    def _reconnect_database(self):
-        try:
-            print("🔄 Attempting to reconnect to database...")
-            if hasattr(self, 'conn'):
-                self.conn.close()
+    @staticmethod
+    def _encode(message):
+        return (json.dumps(message) + '\n').encode('utf-8')
 
-            self.conn = sqlite3.connect('easytest_data.db', check_same_thread=False)
-            self.cursor = self.conn.cursor()
-            print("✅ Database reconnected successfully")
-        except sqlite3.Error as e:
-            print(f"❌ Database reconnection failed: {e}")
+    def _enqueue(self, client_id, data, report=None):
+        """Hand data to the client's sender without blocking; a full queue evicts the client"""
+        info = self.clients.get(client_id)
+        if info is None:
+            return False
+        if report is not None:
+            report.expect(client_id)
+        if info['sender'].enqueue(data, report):
+            self.outbound_counts['queued'] += 1
+            return True
+        if report is not None:
+            report.reject(client_id)
+        self.outbound_counts['rejected'] += 1
+        self.evict_client(client_id, f"outbound queue full ({self.outbound_queue} messages)")
+        return False
 
     def send_to_client(self, client_id, message):
+        """Queue one message for a client; True once queued, delivery happens on its sender"""
         if client_id not in self.clients:
-            print(f"⚠️  Client {client_id} not found")
+            logger.warning(f"⚠️  Client {client_id} not found", extra={'client_id': client_id})
             return False
 
         try:
-            client_socket = self.clients[client_id]['socket']
-            message_json = json.dumps(message) + '\n'
-            client_socket.send(message_json.encode('utf-8'))
-            print(f"📤 Sent to {client_id}: {message['type']}")
+            if not self._enqueue(client_id, self._encode(message)):
+                return False
+            if self.log_events:
+                logger.info(f"📤 Queued for {client_id}: {message['type']}", extra={'client_id': client_id})
             return True
-        except socket.error as e:
-            print(f"❌ Failed to send to {client_id}: {e}")
-            self.disconnect_client(client_id)
-            return False
         except Exception as e:
-            print(f"❌ Unexpected error sending to {client_id}: {e}")
+            logger.error(f"❌ Unexpected error sending to {client_id}: {e}", extra={'client_id': client_id})
             return False
 
     def broadcast_to_clients(self, message):
-        success_count = 0
+        """Queue message for every client and return its DeliveryReport without waiting.
+
+        The JSON is encoded once. Call report.wait(timeout) to block until every
+        sender has delivered or failed.
+        """
+        report = DeliveryReport(message.get('type'))
+        data = self._encode(message)
         client_list = list(self.clients.keys())
 
         for client_id in client_list:
-            if self.send_to_client(client_id, message):
-                success_count += 1
+            self._enqueue(client_id, data, report)
 
-        print(f"📡 Broadcast sent to {success_count}/{len(client_list)} clients")
-        return success_count
+        logger.info(f"📡 Broadcast queued for {len(report.queued)}/{len(client_list)} clients",
+                    extra={'msg_type': report.message_type, 'rejected': len(report.rejected)})
+        return report
+
+    def evict_client(self, client_id, reason):
+        """Drop a client that cannot keep up with its outbound messages"""
+        if client_id not in self.clients:
+            return
+        self.outbound_counts['evicted'] += 1
+        logger.warning(f"🐢 Evicting slow client {client_id}: {reason}", extra={'client_id': client_id})
+        self.disconnect_client(client_id, abort=True)
 
     def send_vote_command(self, client_id=None, action='start_vote', base_id=0):
         try:
             valid_actions = ['start_vote', 'stop_vote', 'reset_vote']
             if action not in valid_actions:
-                print(f"⚠️  Invalid vote action: {action}")
+                logger.warning(f"⚠️  Invalid vote action: {action}")
                 return False
 
             command = {
@@ -404,21 +439,23 @@ class EasyTestServer:
             if client_id:
                 return self.send_to_client(client_id, command)
             else:
-                return self.broadcast_to_clients(command) > 0
+                # DeliveryReport is truthy when at least one base accepted the command
+                return self.broadcast_to_clients(command)
 
         except Exception as e:
-            print(f"❌ Error sending vote command: {e}")
+            logger.error(f"❌ Error sending vote command: {e}")
             return False
 
-    def disconnect_client(self, client_id):
+    def disconnect_client(self, client_id, abort=False):
         if client_id not in self.clients:
             return
 
         try:
             try:
-                self.clients[client_id]['socket'].close()
+                self.clients[client_id]['sender'].close()
+                self._close_client_transport(self.clients[client_id], abort=abort)
             except Exception as e:
-                print(f"⚠️  Error closing socket for {client_id}: {e}")
+                logger.warning(f"⚠️  Error closing socket for {client_id}: {e}", extra={'client_id': client_id})
 
             try:
                 del self.clients[client_id]
@@ -428,12 +465,40 @@ class EasyTestServer:
             if client_id in self.key_event_count:
                 total_events = self.key_event_count[client_id]
                 del self.key_event_count[client_id]
-                print(f"🔌 Client {client_id} disconnected (processed {total_events} real key events)")
+                logger.info(f"🔌 Client {client_id} disconnected (processed {total_events} real key events)", extra={'client_id': client_id})
             else:
-                print(f"🔌 Client {client_id} disconnected")
+                logger.info(f"🔌 Client {client_id} disconnected", extra={'client_id': client_id})
 
         except Exception as e:
-            print(f"❌ Error during client cleanup for {client_id}: {e}")
+            logger.error(f"❌ Error during client cleanup for {client_id}: {e}", extra={'client_id': client_id})
+
+    def _close_client_transport(self, info, abort=False):
+        # socket.close() never waits on unsent data, so abort needs nothing extra here
+        info['socket'].close()
+
+    def get_latest_answers(self, base_id=None):
+        """Latest stored answer of every remote, optionally for one base"""
+        try:
+            return self.reader.latest_answers(base_id=base_id)
+        except sqlite3.Error as e:
+            logger.error(f"❌ Error reading latest answers: {e}")
+            return []
+
+    def get_key_events_between(self, start, end, client_id=None):
+        """Stored key events with start <= received_at < end (ISO timestamps)"""
+        try:
+            return self.reader.events_between(start, end, client_id=client_id)
+        except sqlite3.Error as e:
+            logger.error(f"❌ Error reading key events between {start} and {end}: {e}")
+            return []
+
+    def get_answer_stream(self, base_id, remote_id, since_id=0):
+        """Answers from one remote after since_id, oldest first"""
+        try:
+            return self.reader.answer_stream(base_id, remote_id, since_id=since_id)
+        except sqlite3.Error as e:
+            logger.error(f"❌ Error reading answer stream for remote {remote_id}: {e}")
+            return []
 
     def get_connected_clients(self):
         try:
@@ -442,12 +507,14 @@ class EasyTestServer:
                     'address': info['address'],
                     'connected_at': info['connected_at'].isoformat(),
                     'last_seen': info['last_seen'].isoformat(),
+                    'wire_format': info['wire_format'],
+                    'outbound_pending': info['sender'].pending(),
                     'key_events_processed': self.key_event_count.get(client_id, 0)
                 }
                 for client_id, info in self.clients.items()
             }
         except Exception as e:
-            print(f"❌ Error getting client info: {e}")
+            logger.error(f"❌ Error getting client info: {e}")
             return {}
 
     def get_statistics(self):
@@ -458,11 +525,16 @@ class EasyTestServer:
                 'connected_clients': len(self.clients),
                 'total_key_events_processed': total_key_events,
                 'key_events_per_client': dict(self.key_event_count),
+                'messages_by_type': dict(self.message_counts),
+                'decode_errors': dict(self.decode_errors),
+                'outbound': dict(self.outbound_counts),
                 'server_uptime': str(uptime),
+                'db_writer': self.writer.get_statistics(),
+                'storage': self.maintainer.get_statistics(),
                 'clients': self.get_connected_clients()
             }
         except Exception as e:
-            print(f"❌ Error getting statistics: {e}")
+            logger.error(f"❌ Error getting statistics: {e}")
             return {
                 'connected_clients': 0,
                 'total_key_events_processed': 0,
@@ -470,64 +542,230 @@ class EasyTestServer:
             }
 
     def stop_server(self):
-        print("🛑 Stopping server...")
+        logger.info("🛑 Stopping server...")
         self.running = False
 
         try:
-            if hasattr(self, 'conn'):
-                self.conn.close()
-                print("💾 Database connection closed")
+            if hasattr(self, 'writer'):
+                self.maintainer.stop()
+                self.writer.stop()
+                self.reader.close()
+                logger.info("💾 Database writer flushed and closed")
         except Exception as e:
-            print(f"⚠️  Error closing database: {e}")
+            logger.warning(f"⚠️  Error closing database: {e}")
 
         try:
             stats = self.get_statistics()
-            print(f"📊 Final Statistics:")
-            print(f"   - Total clients served: {stats.get('connected_clients', 0)}")
-            print(f"   - Total real key events processed: {stats.get('total_key_events_processed', 0)}")
+            logger.info("📊 Final statistics", extra={
+                'connected_clients': stats.get('connected_clients', 0),
+                'total_key_events_processed': stats.get('total_key_events_processed', 0),
+                'messages_by_type': stats.get('messages_by_type', {}),
+            })
         except Exception as e:
-            print(f"⚠️  Error printing final statistics: {e}")
+            logger.warning(f"⚠️  Error printing final statistics: {e}")
 
         client_list = list(self.clients.keys())
         for client_id in client_list:
             try:
                 self.disconnect_client(client_id)
             except Exception as e:
-                print(f"⚠️  Error disconnecting client {client_id}: {e}")
+                logger.warning(f"⚠️  Error disconnecting client {client_id}: {e}")
 
         if self.server_socket:
             try:
                 self.server_socket.close()
-                print("🔌 Server socket closed")
+                logger.info("🔌 Server socket closed")
             except Exception as e:
-                print(f"⚠️  Error closing server socket: {e}")
+                logger.warning(f"⚠️  Error closing server socket: {e}")
+
+        logger.info("✅ Server stopped")
+
+
+class AsyncEasyTestServer(EasyTestServer):
+    """EasyTestServer variant that serves every client from one asyncio event loop.
+
+    Uses the same JSON-lines protocol and process_client_message handler map as the
+    threaded server, but each connection is a coroutine instead of a daemon thread.
+    """
 
-        print("✅ Server stopped")
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loop = None
+        self.async_server = None
+
+    def start_server(self):
+        try:
+            asyncio.run(self._serve())
+        except OSError as e:
+            logger.error(f"❌ Server startup error: {e}")
+        finally:
+            self.stop_server()
 
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        try:
+            self.async_server = await asyncio.start_server(
+                self.handle_client_async, self.host, self.port, reuse_address=True
+            )
+        except OSError as e:
+            if e.errno == 98:
+                logger.error(f"❌ Port {self.port} is already in use. Please choose a different port or kill the existing process.")
+            else:
+                logger.error(f"❌ Failed to bind to {self.host}:{self.port}: {e}")
+            raise
+
+        self.running = True
+        logger.info(f"🚀 EasyTest Server (asyncio) started on {self.host}:{self.port}")
+        logger.info("📡 Waiting for client connections...")
+        logger.info("🔑 Only REAL hardware keypad events will be processed")
+
+        try:
+            while self.running:
+                await asyncio.sleep(0.5)
+        finally:
+            self.async_server.close()
+            for client_id in list(self.clients.keys()):
+                self.disconnect_client(client_id)
+            try:
+                await asyncio.wait_for(self.async_server.wait_closed(), timeout=2.0)
+            except asyncio.TimeoutError:
+                logger.warning("⚠️  Timed out waiting for client handlers to finish")
 
-def main():
+    async def handle_client_async(self, reader, writer):
+        client_address = writer.get_extra_info('peername')[:2]
+        client_id = f"{client_address[0]}:{client_address[1]}"
+        logger.info(f"✅ New client connected: {client_address}")
+        self.clients[client_id] = {
+            'writer': writer,
+            'address': client_address,
+            'connected_at': datetime.now(),
+            'last_seen': datetime.now(),
+            'framer': LineFramer(),
+            'wire_format': FORMAT_JSON,
+            'sender': AsyncClientSender(client_id, writer, self.loop, self.evict_client,
+                                        max_queue=self.outbound_queue, send_timeout=self.send_timeout)
+        }
+        self.key_event_count[client_id] = 0
+        logger.info(f"🔗 Client {client_id} handler started", extra={'client_id': client_id})
+
+        try:
+            while self.running:
+                try:
+                    data = await asyncio.wait_for(reader.read(4096), timeout=30.0)
+                except asyncio.TimeoutError:
+                    logger.warning(f"⏰ Timeout waiting for data from {client_id}", extra={'client_id': client_id})
+                    if not self._enqueue(client_id, self._encode({'type': 'ping', 'timestamp': time.time()})):
+                        logger.warning(f"💔 Client {client_id} appears disconnected", extra={'client_id': client_id})
+                        break
+                    continue
+
+                if not data:
+                    logger.info(f"🔌 Client {client_id} disconnected (no data)", extra={'client_id': client_id})
+                    break
+                self._consume_frames(client_id, data)
+        except (ConnectionError, OSError) as e:
+            logger.error(f"❌ Socket error with client {client_id}: {e}", extra={'client_id': client_id})
+        except Exception as e:
+            logger.error(f"❌ Client {client_id} handler error: {e}", extra={'client_id': client_id})
+        finally:
+            self.disconnect_client(client_id)
+
+    def _call_in_loop(self, func, *args):
+        """Run func on the event loop thread, directly if we are already on it"""
+        if self.loop is None:
+            raise RuntimeError("event loop is not running")
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self.loop:
+            func(*args)
+        else:
+            self.loop.call_soon_threadsafe(func, *args)
+
+    def _close_client_transport(self, info, abort=False):
+        # close() waits to flush buffered writes, which a stalled client never lets happen
+        transport = info['writer'].transport
+        self._call_in_loop(transport.abort if abort else info['writer'].close)
+
+
+SERVER_ENGINES = {
+    'threaded': EasyTestServer,
+    'asyncio': AsyncEasyTestServer,
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="EasyTest keypad socket server")
+    parser.add_argument('--engine', choices=sorted(SERVER_ENGINES), default='threaded',
+                        help="connection engine: one thread per client or a single asyncio event loop")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8888)
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="DEBUG adds the full payload to every per-event record")
+    parser.add_argument('--log-format', default='json', choices=['json', 'text'])
+    parser.add_argument('--log-rate', type=float, default=5.0,
+                        help="sustained log records per second allowed per client")
+    parser.add_argument('--metrics-port', type=int, default=9888,
+                        help="side port serving Prometheus text metrics at /metrics (0 disables)")
+    parser.add_argument('--data-dir', default='easytest_data',
+                        help="directory holding the daily key_events_YYYYMMDD.db shards")
+    parser.add_argument('--retention-days', type=int, default=30,
+                        help="shards older than this many days are deleted or archived")
+    parser.add_argument('--max-storage-mb', type=int, default=None,
+                        help="drop the oldest shards once all shards together exceed this size")
+    parser.add_argument('--archive-dir', default=None,
+                        help="move expired shards here instead of deleting them")
+    parser.add_argument('--send-timeout', type=float, default=5.0,
+                        help="seconds a base may take to accept one outbound message before it is evicted")
+    parser.add_argument('--outbound-queue', type=int, default=64,
+                        help="outbound messages a base may have pending before it is evicted")
+    parser.add_argument('--production', action='store_true',
+                        help="skip per-event logging entirely; counters are still kept")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_logging(level=args.log_level, log_format=args.log_format, rate=args.log_rate)
     server = None
+    metrics_server = None
     try:
-        server = EasyTestServer(host='0.0.0.0', port=8888)
-
-        print("🚀 Starting EasyTest Socket Server...")
-        print(f"   - Server will listen on {server.host}:{server.port}")
-        print("   - Clients can connect from any network")
-        print("   - Only REAL hardware keypad events will be processed")
-        print("   - Press Ctrl+C to stop the server\n")
+        server = SERVER_ENGINES[args.engine](
+            host=args.host,
+            port=args.port,
+            data_dir=args.data_dir,
+            log_events=not args.production,
+            retention_days=args.retention_days,
+            max_storage_mb=args.max_storage_mb,
+            archive_dir=args.archive_dir,
+            send_timeout=args.send_timeout,
+            outbound_queue=args.outbound_queue,
+        )
+        if args.metrics_port:
+            metrics_server = MetricsServer(server, host=args.host, port=args.metrics_port)
+            metrics_server.start()
+
+        logger.info("🚀 Starting EasyTest Socket Server (Ctrl+C to stop)", extra={
+            'engine': args.engine,
+            'listen': f"{server.host}:{server.port}",
+            'production': args.production,
+        })
 
         server.start_server()
 
     except KeyboardInterrupt:
-        print("\n🛑 Received shutdown signal (Ctrl+C)")
+        logger.info("🛑 Received shutdown signal (Ctrl+C)")
     except Exception as e:
-        print(f"❌ Fatal server error: {e}")
+        logger.error(f"❌ Fatal server error: {e}")
     finally:
+        if metrics_server:
+            metrics_server.stop()
         if server:
             try:
                 server.stop_server()
             except Exception as e:
-                print(f"⚠️  Error during server shutdown: {e}")
+                logger.warning(f"⚠️  Error during server shutdown: {e}")
 
 
 if __name__ == '__main__':
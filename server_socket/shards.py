@@ -0,0 +1,212 @@
+"""Daily SQLite shards for the key_events table.
+
+Every calendar day (taken from received_at) gets its own file, e.g.
+easytest_data/key_events_20261018.db. The hot shard stays small, so inserts and
+index maintenance stay cheap. Old days can be archived by moving the file.
+
+Row ids are globally ordered across shards. Each shard's AUTOINCREMENT sequence
+starts at YYYYMMDD * ID_SPAN, so an id also tells which shard holds it.
+"""
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+logger = logging.getLogger('easytest.shards')
+
+ID_SPAN = 10 ** 8
+SHARD_PATTERN = re.compile(r'^key_events_(\d{8})\.db$')
+COMPACTED_VERSION = 1
+
+KEY_EVENTS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS key_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        client_id TEXT NOT NULL,
+        base_id INTEGER,
+        remote_id INTEGER,
+        key_sn TEXT,
+        mode INTEGER,
+        response_info TEXT,
+        sdk_timestamp REAL,
+        client_timestamp TEXT,
+        event_type TEXT,
+        received_at TEXT NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+KEY_EVENT_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_key_events_client_received ON key_events (client_id, received_at)',
+    'CREATE INDEX IF NOT EXISTS idx_key_events_base_remote ON key_events (base_id, remote_id)',
+    'CREATE INDEX IF NOT EXISTS idx_key_events_key_sn ON key_events (key_sn)',
+)
+
+
+def day_of(received_at):
+    """'2026-10-18T09:30:00.123' -> '20261018'"""
+    return received_at[:10].replace('-', '')
+
+
+def day_for_id(row_id):
+    return f"{row_id // ID_SPAN:08d}" if row_id >= ID_SPAN else None
+
+
+class ShardSet:
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        os.makedirs(data_dir, exist_ok=True)
+
+    def path(self, day):
+        return os.path.join(self.data_dir, f"key_events_{day}.db")
+
+    def days(self):
+        """Shard days present on disk, oldest first"""
+        found = []
+        for name in os.listdir(self.data_dir):
+            match = SHARD_PATTERN.match(name)
+            if match:
+                found.append(match.group(1))
+        return sorted(found)
+
+    def size(self, day):
+        total = 0
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                total += os.path.getsize(self.path(day) + suffix)
+            except OSError:
+                pass
+        return total
+
+    def open_writable(self, day):
+        conn = sqlite3.connect(self.path(day), check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(KEY_EVENTS_SCHEMA)
+        for statement in KEY_EVENT_INDEXES:
+            conn.execute(statement)
+        # Start this shard's ids at YYYYMMDD * ID_SPAN the first time it is created
+        if conn.execute("SELECT 1 FROM sqlite_sequence WHERE name = 'key_events'").fetchone() is None:
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('key_events', ?)",
+                         (int(day) * ID_SPAN,))
+        conn.commit()
+        return conn
+
+    def open_readonly(self, day):
+        conn = sqlite3.connect(f"file:{self.path(day)}?mode=ro", uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def remove(self, day, archive_dir=None):
+        for suffix in ('', '-wal', '-shm'):
+            path = self.path(day) + suffix
+            if not os.path.exists(path):
+                continue
+            if archive_dir:
+                os.makedirs(archive_dir, exist_ok=True)
+                shutil.move(path, os.path.join(archive_dir, os.path.basename(path)))
+            else:
+                os.remove(path)
+
+
+class ShardMaintainer:
+    """Background retention, size bounding and compaction of cold shards.
+
+    Shards older than retention_days, and the oldest shards beyond max_total_bytes,
+    are deleted, or moved to archive_dir when one is configured. Cold shards (before
+    yesterday, so late rows for yesterday can still land) are checkpointed,
+    switched out of WAL and VACUUMed once. The result is a single
+    self-contained file that is safe to copy or move.
+    """
+
+    def __init__(self, shards, retention_days=30, max_total_bytes=None, archive_dir=None, interval=3600):
+        self.shards = shards
+        self.retention_days = retention_days
+        self.max_total_bytes = max_total_bytes
+        self.archive_dir = archive_dir
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = None
+        self.shards_removed = 0
+        self.shards_compacted = 0
+        self.last_run = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='shard-maintainer', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Shard maintenance failed: {e}")
+            self.stopped.wait(self.interval)
+
+    def run_once(self, today=None):
+        today = today or date.today()
+        hot_day = today.strftime('%Y%m%d')
+        yesterday = (today - timedelta(days=1)).strftime('%Y%m%d')
+        cutoff = (today - timedelta(days=self.retention_days)).strftime('%Y%m%d')
+
+        days = self.shards.days()
+        for day in [day for day in days if day < cutoff]:
+            self._remove(day, "past retention")
+        days = [day for day in days if day >= cutoff]
+
+        if self.max_total_bytes:
+            total = sum(self.shards.size(day) for day in days)
+            while total > self.max_total_bytes and len(days) > 1 and days[0] != hot_day:
+                day = days.pop(0)
+                total -= self.shards.size(day)
+                self._remove(day, "storage limit")
+
+        for day in days:
+            if day < yesterday:
+                self._compact(day)
+        self.last_run = datetime.now()
+
+    def _remove(self, day, reason):
+        try:
+            self.shards.remove(day, archive_dir=self.archive_dir)
+            self.shards_removed += 1
+            action = f"archived to {self.archive_dir}" if self.archive_dir else "deleted"
+            logger.info(f"🗄️  Shard {day} {action} ({reason})")
+        except OSError as e:
+            # Windows refuses to remove a file a reader still has open; retry next run
+            logger.warning(f"⚠️  Could not remove shard {day}: {e}")
+
+    def _compact(self, day):
+        conn = sqlite3.connect(self.shards.path(day))
+        try:
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= COMPACTED_VERSION:
+                return
+            started = time.perf_counter()
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            conn.execute('PRAGMA journal_mode=DELETE')
+            conn.execute('VACUUM')
+            conn.execute(f'PRAGMA user_version = {COMPACTED_VERSION}')
+            self.shards_compacted += 1
+            logger.info(f"🧹 Compacted shard {day} in {(time.perf_counter() - started) * 1000:.0f} ms")
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️  Could not compact shard {day}: {e}")
+        finally:
+            conn.close()
+
+    def stop(self):
+        self.stopped.set()
+
+    def get_statistics(self):
+        days = self.shards.days()
+        return {
+            'shards': len(days),
+            'oldest_shard': days[0] if days else None,
+            'newest_shard': days[-1] if days else None,
+            'total_bytes': sum(self.shards.size(day) for day in days),
+            'shards_removed': self.shards_removed,
+            'shards_compacted': self.shards_compacted,
+            'last_maintenance': self.last_run.isoformat() if self.last_run else None,
+        }
@@ -0,0 +1,159 @@
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from framing import LineFramer
+from server import EasyTestServer
+from wire import FORMAT_BINARY, FORMAT_JSON, KIND_KEY_EVENT, BinaryFramer, encode_frame, encode_message
+
+
+def key_event(key_id, **overrides):
+    data = {
+        'base_id': 1,
+        'key_id': key_id,
+        'key_sn': f"SN{key_id:05d}",
+        'mode': 1,
+        'timestamp': 1760778000.5,
+        'info': "B",
+        'client_timestamp': "2026-10-18T09:00:00",
+        'event_type': 'real_hardware',
+    }
+    data.update(overrides)
+    return {'type': 'key_event', 'data': data}
+
+
+class LineFramerTestCase(unittest.TestCase):
+
+    def test_frame_split_across_reads(self):
+        framer = LineFramer()
+        self.assertEqual(framer.feed(b'{"type": "heart'), [])
+        self.assertEqual(framer.feed(b'beat"}\n{"type": "hel'), ['{"type": "heartbeat"}'])
+        self.assertEqual(framer.feed(b'lo"}\n'), ['{"type": "hello"}'])
+        self.assertEqual(framer.pending(), 0)
+
+    def test_byte_by_byte(self):
+        stream = b'first\n\nsecond\n'
+        framer = LineFramer()
+        frames = []
+        for i in range(len(stream)):
+            frames += framer.feed(stream[i:i + 1])
+        self.assertEqual(frames, ['first', 'second'])  # blank lines are not frames
+
+    def test_oversized_frame_is_skipped(self):
+        framer = LineFramer(max_frame=10)
+        frames = framer.feed(b'before\n' + b'x' * 25 + b'\nafter\n')
+        self.assertEqual(frames, ['before', 'after'])
+        self.assertEqual(framer.oversized_frames, 1)
+        self.assertEqual(len(framer.pop_errors()), 1)
+
+    def test_oversized_frame_spanning_reads_is_skipped(self):
+        framer = LineFramer(max_frame=10)
+        self.assertEqual(framer.feed(b'x' * 15), [])
+        self.assertEqual(framer.pending(), 0)  # not buffered while it is being discarded
+        self.assertEqual(framer.feed(b'x' * 15 + b'\nafter\n'), ['after'])
+        self.assertEqual(framer.oversized_frames, 1)
+
+    def test_stop_early_leaves_rest_unsplit(self):
+        framer = LineFramer()
+        frames = framer.iter_frames(b'first\nsecond\n\nthird')
+        self.assertEqual(next(frames), 'first')
+        frames.close()
+        self.assertEqual(bytes(framer.buffer), b'second\n\nthird')
+        self.assertEqual(framer.feed(b'\n'), ['second', 'third'])
+
+    def test_invalid_utf8_is_reported(self):
+        framer = LineFramer()
+        self.assertEqual(framer.feed(b'\xff\xfe\nok\n'), ['ok'])
+        self.assertEqual(framer.decode_errors, 1)
+
+
+class BinaryFramerTestCase(unittest.TestCase):
+
+    def test_round_trip(self):
+        messages = [key_event(7), {'type': 'heartbeat', 'data': {'seq': 3}}]
+        decoded = BinaryFramer().feed(b''.join(encode_message(message) for message in messages))
+        self.assertEqual(decoded, messages)
+
+    def test_round_trip_without_client_timestamp(self):
+        message = key_event(7, client_timestamp=None, event_type='unknown', key_sn='', info='')
+        self.assertEqual(BinaryFramer().feed(encode_message(message)), [message])
+
+    def test_frame_split_across_reads(self):
+        data = encode_message(key_event(1)) + encode_message(key_event(2))
+        framer = BinaryFramer()
+        self.assertEqual(framer.feed(data[:2]), [])  # not even a whole header
+        self.assertEqual([m['data']['key_id'] for m in framer.feed(data[2:30])], [])
+        self.assertEqual([m['data']['key_id'] for m in framer.feed(data[30:])], [1, 2])
+        self.assertEqual(framer.pending(), 0)
+
+    def test_byte_by_byte(self):
+        data = b''.join(encode_message(key_event(i)) for i in range(1, 4))
+        framer = BinaryFramer()
+        decoded = []
+        for i in range(len(data)):
+            decoded += framer.feed(data[i:i + 1])
+        self.assertEqual([m['data']['key_id'] for m in decoded], [1, 2, 3])
+
+    def test_oversized_frame_is_skipped(self):
+        big = encode_frame(0, json.dumps({'type': 'x', 'pad': 'p' * 50}).encode())
+        data = encode_message(key_event(1)) + big + encode_message(key_event(2))
+        framer = BinaryFramer(max_frame=40)
+        decoded = []
+        for start in range(0, len(data), 7):  # the skip also spans reads
+            decoded += framer.feed(data[start:start + 7])
+        self.assertEqual([m['data']['key_id'] for m in decoded], [1, 2])
+        self.assertEqual(framer.oversized_frames, 1)
+
+    def test_undecodable_frame_keeps_sync(self):
+        data = encode_frame(KIND_KEY_EVENT, b'short') + encode_frame(9, b'{}') + encode_message(key_event(3))
+        framer = BinaryFramer()
+        self.assertEqual([m['data']['key_id'] for m in framer.feed(data)], [3])
+        self.assertEqual(framer.decode_errors, 2)
+
+    def test_key_event_without_required_field_is_not_encoded(self):
+        for field in ('base_id', 'key_id', 'mode'):
+            message = key_event(1)
+            message['data'][field] = None
+            with self.assertRaises(ValueError):
+                encode_message(message)
+            del message['data'][field]
+            with self.assertRaises(ValueError):
+                encode_message(message)
+
+
+class HelloHandoverTestCase(unittest.TestCase):
+
+    def setUp(self):
+        data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(data_dir.cleanup)
+        self.server = EasyTestServer(data_dir=data_dir.name, log_events=False)
+        self.addCleanup(self.server.stop_server)
+        self.server.clients['client'] = {'framer': LineFramer(), 'wire_format': FORMAT_JSON}
+        self.received = []
+
+        def process(client_id, message):
+            self.received.append(message)
+            if message['type'] == 'hello':
+                self.server.handle_hello(client_id, message)
+
+        for patcher in (mock.patch.object(self.server, 'process_client_message', side_effect=process),
+                        mock.patch.object(self.server, 'send_to_client')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_binary_frames_in_the_hello_chunk(self):
+        hello = json.dumps({'type': 'hello', 'formats': [FORMAT_BINARY, FORMAT_JSON]}).encode() + b'\n'
+        # key_id 10 encodes a b'\n' byte, so the line framer would split these frames
+        events = b''.join(encode_message(key_event(key_id)) for key_id in (10, 11, 12))
+        self.server._consume_frames('client', hello + events[:-5])
+        self.server._consume_frames('client', events[-5:])
+
+        self.assertEqual(self.server.clients['client']['wire_format'], FORMAT_BINARY)
+        self.assertEqual([m['type'] for m in self.received], ['hello', 'key_event', 'key_event', 'key_event'])
+        self.assertEqual([m['data']['key_id'] for m in self.received[1:]], [10, 11, 12])
+        self.assertEqual(self.server.decode_errors, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
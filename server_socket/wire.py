@@ -0,0 +1,184 @@
+"""Compact length-prefixed wire format for keypad bases.
+
+A base that wants it sends a JSON-lines hello before anything else:
+
+    {"type": "hello", "formats": ["binary-v1", "json-lines"]}
+
+The server answers with {"type": "hello_ack", "format": "<chosen>"} and, if it
+chose binary-v1, every later client -> server message on that connection is a
+binary frame. The base must wait for hello_ack before sending binary frames.
+Bases that never send hello keep talking plain JSON-lines. Server -> client
+commands stay JSON-lines in both modes.
+
+Frame layout (network byte order):
+
+    uint16 payload length | uint8 kind | payload
+
+kind 1 is a key_event packed with KEY_EVENT (base_id, key_id, mode, sdk
+timestamp, client timestamp as epoch seconds, flags, key_sn length, info
+length) followed by the key_sn and info UTF-8 bytes. kind 0 carries any other
+message as UTF-8 JSON.
+"""
+import json
+import struct
+from datetime import datetime
+
+from framing import MAX_FRAME_BYTES
+
+FORMAT_JSON = 'json-lines'
+FORMAT_BINARY = 'binary-v1'
+SUPPORTED_FORMATS = (FORMAT_BINARY, FORMAT_JSON)
+
+KIND_JSON = 0
+KIND_KEY_EVENT = 1
+
+FRAME_HEADER = struct.Struct('!HB')
+KEY_EVENT = struct.Struct('!iiiddBBB')
+FLAG_REAL_HARDWARE = 0x01
+
+
+def _epoch(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    if value:
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    return 0.0
+
+
+def _required_int(data, name):
+    # 0 is a real id on the wire, so a missing field must not silently become one
+    value = data.get(name)
+    if value is None:
+        raise ValueError(f"key_event without {name}")
+    return int(value)
+
+
+def encode_frame(kind, payload):
+    return FRAME_HEADER.pack(len(payload), kind) + payload
+
+
+def encode_message(message):
+    """Encode one protocol message, packing key_events and JSON-wrapping the rest
+
+    Raises ValueError for a key_event without base_id, key_id or mode.
+    """
+    if message.get('type') != 'key_event':
+        return encode_frame(KIND_JSON, json.dumps(message, separators=(',', ':')).encode('utf-8'))
+
+    data = message.get('data', {})
+    key_sn = (data.get('key_sn') or '').encode('utf-8')[:255]
+    info = (data.get('info') or '').encode('utf-8')[:255]
+    flags = FLAG_REAL_HARDWARE if data.get('event_type') == 'real_hardware' else 0
+    payload = KEY_EVENT.pack(
+        _required_int(data, 'base_id'),
+        _required_int(data, 'key_id'),
+        _required_int(data, 'mode'),
+        float(data.get('timestamp') or 0.0),
+        _epoch(data.get('client_timestamp')),
+        flags,
+        len(key_sn),
+        len(info),
+    ) + key_sn + info
+    return encode_frame(KIND_KEY_EVENT, payload)
+
+
+def decode_key_event(payload):
+    base_id, key_id, mode, timestamp, client_ts, flags, sn_len, info_len = KEY_EVENT.unpack_from(payload)
+    offset = KEY_EVENT.size
+    key_sn = str(payload[offset:offset + sn_len], 'utf-8')
+    offset += sn_len
+    info = str(payload[offset:offset + info_len], 'utf-8')
+    return {
+        'type': 'key_event',
+        'data': {
+            'base_id': base_id,
+            'key_id': key_id,
+            'key_sn': key_sn,
+            'mode': mode,
+            'timestamp': timestamp,
+            'info': info,
+            'client_timestamp': datetime.fromtimestamp(client_ts).isoformat() if client_ts else None,
+            'event_type': 'real_hardware' if flags & FLAG_REAL_HARDWARE else 'unknown',
+        }
+    }
+
+
+def choose_format(offered):
+    """Pick the first format we support from a hello's preference-ordered list"""
+    for wire_format in offered or ():
+        if wire_format in SUPPORTED_FORMATS:
+            return wire_format
+    return FORMAT_JSON
+
+
+class BinaryFramer:
+    """Incremental decoder for binary-v1 frames; feed() returns decoded messages.
+
+    Has the same feed()/pop_errors()/pending() surface as LineFramer. Because
+    every frame carries its length, an oversized or undecodable frame is skipped
+    exactly without losing sync with the frames that follow it.
+    """
+
+    def __init__(self, initial=b'', max_frame=MAX_FRAME_BYTES):
+        self.max_frame = max_frame
+        self.buffer = bytearray(initial)
+        self.skip = 0
+        self.frames = 0
+        self.oversized_frames = 0
+        self.decode_errors = 0
+        self.errors = []
+
+    def feed(self, data):
+        buffer = self.buffer
+        buffer += data
+        messages = []
+        start = 0
+        size = len(buffer)
+
+        with memoryview(buffer) as view:
+            if self.skip:
+                skipped = min(self.skip, size)
+                self.skip -= skipped
+                start = skipped
+
+            while size - start >= FRAME_HEADER.size:
+                length, kind = FRAME_HEADER.unpack_from(buffer, start)
+                body = start + FRAME_HEADER.size
+                if length > self.max_frame:
+                    self.oversized_frames += 1
+                    self.errors.append(f"frame exceeds {self.max_frame} bytes ({length} bytes), skipped")
+                    skipped = min(length, size - body)
+                    self.skip = length - skipped
+                    start = body + skipped
+                    continue
+                if size - body < length:
+                    break
+                payload = view[body:body + length]
+                start = body + length
+                try:
+                    if kind == KIND_KEY_EVENT:
+                        messages.append(decode_key_event(payload))
+                    elif kind == KIND_JSON:
+                        messages.append(json.loads(str(payload, 'utf-8')))
+                    else:
+                        raise ValueError(f"unknown frame kind {kind}")
+                    self.frames += 1
+                except (ValueError, struct.error) as e:
+                    self.decode_errors += 1
+                    self.errors.append(f"undecodable frame (kind {kind}): {e}")
+                finally:
+                    payload.release()
+
+        if start:
+            del buffer[:start]
+        return messages
+
+    def pop_errors(self):
+        errors, self.errors = self.errors, []
+        return errors
+
+    def pending(self):
+        return len(self.buffer)